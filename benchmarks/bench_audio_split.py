@@ -0,0 +1,91 @@
+"""
+Compare CPU time of the per-chunk ffmpeg split with the single-pass segmenter.
+
+Generates a synthetic speech-band recording (tone + pink noise) with ffmpeg, then cuts it
+into Whisper-sized chunks both ways and reports the CPU time spent in ffmpeg child
+processes. Usage:
+
+    python benchmarks/bench_audio_split.py --minutes 60 --chunks 8
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio_utils import CHUNK_ENCODING_ARGS, chunk_segment_time, get_media_duration, iter_ffmpeg_segments
+
+
+def make_synthetic_audio(path: str, minutes: float):
+    seconds = int(minutes * 60)
+    subprocess.run(
+        ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+         '-f', 'lavfi', '-i', f"sine=frequency=220:duration={seconds}",
+         '-f', 'lavfi', '-i', f"anoisesrc=color=pink:amplitude=0.1:duration={seconds}",
+         '-filter_complex', 'amix=inputs=2', '-ac', '2', '-ar', '44100', '-b:a', '192k', path],
+        check=True
+    )
+
+
+def children_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def split_per_chunk(path: str, num_chunks: int) -> list:
+    """The previous splitter: one ffmpeg run per chunk with -ss after -i."""
+    duration = get_media_duration(path)
+    chunk_duration = duration / num_chunks
+    chunk_paths = []
+    for i in range(num_chunks):
+        chunk_path = f"{path}_legacy_{i}.mp3"
+        subprocess.run(
+            ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-i', path,
+             '-ss', str(int(i * chunk_duration)), '-t', str(int(chunk_duration)),
+             *CHUNK_ENCODING_ARGS, chunk_path],
+            check=True
+        )
+        chunk_paths.append(chunk_path)
+    return chunk_paths
+
+
+def split_single_pass(path: str, num_chunks: int) -> list:
+    duration = get_media_duration(path)
+    return list(iter_ffmpeg_segments(path, chunk_segment_time(duration, num_chunks)))
+
+
+def measure(label: str, fn, *args):
+    cpu_before = children_cpu_seconds()
+    wall_before = time.perf_counter()
+    chunk_paths = fn(*args)
+    wall = time.perf_counter() - wall_before
+    cpu = children_cpu_seconds() - cpu_before
+    total = sum(get_media_duration(p) for p in chunk_paths)
+    print(f"{label:<12} chunks={len(chunk_paths):<3} cpu={cpu:7.2f}s wall={wall:7.2f}s audio={total:8.2f}s")
+    for chunk_path in chunk_paths:
+        os.remove(chunk_path)
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--chunks', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, 'synthetic.mp3')
+        print(f"Generating {args.minutes:g} minutes of synthetic audio...")
+        make_synthetic_audio(source, args.minutes)
+        print(f"Source: {os.path.getsize(source) / 1024 / 1024:.1f} MB, {get_media_duration(source):.2f}s")
+        legacy = measure('per-chunk', split_per_chunk, source, args.chunks)
+        single = measure('single-pass', split_single_pass, source, args.chunks)
+        print(f"CPU time ratio (per-chunk / single-pass): {legacy / single:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,4 +7,110 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "").split(",")
-API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
\ No newline at end of file
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+
+# Transcript cache (in-process LRU in front of a SQLite file shared by all workers)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "quicklearn-cache"))
+TRANSCRIPT_CACHE_PATH = os.getenv("TRANSCRIPT_CACHE_PATH", os.path.join(CACHE_DIR, "transcripts.db"))
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600)))
+TRANSCRIPT_CACHE_MEMORY_ITEMS = int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ITEMS", "256"))
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Whisper transcription of chunked audio
+WHISPER_CONCURRENCY = int(os.getenv("WHISPER_CONCURRENCY", "4"))
+WHISPER_MAX_RETRIES = int(os.getenv("WHISPER_MAX_RETRIES", "2"))
+# Whisper results keyed by the SHA-256 of the audio (whole files and individual chunks)
+WHISPER_CACHE_PATH = os.getenv("WHISPER_CACHE_PATH", os.path.join(CACHE_DIR, "whisper.db"))
+WHISPER_CACHE_TTL = int(os.getenv("WHISPER_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Length of the first chunk cut from a streamed download, so Whisper can start early
+AUDIO_STREAM_FIRST_SEGMENT_SECONDS = float(os.getenv("AUDIO_STREAM_FIRST_SEGMENT_SECONDS", "300"))
+
+# Speech-optimized transcode of small files before they are uploaded to Whisper
+AUDIO_NORMALIZE_ENABLED = os.getenv("AUDIO_NORMALIZE_ENABLED", "true").lower() in ("1", "true", "yes")
+AUDIO_NORMALIZE_MIN_BYTES = int(os.getenv("AUDIO_NORMALIZE_MIN_BYTES", str(1024 * 1024)))
+AUDIO_NORMALIZE_BITRATE = os.getenv("AUDIO_NORMALIZE_BITRATE", "24k")
+# Seconds ffmpeg may keep cutting chunks once all of its input has arrived
+FFMPEG_SEGMENT_TIMEOUT = float(os.getenv("FFMPEG_SEGMENT_TIMEOUT", "900"))
+
+# yt-dlp audio acquisition: smallest audio-only stream, no MP3 conversion
+YTDLP_AUDIO_FORMAT = os.getenv(
+    "YTDLP_AUDIO_FORMAT",
+    "bestaudio[abr<=64][vcodec=none]/worstaudio[vcodec=none]/bestaudio/worst"
+)
+YTDLP_AUDIO_TIMEOUT = int(os.getenv("YTDLP_AUDIO_TIMEOUT", "60"))
+
+# Playlist videos transcribed at the same time
+PLAYLIST_CONCURRENCY = int(os.getenv("PLAYLIST_CONCURRENCY", "4"))
+
+# Playlist item lists and their YouTube API ETags, for conditional refreshes
+PLAYLIST_CACHE_PATH = os.getenv("PLAYLIST_CACHE_PATH", os.path.join(CACHE_DIR, "playlists.db"))
+
+# Send playlist videos without uploaded captions (videos.list contentDetails.caption) straight
+# to audio transcription instead of trying a yt-dlp subtitle download first
+PLAYLIST_CAPTION_PREFILTER = os.getenv("PLAYLIST_CAPTION_PREFILTER", "false").lower() in ("1", "true", "yes")
+
+# Background transcript jobs: events kept per job for Last-Event-ID reattach, and how long
+# finished jobs stay available
+JOB_EVENT_LOG_SIZE = int(os.getenv("JOB_EVENT_LOG_SIZE", "5000"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "900"))
+
+# Home transcription workers: comma-separated list of /transcribe URLs (WORKER_URL still works
+# for a single worker), shared connection pool and circuit breaker settings
+WORKER_URLS = [url.strip() for url in os.getenv("WORKER_URLS", os.getenv("WORKER_URL", "")).split(",") if url.strip()]
+WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", "180"))
+WORKER_MAX_CONNECTIONS = int(os.getenv("WORKER_MAX_CONNECTIONS", "20"))
+WORKER_FAILURE_THRESHOLD = int(os.getenv("WORKER_FAILURE_THRESHOLD", "3"))
+WORKER_COOLDOWN_SECONDS = float(os.getenv("WORKER_COOLDOWN_SECONDS", "30"))
+WORKER_HEALTH_INTERVAL = float(os.getenv("WORKER_HEALTH_INTERVAL", "30"))
+
+# SSE responses: events that are ready together are written in one send, up to this many
+# bytes, or after this many seconds of waiting for the next event
+SSE_FLUSH_BYTES = int(os.getenv("SSE_FLUSH_BYTES", str(16 * 1024)))
+SSE_FLUSH_SECONDS = float(os.getenv("SSE_FLUSH_SECONDS", "0.02"))
+
+# In-process yt-dlp engine: worker processes holding warm YoutubeDL instances, and the
+# cookies secret they load (re-read when the file changes)
+YTDLP_WORKERS = int(os.getenv("YTDLP_WORKERS", "2"))
+# Most engine processes per kind (idle or busy); further calls wait for one to be free
+YTDLP_MAX_WORKERS = int(os.getenv("YTDLP_MAX_WORKERS", "3"))
+YTDLP_COOKIES_PATH = os.getenv("YTDLP_COOKIES_PATH", "/etc/secrets/cookies.txt")
+YTDLP_SUBTITLE_TIMEOUT = int(os.getenv("YTDLP_SUBTITLE_TIMEOUT", "30"))
+
+# Tiered transcript acquisition for /transcript/stream: tiers tried in this order (adjusted by
+# recent success rates), each with its own timeout in seconds
+TRANSCRIPT_TIERS = [tier.strip() for tier in os.getenv("TRANSCRIPT_TIERS", "captions,ytdlp,worker,audio").split(",") if tier.strip()]
+CAPTIONS_TIER_TIMEOUT = float(os.getenv("CAPTIONS_TIER_TIMEOUT", "10"))
+YTDLP_TIER_TIMEOUT = float(os.getenv("YTDLP_TIER_TIMEOUT", "35"))
+WORKER_TIER_TIMEOUT = float(os.getenv("WORKER_TIER_TIMEOUT", "180"))
+AUDIO_TIER_TIMEOUT = float(os.getenv("AUDIO_TIER_TIMEOUT", "1800"))
+
+# /transcript/upload: files are copied to disk in blocks, never held in memory whole
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(500 * 1024 * 1024)))
+UPLOAD_TEXT_MAX_BYTES = int(os.getenv("UPLOAD_TEXT_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE", str(1024 * 1024)))
+# Resumable uploads (/transcript/uploads) not appended to or finalized for this long are dropped
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "3600"))
+
+# Shared OpenAI client (one keep-alive pool per worker process)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+# Transcript chunks of /summary/summarize-stream and /summary/qna-stream generated at the same time
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "3"))
+
+# Prompt token budgets (gpt-3.5-turbo has a 16k-token context shared by prompt and completion)
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3500"))
+QNA_CHUNK_TOKENS = int(os.getenv("QNA_CHUNK_TOKENS", "3500"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "100"))
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", "3000"))
+
+# Map-reduce summaries of long transcripts
+PARTIAL_SUMMARY_TOKENS = int(os.getenv("PARTIAL_SUMMARY_TOKENS", "400"))
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "8"))
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", os.path.join(CACHE_DIR, "summaries.db"))
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Completions of titles, video summaries, suggested questions, extraction and summary/Q&A streams
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm.db"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
@@ -1,14 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from config import ALLOWED_ORIGINS
 from services.transcript_service import router as transcript_router
+from utils.worker_client import worker_pool
+from utils.ytdlp_engine import ytdlp_engine
+from utils.upload_utils import UploadSizeLimitMiddleware
+from utils.openai_utils import close_async_client
 from services.summary_service import router as summary_router
 from services.chat_service import router as chat_router
 from services.website_scraper_service import scrape_website
 from fastapi.responses import JSONResponse
 import logging
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load yt-dlp in its engine processes before the first request needs it
+    ytdlp_engine.warm_up()
+    yield
+    # Close the shared keep-alive connections to the transcription workers
+    await worker_pool.aclose()
+    await close_async_client()
+    ytdlp_engine.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Refuse oversized uploads from their Content-Length, before the body is read
+app.add_middleware(UploadSizeLimitMiddleware, paths=("/transcript/upload",))
 
 # Add CORS middleware
 app.add_middleware(
@@ -17,6 +35,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Job-ID", "Upload-Offset", "X-Cache"],
 )
 
 # Include routers
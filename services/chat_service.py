@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
-from config import OPENAI_API_KEY
 from exceptions.custom_exceptions import ChatError
+from utils.openai_utils import get_async_client
+from utils.llm_cache import cached_chat_completion, use_cache
+from utils.token_utils import truncate_to_tokens
+from utils.summary_utils import cached_condensed_transcript
+from config import CONTEXT_TOKENS
+import asyncio
 import json
 import logging
 import re
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 router = APIRouter()
 
@@ -21,8 +24,9 @@ class ChatInput(BaseModel):
     chatHistory: list
 
 @router.post("/suggested-questions")
-async def suggested_questions(req: SummaryInput):
+async def suggested_questions(req: SummaryInput, request: Request, response: Response):
     try:
+        summary = await asyncio.to_thread(truncate_to_tokens, req.summary, CONTEXT_TOKENS)
         prompt = f"""
 You are a helpful AI assistant. Read the following transcript and generate 5 distinct educational topics, each with one thoughtful question.
 
@@ -37,19 +41,21 @@ Output format (JSON array, exactly 5 items):
 
 Transcript:
 \"\"\"
-{req.summary[:10000]}
+{summary}
 \"\"\"
 """
-        response = client.chat.completions.create(
+        text, status = await cached_chat_completion(
             model="gpt-3.5-turbo",
+            cache=use_cache(request),
             messages=[
                 {"role": "system", "content": "You are a topic-question suggestion assistant."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7
         )
+        response.headers["X-Cache"] = status
 
-        text = response.choices[0].message.content.strip()
+        text = text.strip()
         text = re.sub(r'^```(json)?\n|\n```$', '', text).strip()
         try:
             questions = json.loads(text)
@@ -98,21 +104,27 @@ async def chat_on_topic(req: ChatInput):
                 logging.error(f"Invalid chat history entry: {msg}")
                 raise ChatError("Invalid chat history format.")
 
+        # A long transcript already condensed by /summary/summarize-video is covered in full
+        condensed = await asyncio.to_thread(cached_condensed_transcript, transcript, CONTEXT_TOKENS) if transcript else None
+        if condensed:
+            context = f"Summary of the full transcript:\n\n{condensed}"
+        else:
+            context = await asyncio.to_thread(truncate_to_tokens, transcript, CONTEXT_TOKENS)
         system_prompt = {
             "role": "system",
-            "content": f"You are a helpful assistant. Use the following transcript to answer questions. When you mention mathematical expressions or formulas, always use LaTeX syntax and wrap them in $...$ for inline math or $$...$$ for block math. If the question is about a mathematical or technical concept, answer in a tutorial style, with step-by-step reasoning, formulas, and examples.\n\n{transcript[:10000] if transcript else 'No transcript provided.'}"
+            "content": f"You are a helpful assistant. Use the following transcript to answer questions. When you mention mathematical expressions or formulas, always use LaTeX syntax and wrap them in $...$ for inline math or $$...$$ for block math. If the question is about a mathematical or technical concept, answer in a tutorial style, with step-by-step reasoning, formulas, and examples.\n\n{context if context else 'No transcript provided.'}"
         }
 
         messages = [system_prompt] + chat_history
-        def generate():
+        async def generate():
             try:
-                stream = client.chat.completions.create(
+                stream = await get_async_client().chat.completions.create(
                     model="gpt-3.5-turbo",
                     messages=messages,
                     stream=True,
                     max_tokens=1024
                 )
-                for chunk in stream:
+                async for chunk in stream:
                     content = chunk.choices[0].delta.content or ""
                     yield content
             except Exception as e:
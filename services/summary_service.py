@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from openai import OpenAI
-from config import OPENAI_API_KEY
 from exceptions.custom_exceptions import SummaryError
+from utils.openai_utils import stream_markdown_blocks, stream_in_order
+from utils.llm_cache import (
+    cached_chat_completion, cached_stream, cached_stream_status, completion_cache_key, overall_status,
+    use_cache, CACHE_MISS,
+)
+from utils.token_utils import chunk_text
+from utils.summary_utils import condense_transcript, transcript_chunks
+from config import QNA_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, CONTEXT_TOKENS
+import asyncio
 import logging
 import json
-import openai
+from functools import partial
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 router = APIRouter()
 
@@ -18,18 +24,21 @@ class VideoInput(BaseModel):
     url: str
 
 @router.post("/summarize-video")
-async def summarize_video(input: VideoInput):
+async def summarize_video(input: VideoInput, request: Request, response: Response):
     try:
         logging.info(f"Processing video URL: {input.url}, transcript length: {len(input.transcript)}")
         
         summary = "No summary available."
+        status = CACHE_MISS
         
         if input.transcript:
-            truncated_transcript = input.transcript[:10000]
-            logging.info(f"Truncated transcript length: {len(truncated_transcript)}")
+            # Long transcripts are condensed by map-reduce instead of cut off
+            truncated_transcript = await condense_transcript(input.transcript, CONTEXT_TOKENS)
+            logging.info(f"Condensed transcript length: {len(truncated_transcript)}")
             
-            response = client.chat.completions.create(
+            content, status = await cached_chat_completion(
                 model="gpt-3.5-turbo",
+                cache=use_cache(request),
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that summarizes videos."},
                     {"role": "user", "content": (
@@ -44,16 +53,37 @@ async def summarize_video(input: VideoInput):
                 max_tokens=100,
                 temperature=0.7
             )
-            content = response.choices[0].message.content
             summary = content.strip() if content else "No summary available."
-            logging.info(f"OpenAI summary: {summary[:200]}...")
+            logging.info(f"OpenAI summary ({status}): {summary[:200]}...")
         
         logging.info(f"Returning summary: {summary[:50]}...")
+        response.headers["X-Cache"] = status
         return {"summary": summary}
     except Exception as e:
         logging.error(f"Error in summarize-video: {str(e)}", exc_info=True)
         raise SummaryError(f"Error generating video summary: {str(e)}")
 
+async def cached_chunk_streams(request: Request, prompts: list, max_tokens: int) -> StreamingResponse:
+    """
+    Stream the completions of `prompts` in order, replaying any that are cached. Later ones
+    are generated while earlier ones stream. X-Cache is HIT only if every part is cached.
+    """
+    cache = use_cache(request)
+    keys = [
+        completion_cache_key("gpt-3.5-turbo", [{"role": "user", "content": prompt}], max_tokens=max_tokens)
+        for prompt in prompts
+    ]
+    statuses = await asyncio.gather(*(cached_stream_status(key, cache) for key in keys))
+    makers = [
+        partial(cached_stream, key, partial(stream_markdown_blocks, prompt, max_tokens=max_tokens), cache)
+        for key, prompt in zip(keys, prompts)
+    ]
+    return StreamingResponse(
+        stream_in_order(makers),
+        media_type="text/plain",
+        headers={"X-Cache": overall_status(statuses)}
+    )
+
 @router.post("/summarize-stream")
 async def summarize_stream(request: Request):
     try:
@@ -62,12 +92,10 @@ async def summarize_stream(request: Request):
         if not transcript:
             raise SummaryError("Transcript is required.")
 
-        max_chunk_chars = 12000
-        chunks = [transcript[i:i+max_chunk_chars] for i in range(0, len(transcript), max_chunk_chars)]
+        chunks = await asyncio.to_thread(transcript_chunks, transcript)
 
-        def chunk_stream():
-            for index, chunk in enumerate(chunks):
-                prompt = f"""
+        def chunk_prompt(chunk):
+            prompt = f"""
 You are an expert AI technical educator.
 
 Write a highly engaging, well-structured, and richly informative educational article based on the following transcript segment:
@@ -92,25 +120,9 @@ Guidelines:
 - Ignore repeated or filler phrases from the transcript; focus on unique mathematical explanations and problem-solving steps.
 - Minimize motivational or generic language; focus on clear, logical, and example-driven teaching.
 """
-                stream = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    stream=True,
-                    max_tokens=4096
-                )
-                buffer = ""
-                for chunk in stream:
-                    content = chunk.choices[0].delta.content or ""
-                    buffer += content
-                    # Yield only when a double newline is found (end of Markdown block)
-                    while "\n\n" in buffer:
-                        block, buffer = buffer.split("\n\n", 1)
-                        yield block + "\n\n"
-                # Yield any remaining content after the stream ends
-                if buffer.strip():
-                    yield buffer
-
-        return StreamingResponse(chunk_stream(), media_type="text/plain")
+            return prompt
+
+        return await cached_chunk_streams(request, [chunk_prompt(chunk) for chunk in chunks], max_tokens=4096)
     except SummaryError as e:
         raise e
     except Exception as e:
@@ -125,12 +137,10 @@ async def qna_stream(request: Request):
         if not transcript:
             raise SummaryError("Transcript is required.")
 
-        max_chunk_chars = 12000
-        chunks = [transcript[i:i+max_chunk_chars] for i in range(0, len(transcript), max_chunk_chars)]
+        chunks = await asyncio.to_thread(chunk_text, transcript, QNA_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
 
-        def chunk_stream():
-            for chunk in chunks:
-                prompt = f"""
+        def chunk_prompt(chunk):
+            return f"""
 You are an expert AI tutor creating study material for learners mastering complex technical concepts.
 
 Based on the following transcript, generate a thoughtful set of educational **question-and-answer pairs**:
@@ -157,25 +167,8 @@ Guidelines:
 - Ignore repeated or filler phrases from the transcript; focus on unique mathematical explanations and problem-solving steps.
 - Minimize motivational or generic language; focus on clear, logical, and example-driven teaching.
 """
-                stream = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    stream=True,
-                    max_tokens=2048
-                )
-                buffer = ""
-                for chunk in stream:
-                    content = chunk.choices[0].delta.content or ""
-                    buffer += content
-                    # Yield only when a double newline is found (end of Markdown block)
-                    while "\n\n" in buffer:
-                        block, buffer = buffer.split("\n\n", 1)
-                        yield block + "\n\n"
-                # Yield any remaining content after the stream ends
-                if buffer.strip():
-                    yield buffer
-
-        return StreamingResponse(chunk_stream(), media_type="text/plain")
+
+        return await cached_chunk_streams(request, [chunk_prompt(chunk) for chunk in chunks], max_tokens=2048)
     except SummaryError as e:
         raise e
     except Exception as e:
@@ -183,7 +176,7 @@ Guidelines:
         raise SummaryError(str(e))
 
 @router.post('/extract')
-async def extract_key_info(request: Request):
+async def extract_key_info(request: Request, response: Response):
     data = await request.json()
     text = data.get('text', '')
     if not text:
@@ -200,13 +193,14 @@ async def extract_key_info(request: Request):
     )
 
     try:
-        response = client.chat.completions.create(
+        result, status = await cached_chat_completion(
             model="gpt-3.5-turbo",
+            cache=use_cache(request),
             messages=[{"role": "user", "content": prompt}],
             max_tokens=600,
             temperature=0.3,
         )
-        result = response.choices[0].message.content
+        response.headers["X-Cache"] = status
         return {"extracted": result}
     except Exception as e:
         return JSONResponse({'error': str(e)}, status_code=500)
\ No newline at end of file
@@ -1,25 +1,38 @@
-from fastapi import APIRouter, Request, File, UploadFile, HTTPException, Query
+from fastapi import APIRouter, Request, HTTPException, Query
 from fastapi.responses import StreamingResponse, JSONResponse
 import asyncio
 import json
 import requests
-import io
+import hashlib
 import tempfile
 import os
 from PyPDF2 import PdfReader
 from docx import Document
-from config import YOUTUBE_API_KEY, OPENAI_API_KEY
+from config import PLAYLIST_CAPTION_PREFILTER
 from utils.url_utils import extract_video_id, extract_playlist_id, normalize_youtube_url
-from utils.text_utils import clean_transcript_text, parse_vtt_content, format_transcript, parse_vtt_with_timestamps, clean_and_aggregate_transcript
-from utils.youtube_utils import get_transcript_via_ytdlp, get_transcript_via_audio, generate_title, split_audio_ffmpeg, split_mp4_ffmpeg, get_transcript_from_worker
+from utils.text_utils import clean_transcript_text, parse_vtt_content, format_transcript, parse_vtt_with_timestamps, clean_and_aggregate_transcript, clean_worker_transcript
+from utils.youtube_utils import get_transcript_via_ytdlp, get_transcript_via_audio, download_audio_ytdlp, generate_title, get_transcript_from_worker
+from utils.audio_utils import iter_audio_chunks, iter_streamed_audio_chunks, remove_audio_chunks, normalize_audio
+from utils.transcript_cache import transcript_cache, transcript_cache_key
+from utils.playlist_utils import stream_playlist_events
+from utils.job_registry import job_registry, parse_last_event_id
+from utils.single_flight import SingleFlight
+from utils.worker_client import worker_pool
+from utils.sse_utils import transcript_chunk_events, batch_events
+from utils.transcript_tiers import transcript_chain
+from utils.whisper_utils import transcribe_audio_file, transcribe_chunks_in_order, iter_transcribed_chunks
+from utils.whisper_cache import whisper_cache, audio_cache_key, HashingStream
+from utils.upload_utils import spool_upload, UploadRejected
+from utils.upload_sessions import upload_registry
 from exceptions.custom_exceptions import TranscriptError
-from openai import OpenAI
 import logging
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 router = APIRouter()
-client = OpenAI(api_key=OPENAI_API_KEY)
+
+# Formats ffmpeg can decode from a pipe while they download (MP4/M4A need to seek to their index)
+STREAMABLE_AUDIO_EXTENSIONS = ['mp3', 'wav', 'aac', 'ogg', 'oga', 'flac', 'webm', 'mpeg', 'mpga', 'wma', 'aiff']
 
 def is_audio_file_url(url: str) -> bool:
     """Check if URL points to a direct audio file"""
@@ -44,11 +57,29 @@ def is_audio_platform_url(url: str) -> bool:
     except:
         return False
 
+async def stream_cached_transcript(entry: dict):
+    """Stream a transcript served from the transcript cache"""
+    yield f"data: {json.dumps({'type': 'progress', 'message': 'Transcript found in cache, processing...'})}\n\n"
+    transcript = entry["transcript"]
+    title = entry.get("title") or await generate_title(transcript)
+    yield f"data: {json.dumps({'type': 'title', 'content': title})}\n\n"
+
+    for event in transcript_chunk_events(transcript):
+        yield event
+
+    yield f"data: {json.dumps({'type': 'complete', 'method': entry.get('method') or 'cache', 'cached': True})}\n\n"
+
 async def stream_audio_file_transcript(url: str):
     """Stream transcript from direct audio file URL"""
     try:
+        cache_key = transcript_cache_key(url)
+        cached = await asyncio.to_thread(transcript_cache.get, cache_key)
+        if cached:
+            async for event in stream_cached_transcript(cached):
+                yield event
+            return
+
         yield f"data: {json.dumps({'type': 'progress', 'message': 'Downloading audio file...'})}\n\n"
-        await asyncio.sleep(0.1)
         
         # Download the audio file with proper headers and redirect handling
         headers = {
@@ -102,11 +133,9 @@ async def stream_audio_file_transcript(url: str):
         
         # Handle Google Drive confirmation page for large files
         if 'drive.google.com' in url.lower() and 'text/html' in response.headers.get('content-type', '').lower():
-            # Check if we got a confirmation page
-            content = b''
-            for chunk in response.iter_content(chunk_size=8192):
-                content += chunk
-            content_str = content.decode('utf-8', errors='ignore')
+            # Check if we got a confirmation page; the token sits near the top, so only sniff the first few KB
+            head = await asyncio.to_thread(next, response.iter_content(chunk_size=16 * 1024), b'')
+            content_str = head.decode('utf-8', errors='ignore')
             
             if 'confirm=' in content_str:
                 # Extract the confirmation token
@@ -148,116 +177,66 @@ async def stream_audio_file_transcript(url: str):
         if file_extension not in valid_extensions:
             file_extension = 'mp3'  # Default to mp3 if invalid
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as temp_file:
-            # Download the file
-            total_size = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                temp_file.write(chunk)
-                total_size += len(chunk)
-            
-            temp_file_path = temp_file.name
+        max_size = 24 * 1024 * 1024  # 24MB for safety
+        content_length = int(response.headers.get('content-length') or 0)
+        
+        if file_extension in STREAMABLE_AUDIO_EXTENSIONS and (not content_length or content_length > max_size):
+            # Pipe the download straight into ffmpeg and transcribe chunks while the rest is still arriving
+            yield f"data: {json.dumps({'type': 'progress', 'message': 'Streaming audio file into transcription...'})}\n\n"
+            with tempfile.TemporaryDirectory() as temp_dir:
+                try:
+                    # Fingerprint the download as it is piped, so the next copy of this file hits the Whisper cache
+                    body = HashingStream(response.iter_content(chunk_size=64 * 1024))
+                    chunks = iter_streamed_audio_chunks(body, os.path.join(temp_dir, 'stream'), max_size)
+                    async for event in stream_chunked_audio_transcript(chunks, cache_key, lambda: body.hexdigest()):
+                        yield event
+                finally:
+                    response.close()
+            return
+        
+        # MP4/M4A usually keep their index at the end of the file, so ffmpeg needs the whole file on disk
+        temp_file_path, total_size, digest = await asyncio.to_thread(download_to_temp_file, response, f".{file_extension}")
         
         try:
+            # The same audio may already have been transcribed under another URL or as an upload
+            known = await asyncio.to_thread(whisper_cache.get, audio_cache_key(digest))
+            if known:
+                known["title"] = await generate_title(known["transcript"])
+                await asyncio.to_thread(transcript_cache.set, cache_key, known["transcript"], 'audio_file', known["title"])
+                async for event in stream_cached_transcript(known):
+                    yield event
+                return
+
             yield f"data: {json.dumps({'type': 'progress', 'message': f'Processing audio file ({total_size // 1024 // 1024}MB)...'})}\n\n"
-            await asyncio.sleep(0.1)
             
             # Check file size and chunk if necessary
             file_size = os.path.getsize(temp_file_path)
-            max_size = 24 * 1024 * 1024  # 24MB for safety
             
             if file_size > max_size:
                 yield f"data: {json.dumps({'type': 'progress', 'message': 'Large file detected, chunking for processing...'})}\n\n"
-                await asyncio.sleep(0.1)
-                
-                # Use appropriate chunking method
-                if file_extension in ['mp4', 'm4a']:
-                    chunk_paths = split_mp4_ffmpeg(temp_file_path, max_size)
-                else:
-                    chunk_paths = split_audio_ffmpeg(temp_file_path, max_size)
-                
-                full_transcript = ""
                 
-                for i, chunk_path in enumerate(chunk_paths):
-                    try:
-                        yield f"data: {json.dumps({'type': 'progress', 'message': f'Transcribing chunk {i+1}/{len(chunk_paths)}...'})}\n\n"
-                        await asyncio.sleep(0.1)
-                        
-                        with open(chunk_path, "rb") as audio_file:
-                            transcription = await asyncio.to_thread(
-                                client.audio.transcriptions.create,
-                                model="whisper-1",
-                                file=audio_file,
-                                response_format="text"
-                            )
-                        
-                        if transcription:
-                            full_transcript += transcription + "\n"
-                            # Stream the chunk
-                            chunk_size = 400
-                            words = transcription.split(' ')
-                            current_chunk = ""
-                            
-                            for word in words:
-                                if len(current_chunk + word + " ") <= chunk_size:
-                                    current_chunk += word + " "
-                                else:
-                                    if current_chunk.strip():
-                                        yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                                        await asyncio.sleep(0.03)
-                                    current_chunk = word + " "
-                            
-                            if current_chunk.strip():
-                                yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                        
-                        # Clean up chunk file
-                        if chunk_path != temp_file_path:
-                            os.remove(chunk_path)
-                            
-                    except Exception as chunk_error:
-                        logging.error(f"Error transcribing chunk {i+1}: {str(chunk_error)}")
-                        if chunk_path != temp_file_path and os.path.exists(chunk_path):
-                            os.remove(chunk_path)
-                
-                if full_transcript.strip():
-                    title = await asyncio.to_thread(generate_title, full_transcript)
-                    yield f"data: {json.dumps({'type': 'title', 'content': title})}\n\n"
-                    yield f"data: {json.dumps({'type': 'complete', 'method': 'audio_file'})}\n\n"
-                else:
-                    yield f"data: {json.dumps({'type': 'error', 'message': 'No transcript generated from audio file'})}\n\n"
+                try:
+                    async for event in stream_chunked_audio_transcript(iter_audio_chunks(temp_file_path, max_size), cache_key, lambda: digest):
+                        yield event
+                finally:
+                    # Remove chunks left behind if the client went away mid-stream
+                    remove_audio_chunks(temp_file_path)
                     
             else:
                 # Small file, transcribe directly
                 yield f"data: {json.dumps({'type': 'progress', 'message': 'Transcribing audio file...'})}\n\n"
-                await asyncio.sleep(0.1)
                 
-                with open(temp_file_path, "rb") as audio_file:
-                    transcription = await asyncio.to_thread(
-                        client.audio.transcriptions.create,
-                        model="whisper-1",
-                        file=audio_file,
-                        response_format="text"
-                    )
+                transcription = await transcribe_small_audio_file(temp_file_path)
                 
                 if transcription:
-                    title = await asyncio.to_thread(generate_title, transcription)
+                    title = await generate_title(transcription)
+                    await asyncio.to_thread(transcript_cache.set, cache_key, transcription, 'audio_file', title)
+                    await asyncio.to_thread(whisper_cache.set, audio_cache_key(digest), transcription, 'audio_file')
                     yield f"data: {json.dumps({'type': 'title', 'content': title})}\n\n"
                     
                     # Stream the transcript
-                    chunk_size = 400
-                    words = transcription.split(' ')
-                    current_chunk = ""
-                    
-                    for word in words:
-                        if len(current_chunk + word + " ") <= chunk_size:
-                            current_chunk += word + " "
-                        else:
-                            if current_chunk.strip():
-                                yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                                await asyncio.sleep(0.03)
-                            current_chunk = word + " "
-                    
-                    if current_chunk.strip():
-                        yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
+                    for event in transcript_chunk_events(transcription):
+                        yield event
                     
                     yield f"data: {json.dumps({'type': 'complete', 'method': 'audio_file'})}\n\n"
                 else:
@@ -272,170 +251,185 @@ async def stream_audio_file_transcript(url: str):
         logging.error(f"Error in audio file streaming: {str(e)}")
         yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
 
-async def stream_single_video_transcript(url: str):
-    try:
-        yield f"data: {json.dumps({'type': 'progress', 'message': 'Checking for subtitles...'})}\n\n"
-        await asyncio.sleep(0.1)
-        
-        subtitle_result = await asyncio.to_thread(get_transcript_via_ytdlp, url)
-        
-        if subtitle_result.get("content"):
-            transcript = clean_transcript_text(parse_vtt_content(subtitle_result["content"]))
-            logging.info(f"Subtitle transcript length after cleaning: {len(transcript)}")
-            if transcript.strip():
-                yield f"data: {json.dumps({'type': 'progress', 'message': 'Subtitles found, processing...'})}\n\n"
-                await asyncio.sleep(0.1)
-                
-                title = generate_title(transcript)
-                yield f"data: {json.dumps({'type': 'title', 'content': title})}\n\n"
-                
-                chunk_size = 400
-                words = transcript.split(' ')
-                current_chunk = ""
-                
-                for word in words:
-                    if len(current_chunk + word + " ") <= chunk_size:
-                        current_chunk += word + " "
-                    else:
-                        if current_chunk.strip():
-                            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                            await asyncio.sleep(0.03)
-                        current_chunk = word + " "
-                
-                if current_chunk.strip():
-                    yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                
-                yield f"data: {json.dumps({'type': 'complete', 'method': 'subtitles'})}\n\n"
-                return
-            else:
-                logging.warning("Subtitle transcript is empty after cleaning, falling back to audio")
-        
-        yield f"data: {json.dumps({'type': 'progress', 'message': 'No subtitles found or empty, downloading audio...'})}\n\n"
-        await asyncio.sleep(0.1)
+async def stream_chunked_audio_transcript(chunks, cache_key: str | None, content_digest=None):
+    """
+    Transcribe audio chunks as they are cut and stream the text back in order.
+    `content_digest()` returns the SHA-256 of the whole source once it has been read; a
+    complete transcript is then also stored under it in the Whisper cache. Without a
+    `cache_key` the transcript is not stored in the transcript cache.
+    """
+    full_transcript = ""
+    failed_chunks = 0
+    
+    # Chunks are transcribed concurrently while later ones are still being cut; results are released in order
+    async for i, chunk_path, transcription, chunk_error in transcribe_chunks_in_order(chunks):
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
         
-        audio_result = await asyncio.to_thread(get_transcript_via_audio, url)
+        if chunk_error:
+            failed_chunks += 1
+            yield f"data: {json.dumps({'type': 'progress', 'message': f'Failed to transcribe chunk {i+1}, skipping...'})}\n\n"
+            continue
         
-        if audio_result.get("content"):
-            transcript = clean_transcript_text(audio_result["content"])
-            logging.info(f"Audio transcript length after cleaning: {len(transcript)}")
-            if transcript.strip():
-                yield f"data: {json.dumps({'type': 'progress', 'message': 'Audio transcribed, processing...'})}\n\n"
-                
-                title = generate_title(transcript)
-                yield f"data: {json.dumps({'type': 'title', 'content': title})}\n\n"
-                
-                chunk_size = 400
-                words = transcript.split(' ')
-                current_chunk = ""
-                
-                for word in words:
-                    if len(current_chunk + word + " ") <= chunk_size:
-                        current_chunk += word + " "
-                    else:
-                        if current_chunk.strip():
-                            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                            await asyncio.sleep(0.03)
-                        current_chunk = word + " "
-                
-                if current_chunk.strip():
-                    yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                
-                yield f"data: {json.dumps({'type': 'complete', 'method': 'audio'})}\n\n"
-                return
-            else:
-                logging.warning("Audio transcript is empty after processing")
-                yield f"data: {json.dumps({'type': 'error', 'message': 'Audio transcript is empty after processing'})}\n\n"
-        else:
-            logging.error(f"Audio transcription failed: {audio_result.get('error', 'Unknown error')}")
-            yield f"data: {json.dumps({'type': 'error', 'message': 'No transcript available for this video'})}\n\n"
+        yield f"data: {json.dumps({'type': 'progress', 'message': f'Transcribed chunk {i+1}'})}\n\n"
         
-    except Exception as e:
-        logging.error(f"Error in single video streaming: {str(e)}")
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        if transcription:
+            full_transcript += transcription + "\n"
+            # Stream the chunk
+            for event in transcript_chunk_events(transcription):
+                yield event
+    
+    if full_transcript.strip():
+        title = await generate_title(full_transcript)
+        if cache_key:
+            await asyncio.to_thread(transcript_cache.set, cache_key, full_transcript, 'audio_file', title)
+        digest = content_digest() if content_digest and not failed_chunks else None
+        if digest:
+            await asyncio.to_thread(whisper_cache.set, audio_cache_key(digest), full_transcript, 'audio_file')
+        yield f"data: {json.dumps({'type': 'title', 'content': title})}\n\n"
+        yield f"data: {json.dumps({'type': 'complete', 'method': 'audio_file'})}\n\n"
+    else:
+        yield f"data: {json.dumps({'type': 'error', 'message': 'No transcript generated from audio file'})}\n\n"
+
+async def transcribe_small_audio_file(path: str) -> str:
+    """Shrink a file that fits in a single Whisper request, then transcribe it"""
+    upload_path = await asyncio.to_thread(normalize_audio, path)
+    try:
+        return await asyncio.to_thread(transcribe_audio_file, upload_path)
+    finally:
+        if upload_path != path and os.path.exists(upload_path):
+            os.remove(upload_path)
+
+def download_to_temp_file(response, suffix: str) -> tuple[str, int, str]:
+    """Write a streamed HTTP response to a temporary file and return its path, size and SHA-256 (hashed while writing)"""
+    total_size = 0
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        for chunk in response.iter_content(chunk_size=1024 * 1024):
+            temp_file.write(chunk)
+            digest.update(chunk)
+            total_size += len(chunk)
+    return temp_file.name, total_size, digest.hexdigest()
 
-async def stream_playlist_transcript(playlist_id: str):
+async def stream_single_video_transcript(url: str):
     try:
-        page_token = ""
-        video_count = 0
-        success_count = 0
-        
-        yield f"data: {json.dumps({'type': 'progress', 'message': 'Fetching playlist videos...'})}\n\n"
-        
-        while True:
-            yt_api_url = (
-                f"https://www.googleapis.com/youtube/v3/playlistItems?part=snippet&maxResults=50"
-                f"&playlistId={playlist_id}&key={YOUTUBE_API_KEY}"
-            )
-            if page_token:
-                yt_api_url += f"&pageToken={page_token}"
-
-            response = await asyncio.to_thread(requests.get, yt_api_url)
+        cache_key = transcript_cache_key(url)
+        cached = await asyncio.to_thread(transcript_cache.get, cache_key)
+        if cached:
+            async for event in stream_cached_transcript(cached):
+                yield event
+            return
+
+        # Captions API, yt-dlp subtitles, worker, then audio + Whisper; see utils/transcript_tiers.py
+        async for step in transcript_chain.acquire(url):
+            if step["type"] == "attempt":
+                yield f"data: {json.dumps({'type': 'progress', 'message': step['message'], 'tier': step['tier']})}\n\n"
+                continue
             
-            if response.status_code != 200:
-                yield f"data: {json.dumps({'type': 'error', 'message': 'Failed to fetch playlist items'})}\n\n"
+            if step.get("error"):
+                logging.error(f"All transcript tiers failed for {url}: {step['attempts']}")
+                yield f"data: {json.dumps({'type': 'error', 'message': step['error'], 'attempts': step['attempts']})}\n\n"
                 return
-
-            data = response.json()
-            items = data.get("items", [])
             
-            for item in items:
-                video_count += 1
-                video_id = item["snippet"]["resourceId"]["videoId"]
-                video_title = item["snippet"]["title"]
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                
-                yield f"data: {json.dumps({'type': 'progress', 'message': f'Processing video {video_count}: {video_title}'})}\n\n"
-                
-                try:
-                    subtitle_result = await asyncio.to_thread(get_transcript_via_ytdlp, video_url)
-                    
-                    if subtitle_result.get("content"):
-                        success_count += 1
-                        transcript = clean_transcript_text(parse_vtt_content(subtitle_result["content"]))
-                        video_header = f"=== {video_title} ===\n\n"
-                        yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': video_header})}\n\n"
-                        
-                        chunk_size = 400
-                        words = transcript.split(' ')
-                        current_chunk = ""
-                        
-                        for word in words:
-                            if len(current_chunk + word + " ") <= chunk_size:
-                                current_chunk += word + " "
-                            else:
-                                if current_chunk.strip():
-                                    yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                                    await asyncio.sleep(0.02)
-                                current_chunk = word + " "
-                        
-                        if current_chunk.strip():
-                            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': current_chunk.strip()})}\n\n"
-                        
-                        separator = f"\n\n{'='*50}\n\n"
-                        yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': separator})}\n\n"
-                        
-                        yield f"data: {json.dumps({'type': 'progress', 'message': f'✓ Completed: {video_title}'})}\n\n"
-                    else:
-                        yield f"data: {json.dumps({'type': 'progress', 'message': f'✗ Failed: {video_title}'})}\n\n"
-                except Exception as e:
-                    yield f"data: {json.dumps({'type': 'progress', 'message': f'✗ Error with {video_title}: {str(e)}'})}\n\n"
-                    continue
-
-            if "nextPageToken" in data:
-                page_token = data["nextPageToken"]
-            else:
-                break
-
-        summary = f"Playlist processing complete! Successfully transcribed {success_count}/{video_count} videos"
-        yield f"data: {json.dumps({'type': 'complete', 'message': summary, 'stats': {'total': video_count, 'success': success_count}})}\n\n"
+            transcript = step["transcript"]
+            logging.info(f"Transcript from tier {step['tier']}, length after cleaning: {len(transcript)}")
+            yield f"data: {json.dumps({'type': 'progress', 'message': 'Transcript found, processing...', 'tier': step['tier']})}\n\n"
+            
+            title = await generate_title(transcript)
+            await asyncio.to_thread(transcript_cache.set, cache_key, transcript, step["method"], title)
+            yield f"data: {json.dumps({'type': 'title', 'content': title})}\n\n"
+            
+            for event in transcript_chunk_events(transcript):
+                yield event
+            
+            yield f"data: {json.dumps({'type': 'complete', 'method': step['method'], 'tier': step['tier'], 'attempts': step['attempts']})}\n\n"
+        
     except Exception as e:
-        logging.error(f"Error in playlist streaming: {str(e)}")
+        logging.error(f"Error in single video streaming: {str(e)}")
         yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
 
+async def fetch_playlist_video_subtitles(video_url: str, video_title: str, captions: bool | None = None) -> dict:
+    """
+    Subtitle transcript for one playlist video, served from the transcript cache when possible.
+    With PLAYLIST_CAPTION_PREFILTER, videos that `videos.list` reported without captions go
+    straight to audio transcription; it is off by default because auto-generated captions,
+    which yt-dlp can fetch for free, are not reported.
+    """
+    cache_key = transcript_cache_key(video_url)
+    cached = await asyncio.to_thread(transcript_cache.get, cache_key)
+    if cached:
+        return {"transcript": cached["transcript"], "method": cached.get("method"), "cached": True}
+    
+    if captions is False and PLAYLIST_CAPTION_PREFILTER:
+        logging.info(f"No captions listed for {video_url}, transcribing audio")
+        audio_result = await asyncio.to_thread(get_transcript_via_audio, video_url)
+        if audio_result.get("content", "").strip():
+            transcript = audio_result["content"]
+            await asyncio.to_thread(transcript_cache.set, cache_key, transcript, 'audio', video_title)
+            return {"transcript": transcript, "method": "audio"}
+        return {"error": audio_result.get("error", "Audio transcription produced no text")}
+    
+    subtitle_result = await asyncio.to_thread(get_transcript_via_ytdlp, video_url)
+    if subtitle_result.get("content"):
+        transcript = clean_transcript_text(parse_vtt_content(subtitle_result["content"]))
+        await asyncio.to_thread(transcript_cache.set, cache_key, transcript, 'subtitles', video_title)
+        return {"transcript": transcript, "method": "subtitles"}
+    return {"error": subtitle_result.get("error", "No subtitles found")}
+
+async def fetch_playlist_video_from_worker(video_url: str, video_title: str, captions: bool | None = None) -> dict:
+    """
+    Worker transcript for one playlist video, served from the transcript cache when possible.
+    The worker picks its own method, so the caption flag is not used here.
+    """
+    cache_key = transcript_cache_key(video_url)
+    cached = await asyncio.to_thread(transcript_cache.get, cache_key)
+    if cached:
+        return {"transcript": cached["transcript"], "method": cached.get("method"), "cached": True}
+    
+    result = await get_transcript_from_worker(video_url)
+    if result.get("transcript"):
+        transcript_text = clean_worker_transcript(result["transcript"], result.get("method"))
+        await asyncio.to_thread(transcript_cache.set, cache_key, transcript_text, result.get("method", "worker"), video_title)
+        return {"transcript": transcript_text, "method": result.get("method", "worker")}
+    return {"error": result.get("error", "Unknown error")}
+
+def stream_playlist_transcript(playlist_id: str):
+    """Stream subtitle transcripts for every video of a playlist, several videos at a time"""
+    return stream_playlist_events(playlist_id, fetch_playlist_video_subtitles)
+
+single_transcript_flight = SingleFlight()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+}
+
+def stream_job_events(job, last_event_id: int = 0):
+    """SSE response following a background transcript job from `last_event_id` on"""
+    return StreamingResponse(
+        batch_events(job.subscribe(last_event_id)),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Job-ID": job.id}
+    )
+
 @router.post("/stream")
 async def stream_video_transcript(request: Request):
+    """
+    Start a background transcript job for `url` and stream its events. The job keeps running
+    if the client disconnects; reconnect with the `X-Job-ID` response header (or `job_id`
+    in the body) plus `Last-Event-ID` to receive the events that were missed.
+    """
     try:
         body = await request.json()
+        job_id = body.get("job_id") or request.headers.get("x-job-id")
+        if job_id:
+            job = job_registry.get(job_id)
+            if not job:
+                raise HTTPException(status_code=404, detail="Transcript job not found or expired")
+            logging.info(f"Reattaching to transcript job {job_id}")
+            return stream_job_events(job, parse_last_event_id(request.headers.get("last-event-id")))
+        
         url = body.get("url")
         if not url:
             raise TranscriptError("URL is required")
@@ -445,61 +439,77 @@ async def stream_video_transcript(request: Request):
         # Check if it's a direct audio file URL
         if is_audio_file_url(url):
             logging.info(f"Detected direct audio file URL: {url}")
-            return StreamingResponse(
-                stream_audio_file_transcript(url),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                }
-            )
-        
+            key, make_events = transcript_cache_key(url), lambda: stream_audio_file_transcript(url)
         # Check if it's an audio platform URL
-        if is_audio_platform_url(url):
+        elif is_audio_platform_url(url):
             logging.info(f"Detected audio platform URL: {url}")
-            return StreamingResponse(
-                stream_audio_file_transcript(url),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                }
-            )
-        
+            key, make_events = transcript_cache_key(url), lambda: stream_audio_file_transcript(url)
         # Check for YouTube playlist
-        playlist_id = extract_playlist_id(url)
-        if playlist_id:
+        elif playlist_id := extract_playlist_id(url):
             logging.info(f"Detected YouTube playlist ID: {playlist_id}")
-            return StreamingResponse(
-                stream_playlist_transcript(playlist_id),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                }
-            )
+            key, make_events = f"playlist:{playlist_id}", lambda: stream_playlist_transcript(playlist_id)
         else:
             logging.info(f"No YouTube playlist detected, processing as single video: {url}")
-            return StreamingResponse(
-                stream_single_video_transcript(normalize_youtube_url(url)),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                }
-            )
-    except TranscriptError as e:
+            video_url = normalize_youtube_url(url)
+            key, make_events = transcript_cache_key(video_url), lambda: stream_single_video_transcript(video_url)
+        
+        # Identical requests arriving while a job is running share it and get its events replayed
+        job, _ = job_registry.start_or_join(key, make_events)
+        return stream_job_events(job)
+    except HTTPException as e:
         raise e
     except Exception as e:
         logging.error(f"Error setting up transcript stream: {str(e)}")
         raise TranscriptError(str(e))
 
+@router.get("/jobs/{job_id}")
+def get_transcript_job(job_id: str):
+    """Status of a background transcript job: running or complete, and its event ids."""
+    job = job_registry.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcript job not found or expired")
+    return job.status()
+
+@router.get("/jobs/{job_id}/events")
+def get_transcript_job_events(job_id: str, request: Request, last_event_id: int | None = None):
+    """
+    Reattach to a background transcript job. Replays events after the `Last-Event-ID` header
+    (or `last_event_id` query parameter), then follows the job live. Works with EventSource.
+    """
+    job = job_registry.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcript job not found or expired")
+    if last_event_id is None:
+        last_event_id = parse_last_event_id(request.headers.get("last-event-id"))
+    return stream_job_events(job, last_event_id)
+
+@router.get("/cache/stats")
+def get_transcript_cache_stats():
+    """
+    Hit/miss counters for this worker's transcript cache plus the size of the shared disk tier.
+    """
+    return transcript_cache.stats()
+
+@router.get("/tiers/stats")
+def get_transcript_tier_stats():
+    """
+    Current tier order plus attempts, recent success rate and average latency of every tier.
+    """
+    return transcript_chain.stats()
+
+@router.get("/workers/stats")
+def get_worker_stats():
+    """
+    Requests in flight, error counts and circuit-breaker state of every transcription worker.
+    """
+    return worker_pool.stats()
+
 @router.get("/single")
-def get_youtube_transcript(url: str):
+async def get_youtube_transcript(url: str, stream: bool = False):
+    """
+    Transcript of one video from the home worker. With `stream=true` the response is an SSE
+    stream that forwards the worker's progress and partial transcript as they arrive.
+    """
     try:
         logging.info(f"Received request for transcript with URL: {url}")
         
@@ -518,27 +528,19 @@ def get_youtube_transcript(url: str):
 
         logging.info(f"Extracted video ID: {video_id}")
         
-        # Use the worker for transcript extraction
-        transcript_result = get_transcript_from_worker(url)
-        if transcript_result.get("transcript"):
-            # If the method is subtitles, parse as plaintext paragraphs and aggregate
-            if transcript_result.get("method") == "subtitles":
-                logging.info(f"Processing subtitles transcript, method: {transcript_result.get('method')}")
-                logging.info(f"Raw transcript (first 200 chars): {transcript_result['transcript'][:200]}")
-                transcript = parse_vtt_content(transcript_result["transcript"])
-                logging.info(f"After parse_vtt_content (first 200 chars): {transcript[:200]}")
-                transcript = clean_and_aggregate_transcript(transcript)
-                logging.info(f"After clean_and_aggregate_transcript (first 200 chars): {transcript[:200]}")
-                logging.info(f"Returning cleaned/aggregated transcript (first 500 chars): {transcript[:500]}")
-            else:
-                transcript = transcript_result["transcript"]
-                logging.info(f"Returning plain transcript (first 500 chars): {transcript[:500]}")
+        cache_key = transcript_cache_key(url)
+        if stream:
+            return stream_worker_job(url, cache_key)
+        cached = await asyncio.to_thread(transcript_cache.get, cache_key)
+        if cached:
+            logging.info(f"Returning cached transcript for {cache_key}")
             return {
-                "transcript": transcript,
-                "method": transcript_result.get("method", "worker"),
+                "transcript": cached["transcript"],
+                "method": cached.get("method") or "worker",
             }
-        else:
-            raise TranscriptError(transcript_result.get("error", "Failed to get transcript from worker."))
+        
+        # Concurrent requests for the same video wait for one worker call
+        return await single_transcript_flight.do(cache_key, fetch_single_transcript, url, cache_key)
     
     except TranscriptError as e:
         raise e
@@ -546,339 +548,300 @@ def get_youtube_transcript(url: str):
         logging.error(f"Unexpected error: {str(e)}")
         raise TranscriptError(str(e))
 
-@router.get("/playlist")
-def get_playlist_transcript(playlist_id: str):
+async def stream_worker_transcript(url: str, cache_key: str):
     """
-    Streams playlist transcript extraction, yielding each video's transcript as it's processed.
+    SSE events for a worker transcript. Progress and partial transcript chunks are forwarded
+    as the worker produces them; workers without streaming support yield the whole transcript
+    at the end. The final transcript is stored in the transcript cache.
     """
-    from fastapi.responses import StreamingResponse
-    import json
-    from utils.youtube_utils import get_transcript_from_worker
+    cached = await asyncio.to_thread(transcript_cache.get, cache_key)
+    if cached:
+        for event in transcript_chunk_events(cached["transcript"]):
+            yield event
+        yield f"data: {json.dumps({'type': 'complete', 'method': cached.get('method') or 'worker', 'cached': True})}\n\n"
+        return
     
-    def stream_playlist():
-        try:
-            page_token = ""
-            video_count = 0
-            success_count = 0
-            failed_videos = []
-
-            logging.info(f"Starting playlist transcript extraction for playlist ID: {playlist_id}")
-            yield f"data: {json.dumps({'type': 'progress', 'message': 'Starting playlist processing...'})}\n\n"
-
-            while True:
-                yt_api_url = (
-                    f"https://www.googleapis.com/youtube/v3/playlistItems?part=snippet&maxResults=50"
-                    f"&playlistId={playlist_id}&key={YOUTUBE_API_KEY}"
-                )
-                if page_token:
-                    yt_api_url += f"&pageToken={page_token}"
-
-                logging.info(f"Fetching playlist items from URL: {yt_api_url}")
-                response = requests.get(yt_api_url)
-
-                if response.status_code != 200:
-                    logging.error(f"Failed to fetch playlist items: {response.text}")
-                    yield f"data: {json.dumps({'type': 'error', 'message': 'Failed to fetch playlist items from YouTube API.'})}\n\n"
-                    return
+    yield f"data: {json.dumps({'type': 'progress', 'message': 'Sending video to transcription worker...'})}\n\n"
+    chunks = []
+    async for event in worker_pool.stream_transcribe(url):
+        if event.get("type") == "transcript_chunk":
+            chunks.append(event.get("content", ""))
+            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': event.get('content', '')})}\n\n"
+        elif event.get("type") == "progress":
+            yield f"data: {json.dumps({'type': 'progress', 'message': event.get('message', '')})}\n\n"
+        elif event.get("type") == "complete":
+            method = event.get("method", "worker")
+            if chunks:
+                transcript = event.get("transcript") or "".join(chunks)
+            else:
+                # Blocking worker: the whole transcript arrives at once
+                transcript = clean_worker_transcript(event.get("transcript", ""), method)
+                for event in transcript_chunk_events(transcript):
+                    yield event
+            await asyncio.to_thread(transcript_cache.set, cache_key, transcript, method)
+            yield f"data: {json.dumps({'type': 'complete', 'method': method})}\n\n"
+            return
+        elif event.get("type") == "error":
+            yield f"data: {json.dumps({'type': 'error', 'message': event.get('message', 'Failed to get transcript from worker.')})}\n\n"
+            return
 
-                data = response.json()
-                items = data.get("items", [])
-                
-                logging.info(f"Found {len(items)} videos in this batch")
+def stream_worker_job(url: str, cache_key: str):
+    """Run a streamed worker transcript as a shared, resumable job"""
+    job, _ = job_registry.start_or_join(f"worker:{cache_key}", lambda: stream_worker_transcript(url, cache_key))
+    return stream_job_events(job)
+
+async def fetch_single_transcript(url: str, cache_key: str) -> dict:
+    """Get one video's transcript from the worker, clean it up and store it in the transcript cache"""
+    # Use the worker for transcript extraction
+    transcript_result = await get_transcript_from_worker(url)
+    if transcript_result.get("transcript"):
+        # If the method is subtitles, parse as plaintext paragraphs and aggregate
+        if transcript_result.get("method") == "subtitles":
+            logging.info(f"Processing subtitles transcript, method: {transcript_result.get('method')}")
+            logging.info(f"Raw transcript (first 200 chars): {transcript_result['transcript'][:200]}")
+            transcript = parse_vtt_content(transcript_result["transcript"])
+            logging.info(f"After parse_vtt_content (first 200 chars): {transcript[:200]}")
+            transcript = clean_and_aggregate_transcript(transcript)
+            logging.info(f"After clean_and_aggregate_transcript (first 200 chars): {transcript[:200]}")
+            logging.info(f"Returning cleaned/aggregated transcript (first 500 chars): {transcript[:500]}")
+        else:
+            transcript = transcript_result["transcript"]
+            logging.info(f"Returning plain transcript (first 500 chars): {transcript[:500]}")
+        await asyncio.to_thread(transcript_cache.set, cache_key, transcript, transcript_result.get("method", "worker"))
+        return {
+            "transcript": transcript,
+            "method": transcript_result.get("method", "worker"),
+        }
+    else:
+        raise TranscriptError(transcript_result.get("error", "Failed to get transcript from worker."))
 
-                for item in items:
-                    video_count += 1
-                    video_id = item["snippet"]["resourceId"]["videoId"]
-                    video_title = item["snippet"]["title"]
-                    video_url = f"https://www.youtube.com/watch?v={video_id}"
-                    
-                    logging.info(f"Processing video {video_count}: {video_title} (ID: {video_id})")
-                    yield f"data: {json.dumps({'type': 'progress', 'message': f'Processing video {video_count}: {video_title}'})}\n\n"
-                    
-                    try:
-                        # Use the worker for each video
-                        result = get_transcript_from_worker(video_url)
-                        if result.get("transcript"):
-                            transcript_text = result["transcript"]
-                            # If subtitles, parse as plaintext paragraphs and aggregate
-                            if result.get("method") == "subtitles":
-                                transcript_text = parse_vtt_content(transcript_text)
-                                transcript_text = clean_and_aggregate_transcript(transcript_text)
-                            video_header = f"=== {video_title} ===\n\n"
-                            success_count += 1
-                            logging.info(f"✓ Successfully got transcript for: {video_title}")
-                            
-                            # Stream the video header and transcript
-                            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': video_header})}\n\n"
-                            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': transcript_text})}\n\n"
-                            chunk = '\n\n' + '='*50 + '\n\n'
-                            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': chunk})}\n\n"
-                        else:
-                            failed_videos.append({"title": video_title, "id": video_id, "error": result.get("error", "Unknown error")})
-                            logging.warning(f"✗ Could not get transcript for: {video_title} - {result.get('error', 'Unknown error')}")
-                            yield f"data: {json.dumps({'type': 'progress', 'message': f'✗ Failed: {video_title}'})}\n\n"
-                    except Exception as e:
-                        failed_videos.append({"title": video_title, "id": video_id, "error": str(e)})
-                        logging.warning(f"✗ Exception for {video_title}: {str(e)}")
-                        yield f"data: {json.dumps({'type': 'progress', 'message': f'✗ Exception: {video_title}'})}\n\n"
-
-                # Check for next page
-                page_token = data.get("nextPageToken", "")
-                if not page_token:
-                    break
-
-            logging.info(f"Playlist processing complete. Success: {success_count}, Failed: {len(failed_videos)}")
-            yield f"data: {json.dumps({'type': 'complete', 'success': success_count, 'failed': len(failed_videos), 'failed_videos': failed_videos})}\n\n"
-        except Exception as e:
-            logging.error(f"Playlist transcript extraction error: {str(e)}")
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-
-    return StreamingResponse(stream_playlist(), media_type="text/event-stream")
+@router.get("/playlist")
+def get_playlist_transcript(playlist_id: str):
+    """
+    Streams playlist transcript extraction, yielding each video's transcript as it's processed.
+    Videos are sent to the worker several at a time; events carry the playlist index.
+    """
+    logging.info(f"Starting playlist transcript extraction for playlist ID: {playlist_id}")
+    return StreamingResponse(
+        batch_events(stream_playlist_events(playlist_id, fetch_playlist_video_from_worker)),
+        media_type="text/event-stream"
+    )
 
 def stream_playlist_generator(playlist_id: str):
     """
-    Generator function for playlist streaming that can be yielded from.
+    Async generator for playlist streaming that can be iterated from other streams.
     """
-    try:
-        page_token = ""
-        video_count = 0
-        success_count = 0
-        failed_videos = []
-
-        logging.info(f"Starting playlist transcript extraction for playlist ID: {playlist_id}")
-        yield f"data: {json.dumps({'type': 'progress', 'message': 'Starting playlist processing...'})}\n\n"
-
-        while True:
-            yt_api_url = (
-                f"https://www.googleapis.com/youtube/v3/playlistItems?part=snippet&maxResults=50"
-                f"&playlistId={playlist_id}&key={YOUTUBE_API_KEY}"
-            )
-            if page_token:
-                yt_api_url += f"&pageToken={page_token}"
-
-            logging.info(f"Fetching playlist items from URL: {yt_api_url}")
-            response = requests.get(yt_api_url)
-
-            if response.status_code != 200:
-                logging.error(f"Failed to fetch playlist items: {response.text}")
-                yield f"data: {json.dumps({'type': 'error', 'message': 'Failed to fetch playlist items from YouTube API.'})}\n\n"
-                return
-
-            data = response.json()
-            items = data.get("items", [])
-            
-            logging.info(f"Found {len(items)} videos in this batch")
-
-            for item in items:
-                video_count += 1
-                video_id = item["snippet"]["resourceId"]["videoId"]
-                video_title = item["snippet"]["title"]
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                
-                logging.info(f"Processing video {video_count}: {video_title} (ID: {video_id})")
-                yield f"data: {json.dumps({'type': 'progress', 'message': f'Processing video {video_count}: {video_title}'})}\n\n"
-                
-                try:
-                    result = get_transcript_via_ytdlp(video_url)
-                    if result.get("content"):
-                        transcript_text = clean_transcript_text(parse_vtt_content(result["content"]))
-                        # If subtitles, parse as plaintext paragraphs and aggregate
-                        if result.get("method") == "subtitles":
-                            transcript_text = parse_vtt_content(result["content"])
-                            transcript_text = clean_and_aggregate_transcript(transcript_text)
-                        video_header = f"=== {video_title} ===\n\n"
-                        success_count += 1
-                        logging.info(f"✓ Successfully got transcript for: {video_title}")
-                        
-                        # Stream the video header and transcript
-                        yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': video_header})}\n\n"
-                        yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': transcript_text})}\n\n"
-                        chunk = '\n\n' + '='*50 + '\n\n'
-                        yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': chunk})}\n\n"
-                    else:
-                        failed_videos.append({"title": video_title, "id": video_id, "error": result.get("error", "Unknown error")})
-                        logging.warning(f"✗ Could not get transcript for: {video_title} - {result.get('error', 'Unknown error')}")
-                        yield f"data: {json.dumps({'type': 'progress', 'message': f'✗ Failed: {video_title}'})}\n\n"
-                        
-                except Exception as e:
-                    failed_videos.append({"title": video_title, "id": video_id, "error": str(e)})
-                    logging.warning(f"✗ Failed to fetch transcript for video '{video_title}' (ID: {video_id}): {str(e)}")
-                    yield f"data: {json.dumps({'type': 'progress', 'message': f'✗ Error with {video_title}: {str(e)}'})}\n\n"
-                    continue
-
-            if "nextPageToken" in data:
-                page_token = data["nextPageToken"]
-                logging.info(f"Moving to next page with token: {page_token}")
-            else:
-                break
-
-        summary = f"Playlist processing complete! Successfully transcribed {success_count}/{video_count} videos"
-        logging.info(f"✓ {summary}")
-        yield f"data: {json.dumps({'type': 'complete', 'message': summary, 'stats': {'total': video_count, 'success': success_count}})}\n\n"
-        
-    except Exception as e:
-        logging.error(f"Error in playlist streaming: {str(e)}")
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+    return stream_playlist_events(playlist_id, fetch_playlist_video_subtitles)
 
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(request: Request):
+    try:
+        # The multipart body is parsed as it arrives, straight into one temporary file; the
+        # type comes from the first bytes, not the name
+        upload = await spool_upload(request.stream(), request.headers.get("content-type"))
+    except UploadRejected as e:
+        raise TranscriptError(str(e), status_code=e.status_code)
+    
     try:
-        contents = await file.read()
-        
         # Handle audio files with audio transcription
-        audio_extensions = ['.mp4', '.mp3', '.wav', '.m4a', '.aac', '.ogg', '.flac', '.wma', '.aiff']
-        if file and file.filename and any(file.filename.lower().endswith(ext) for ext in audio_extensions):
-            import tempfile
-            import os
-            from openai import OpenAI
-            from config import OPENAI_API_KEY
+        if upload.kind == "audio":
+            temp_file_path = upload.path
             
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            # Re-uploads of the same recording are answered from the Whisper cache
+            content_key = audio_cache_key(upload.digest)
+            known = await asyncio.to_thread(whisper_cache.get, content_key)
+            if known:
+                logging.info(f"Whisper cache hit for upload {upload.filename}")
+                return {"transcript": known["transcript"], "title": await generate_title(known["transcript"])}
             
-            # Get the file extension
-            file_extension = os.path.splitext(file.filename.lower())[1]
-            
-            # Save audio file to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-                temp_file.write(contents)
-                temp_file_path = temp_file.name
+            # Check file size and chunk if necessary
+            file_size = upload.size
+            max_size = 24 * 1024 * 1024  # 24MB for safety
+            complete = True
             
-            try:
-                # Check file size and chunk if necessary
-                file_size = os.path.getsize(temp_file_path)
-                max_size = 24 * 1024 * 1024  # 24MB for safety
-                
-                if file_size > max_size:
-                    logging.info(f"Audio file is large ({file_size} bytes), chunking for transcription")
+            if file_size > max_size:
+                logging.info(f"Audio file is large ({file_size} bytes), chunking for transcription")
+                try:
+                    full_transcript = ""
+                    
                     try:
-                        # Use different chunking methods based on file type
-                        if file_extension in ['.mp4', '.m4a']:
-                            chunk_paths = split_mp4_ffmpeg(temp_file_path, max_size)
-                        else:  # All other audio formats
-                            chunk_paths = split_audio_ffmpeg(temp_file_path, max_size)
-                        
-                        full_transcript = ""
-                        
-                        for i, chunk_path in enumerate(chunk_paths):
-                            try:
-                                with open(chunk_path, "rb") as audio_file:
-                                    logging.info(f"Transcribing audio chunk {i+1}/{len(chunk_paths)}: {chunk_path}")
-                                    transcription = client.audio.transcriptions.create(
-                                        model="whisper-1",
-                                        file=audio_file,
-                                        response_format="text"
-                                    )
-                                if transcription:
-                                    full_transcript += transcription + "\n"
-                                # Clean up chunk file
-                                if chunk_path != temp_file_path:
-                                    os.remove(chunk_path)
-                            except Exception as chunk_error:
-                                logging.error(f"Error transcribing chunk {i+1}: {str(chunk_error)}")
-                                # Continue with other chunks
-                                if chunk_path != temp_file_path and os.path.exists(chunk_path):
-                                    os.remove(chunk_path)
-                        
-                        text = full_transcript if full_transcript else "No transcript available."
-                    except Exception as chunking_error:
-                        logging.error(f"Error during chunking: {str(chunking_error)}")
-                        # Fallback to direct transcription (might fail for large files)
-                        with open(temp_file_path, "rb") as audio_file:
-                            logging.info(f"Fallback: Transcribing audio file directly: {file.filename}")
-                            transcription = client.audio.transcriptions.create(
-                                model="whisper-1",
-                                file=audio_file,
-                                response_format="text"
-                            )
-                        text = transcription if transcription else "No transcript available."
-                else:
-                    # Small file, transcribe directly
-                    with open(temp_file_path, "rb") as audio_file:
-                        logging.info(f"Transcribing audio file: {file.filename}")
-                        transcription = client.audio.transcriptions.create(
-                            model="whisper-1",
-                            file=audio_file,
-                            response_format="text"
-                        )
+                        async for i, chunk_path, transcription, chunk_error in transcribe_chunks_in_order(iter_audio_chunks(temp_file_path, max_size)):
+                            # Failed chunks were already retried on their own; continue with the rest
+                            complete = complete and not chunk_error
+                            if transcription:
+                                full_transcript += transcription + "\n"
+                    finally:
+                        remove_audio_chunks(temp_file_path)
+                    
+                    text = full_transcript if full_transcript else "No transcript available."
+                except Exception as chunking_error:
+                    logging.error(f"Error during chunking: {str(chunking_error)}")
+                    # Fallback to direct transcription (might fail for large files)
+                    logging.info(f"Fallback: Transcribing audio file directly: {upload.filename}")
+                    transcription = await asyncio.to_thread(transcribe_audio_file, temp_file_path)
                     text = transcription if transcription else "No transcript available."
-                
-                title = generate_title(text)
-                return {"transcript": text, "title": title}
-                
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+            else:
+                # Small file, transcribe directly
+                logging.info(f"Transcribing audio file: {upload.filename}")
+                transcription = await transcribe_small_audio_file(temp_file_path)
+                text = transcription if transcription else "No transcript available."
+            
+            if complete and text != "No transcript available.":
+                await asyncio.to_thread(whisper_cache.set, content_key, text, 'audio_file')
+            title = await generate_title(text)
+            return {"transcript": text, "title": title}
         
-        # Handle other file types
-        elif file and file.filename and file.filename.endswith(".pdf"):
-            reader = PdfReader(io.BytesIO(contents))
-            text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-        elif file and file.filename and file.filename.endswith(".docx"):
-            doc = Document(io.BytesIO(contents))
-            text = "\n".join([para.text for para in doc.paragraphs])
+        # Handle other file types, parsed from the spooled file rather than an in-memory copy
+        elif upload.kind == "pdf":
+            text = await asyncio.to_thread(extract_pdf_text, upload.path)
+        elif upload.kind == "docx":
+            text = await asyncio.to_thread(extract_docx_text, upload.path)
         else:
-            text = contents.decode("utf-8")
+            with open(upload.path, "r", encoding="utf-8") as f:
+                text = f.read()
         
-        title = generate_title(text)
+        title = await generate_title(text)
         return {"transcript": text, "title": title}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(f"Error uploading file: {str(e)}")
         raise TranscriptError(str(e))
+    finally:
+        upload.cleanup()
 
-def stream_audio_transcription(url: str):
-    import glob, os, tempfile, logging, json
-    from config import OPENAI_API_KEY
-    from openai import OpenAI
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    import subprocess
+def extract_pdf_text(path: str) -> str:
+    reader = PdfReader(path)
+    return "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
+
+def extract_docx_text(path: str) -> str:
+    doc = Document(path)
+    return "\n".join([para.text for para in doc.paragraphs])
+
+@router.post("/uploads", status_code=201)
+async def create_upload(request: Request):
+    """
+    Start a resumable upload. Body: {"filename", "size"} (both optional). Transcription
+    starts as soon as the first audio bytes arrive; follow it on
+    `/transcript/jobs/{job_id}/events`.
+    """
+    try:
+        data = await request.json() if await request.body() else {}
+    except ValueError:
+        raise TranscriptError("Request body is not valid JSON")
+    if not isinstance(data, dict):
+        raise TranscriptError("Expected a JSON object")
+    try:
+        session = upload_registry.create(data.get("filename"), data.get("size"))
+    except UploadRejected as e:
+        raise TranscriptError(str(e), status_code=e.status_code)
+    session.job = job_registry.start(stream_upload_transcript(session))
+    return JSONResponse(session.status(), status_code=201, headers={"Upload-Offset": "0", "X-Job-ID": session.job.id})
+
+@router.patch("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request):
+    """
+    Append the request body at the `Upload-Offset` header, which must equal the bytes
+    received so far. After a dropped connection, ask for the offset and continue from there.
+    """
+    session = get_upload_session(upload_id)
+    offset = request.headers.get("upload-offset", "")
+    if not offset.isdigit():
+        raise TranscriptError("Upload-Offset header is required")
+    try:
+        new_offset = await session.append(int(offset), request.stream())
+    except UploadRejected as e:
+        return JSONResponse({"detail": str(e), "offset": session.offset}, status_code=e.status_code,
+                            headers={"Upload-Offset": str(session.offset)})
+    return JSONResponse({"upload_id": session.id, "offset": new_offset}, headers={"Upload-Offset": str(new_offset)})
+
+@router.api_route("/uploads/{upload_id}", methods=["GET", "HEAD"])
+def get_upload(upload_id: str):
+    """Current offset and state of a resumable upload (the offset is also in `Upload-Offset`)."""
+    session = get_upload_session(upload_id)
+    return JSONResponse(session.status(), headers={"Upload-Offset": str(session.offset)})
+
+@router.post("/uploads/{upload_id}/finalize")
+def finalize_upload(upload_id: str):
+    """Mark the upload complete; the transcript job finishes once the remaining audio is transcribed."""
+    session = get_upload_session(upload_id)
+    try:
+        session.finalize()
+    except UploadRejected as e:
+        raise TranscriptError(str(e), status_code=e.status_code)
+    return session.status()
+
+def get_upload_session(upload_id: str):
+    session = upload_registry.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    return session
+
+async def stream_upload_transcript(session):
+    """
+    Transcript job of a resumable upload. Streamable formats are piped into ffmpeg from the
+    growing file, so chunks are transcribed while later parts are still uploading; MP4/M4A
+    are chunked once the upload is finalized, or normalized and sent whole if they fit in
+    one Whisper request.
+    """
+    max_size = 24 * 1024 * 1024  # 24MB for safety
     try:
+        yield f"data: {json.dumps({'type': 'progress', 'message': 'Waiting for audio...'})}\n\n"
+        await session.wait(session.ready)
         with tempfile.TemporaryDirectory() as temp_dir:
-            cmd = [
-                'yt-dlp',
-                '--extract-audio',
-                '--audio-format', 'mp3',
-                '--audio-quality', '192K',
-                '--no-warnings',
-                '-o', f'{temp_dir}/%(title)s.%(ext)s',
-                url
-            ]
-            logging.info("Downloading audio for streaming transcription...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            if result.returncode == 0:
-                audio_files = glob.glob(f'{temp_dir}/*.mp3')
-                if audio_files:
-                    audio_file = audio_files[0]
-                    max_size = 24 * 1024 * 1024  # 24MB for safety
-                    from utils.youtube_utils import split_audio_ffmpeg
-                    chunk_paths = split_audio_ffmpeg(audio_file, max_size)
-                    for chunk_path in chunk_paths:
-                        with open(chunk_path, "rb") as f:
-                            logging.info(f"Transcribing audio chunk {chunk_path} with OpenAI Whisper (stream)...")
-                            transcription = client.audio.transcriptions.create(
-                                model="whisper-1",
-                                file=f,
-                                response_format="text"
-                            )
-                        if transcription:
-                            yield f"data: {{\"type\": \"transcript_chunk\", \"content\": {json.dumps(transcription)} }}\n\n"
-                        if chunk_path != audio_file:
-                            os.remove(chunk_path)
-                    yield f"data: {{\"type\": \"complete\", \"method\": \"audio\"}}\n\n"
+            if session.streamable:
+                yield f"data: {json.dumps({'type': 'progress', 'message': 'Transcribing while the upload continues...'})}\n\n"
+                chunks = iter_streamed_audio_chunks(session.iter_received(), os.path.join(temp_dir, 'upload'), max_size)
+            else:
+                yield f"data: {json.dumps({'type': 'progress', 'message': 'Waiting for the upload to finish...'})}\n\n"
+                await session.wait(session.finished)
+                known = await asyncio.to_thread(whisper_cache.get, audio_cache_key(session.hexdigest()))
+                if known:
+                    async for event in stream_cached_transcript(known):
+                        yield event
                     return
-            logging.error(f"Audio download failed: {result.stderr}")
+                if session.offset <= max_size:
+                    # One Whisper request, shrunk first like a small `/upload`
+                    chunks = [await asyncio.to_thread(normalize_audio, session.path)]
+                else:
+                    chunks = iter_audio_chunks(session.path, max_size)
+            async for event in stream_chunked_audio_transcript(chunks, None, session.hexdigest):
+                yield event
+    except Exception as e:
+        logging.error(f"Error transcribing upload {session.id}: {str(e)}")
+        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+    finally:
+        remove_audio_chunks(session.path)
+        upload_registry.remove(session.id)
+
+def stream_audio_transcription(url: str):
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            download = download_audio_ytdlp(url, temp_dir)
+            if download.get("path"):
+                audio_file = download["path"]
+                max_size = 24 * 1024 * 1024  # 24MB for safety
+                for i, chunk_path, transcription, chunk_error in iter_transcribed_chunks(iter_audio_chunks(audio_file, max_size)):
+                    if transcription:
+                        yield from transcript_chunk_events(transcription)
+                    if chunk_path != audio_file:
+                        os.remove(chunk_path)
+                yield f"data: {{\"type\": \"complete\", \"method\": \"audio\"}}\n\n"
+                return
             yield f"data: {{\"type\": \"error\", \"message\": \"Failed to download audio\"}}\n\n"
     except Exception as e:
         logging.error(f"Audio streaming transcription error: {str(e)}")
         yield f"data: {{\"type\": \"error\", \"message\": {json.dumps(str(e))} }}\n\n"
 
 @router.get("/segments")
-def get_transcript_segments(url: str = Query(..., description="YouTube video URL or ID")):
+async def get_transcript_segments(
+    url: str = Query(..., description="YouTube video URL or ID"),
+    stream: bool = Query(False, description="Stream progress and partial transcript as SSE")
+):
     """
     Returns transcript segments with timestamps for a given video URL (YouTube, Vimeo, Instagram, etc.).
     Always uses the home worker for processing.
     """
-    from utils.youtube_utils import get_transcript_from_worker
     try:
         if not url or not url.startswith("http"):
             raise HTTPException(status_code=400, detail="Invalid video URL")
@@ -891,8 +854,15 @@ def get_transcript_segments(url: str = Query(..., description="YouTube video URL
         if playlist_id and not video_id:
             logging.info(f"Detected playlist URL with ID: {playlist_id}, routing to playlist handler")
             return get_playlist_transcript(playlist_id)
+        cache_key = transcript_cache_key(url)
+        if stream:
+            return stream_worker_job(url, cache_key)
+        cached = await asyncio.to_thread(transcript_cache.get, cache_key)
+        if cached:
+            logging.info(f"[SEGMENTS] Returning cached transcript for {cache_key}")
+            return {"segments": None, "transcript": cached["transcript"]}
         # Always use the worker for any video URL
-        transcript_result = get_transcript_from_worker(url)
+        transcript_result = await get_transcript_from_worker(url)
         if transcript_result.get("transcript"):
             if transcript_result.get("method") == "subtitles":
                 logging.info(f"[SEGMENTS] Processing subtitles transcript, method: {transcript_result.get('method')}")
@@ -903,6 +873,7 @@ def get_transcript_segments(url: str = Query(..., description="YouTube video URL
                 logging.info(f"[SEGMENTS] After clean_and_aggregate_transcript (first 200 chars): {transcript[:200]}")
             else:
                 transcript = transcript_result["transcript"]
+            await asyncio.to_thread(transcript_cache.set, cache_key, transcript, transcript_result.get("method", "worker"))
             return {"segments": None, "transcript": transcript}
         else:
             raise HTTPException(status_code=500, detail=transcript_result.get("error", "Failed to get transcript from worker."))
@@ -1,10 +1,35 @@
 import pytest
+from contextlib import ExitStack
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from main import app
+from utils.transcript_cache import TranscriptCache
+from utils.playlist_cache import PlaylistCache
+
+# Every persistent cache, and the modules that import it by name
+PERSISTENT_CACHES = {
+    "transcript_cache": (TranscriptCache, ["utils.transcript_cache", "services.transcript_service", "utils.playlist_utils"]),
+    "whisper_cache": (TranscriptCache, ["utils.whisper_cache", "utils.whisper_utils", "services.transcript_service"]),
+    "summary_cache": (TranscriptCache, ["utils.summary_utils"]),
+    "llm_cache": (TranscriptCache, ["utils.llm_cache"]),
+    "playlist_cache": (PlaylistCache, ["utils.playlist_cache", "utils.playlist_utils"]),
+}
 
 @pytest.fixture(scope="module")
 def client():
     with TestClient(app) as c:
         yield c
 
-# Example: Patch OpenAI and other external calls here if needed 
\ No newline at end of file
+@pytest.fixture(autouse=True)
+def caches(tmp_path_factory):
+    # Fake transcripts and completions must not be served to later tests, runs or the dev server
+    directory = tmp_path_factory.mktemp("caches")
+    isolated = {}
+    with ExitStack() as stack:
+        for name, (cache_class, modules) in PERSISTENT_CACHES.items():
+            isolated[name] = cache_class(str(directory / f"{name}.db"))
+            for module in modules:
+                stack.enter_context(patch(f"{module}.{name}", isolated[name]))
+        yield isolated
+
+# Example: Patch OpenAI and other external calls here if needed
@@ -0,0 +1,102 @@
+import os
+import random
+import shutil
+import subprocess
+import threading
+import pytest
+from unittest.mock import patch
+from utils.audio_utils import (
+    plan_chunks, file_split_times, iter_audio_chunks, iter_ffmpeg_segments, _iter_segmenter, _fit_chunk, normalize_audio,
+    CHUNK_BITRATE,
+)
+
+MAX_SIZE = 24 * 1024 * 1024
+
+def test_plan_uses_output_bitrate_not_source_size():
+    # A one-hour lecture re-encoded at 128 kbps is ~57.6 MB, whatever the source size was
+    num_chunks, segment_time = plan_chunks(3600, MAX_SIZE)
+    assert num_chunks == 3
+    assert segment_time * num_chunks >= 3600
+    assert segment_time * CHUNK_BITRATE / 8 <= MAX_SIZE
+
+def test_short_audio_is_a_single_chunk():
+    assert plan_chunks(600, MAX_SIZE)[0] == 1
+
+def test_whole_files_are_cut_into_the_planned_number_of_chunks():
+    # No short lead chunk for files already on disk: a 20-minute file fits in one 20 MB chunk
+    assert file_split_times(1200, 20 * 1024 * 1024) == []
+    for duration in (1500, 3600, 3 * 3600):
+        assert len(file_split_times(duration, MAX_SIZE)) + 1 == plan_chunks(duration, MAX_SIZE)[0]
+
+@pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")), reason="ffmpeg not installed")
+def test_oversize_chunks_are_split_again(tmp_path):
+    source = str(tmp_path / "tone.mp3")
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=frequency=300:duration=120',
+         '-ac', '2', '-b:a', '192k', source],
+        check=True
+    )
+    max_size = 600 * 1024
+    chunks = list(iter_audio_chunks(source, max_size))
+    assert len(chunks) == plan_chunks(120, max_size)[0]
+    assert all(os.path.getsize(chunk) <= max_size for chunk in chunks)
+
+    # An encoded chunk that still comes out too large is cut again
+    oversize = list(_fit_chunk(source, max_size))
+    assert len(oversize) >= 2
+    assert all(os.path.getsize(chunk) <= max_size for chunk in oversize)
+    assert not os.path.exists(source)
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+def test_corrupt_input_does_not_block_the_segmenter(tmp_path):
+    source = tmp_path / "corrupt.mp3"
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=frequency=300:duration=600', '-b:a', '32k', str(source)],
+        check=True
+    )
+    data = bytearray(source.read_bytes())
+    noise = random.Random(1)
+    for i in range(2000, len(data), 97):
+        data[i] = noise.randrange(256)
+    source.write_bytes(data)
+
+    # Hundreds of KB of decoder errors used to fill ffmpeg's stderr pipe and stall it
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: (list(iter_ffmpeg_segments(str(source), 120)), done.set()), daemon=True)
+    worker.start()
+    worker.join(timeout=30)
+    assert done.is_set()
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+def test_segmenter_is_killed_after_its_timeout(tmp_path):
+    processes = []
+    popen = subprocess.Popen
+
+    def record(*args, **kwargs):
+        processes.append(popen(*args, **kwargs))
+        return processes[-1]
+
+    # Days of generated audio: far more than ffmpeg can encode in half a second
+    with patch("utils.audio_utils.subprocess.Popen", side_effect=record):
+        with pytest.raises(TimeoutError):
+            list(_iter_segmenter(['-f', 'lavfi', '-i', 'sine=duration=300000'], ['-segment_time', '3600'],
+                                 str(tmp_path / "tone"), timeout=0.5))
+    assert processes[0].poll() is not None
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+def test_normalize_shrinks_and_trims_silence(tmp_path):
+    source = str(tmp_path / "lecture.mp3")
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error',
+         '-f', 'lavfi', '-i', 'anullsrc=r=44100:cl=stereo:d=5',
+         '-f', 'lavfi', '-i', 'sine=frequency=300:duration=30',
+         '-filter_complex', '[1]aformat=channel_layouts=stereo:sample_rates=44100[s];[0][s]concat=n=2:v=0:a=1',
+         '-b:a', '320k', source],
+        check=True
+    )
+    normalized = normalize_audio(source, min_bytes=0)
+    assert normalized != source
+    assert os.path.getsize(normalized) < os.path.getsize(source) / 4
+
+    # Small inputs are sent as they are
+    assert normalize_audio(source, min_bytes=os.path.getsize(source)) == source
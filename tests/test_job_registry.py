@@ -0,0 +1,88 @@
+import asyncio
+import json
+from utils.job_registry import JobRegistry, parse_last_event_id
+
+def event(n):
+    return f"data: {json.dumps({'type': 'transcript_chunk', 'content': str(n)})}\n\n"
+
+async def slow_events(count, delay=0.01):
+    for n in range(count):
+        await asyncio.sleep(delay)
+        yield event(n)
+
+def test_job_keeps_running_after_subscriber_leaves():
+    async def scenario():
+        registry = JobRegistry()
+        job = registry.start(slow_events(10))
+        received = []
+        async for item in job.subscribe():
+            received.append(item)
+            if len(received) == 3:
+                break  # Client disconnects
+        await job.task
+        assert job.done and job.last_seq == 10
+
+        # Reattach after event 3 and get exactly the missed events
+        replay = [item async for item in registry.get(job.id).subscribe(3)]
+        return received, replay
+
+    received, replay = asyncio.run(scenario())
+    assert received[0] == "id: 1\n" + event(0)
+    assert [item.split("\n")[0] for item in replay] == [f"id: {n}" for n in range(4, 11)]
+
+def test_late_subscriber_follows_live_events():
+    async def scenario():
+        job = JobRegistry().start(slow_events(5, delay=0.02))
+        await asyncio.sleep(0.05)
+        return [item async for item in job.subscribe()]
+
+    items = asyncio.run(scenario())
+    assert len(items) == 5
+
+def test_bounded_log_reports_dropped_events():
+    async def scenario():
+        job = JobRegistry(max_events=3).start(slow_events(6, delay=0))
+        await job.task
+        return [item async for item in job.subscribe(1)]
+
+    items = asyncio.run(scenario())
+    assert "2 earlier events are no longer available" in items[0]
+    assert [item.split("\n")[0] for item in items[1:]] == ["id: 4", "id: 5", "id: 6"]
+
+def test_failed_source_ends_with_error_event():
+    async def broken():
+        yield event(0)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        job = JobRegistry().start(broken())
+        return [item async for item in job.subscribe()]
+
+    items = asyncio.run(scenario())
+    assert '"type": "error"' in items[-1] and "boom" in items[-1]
+    assert parse_last_event_id("7") == 7 and parse_last_event_id(None) == 0
+
+def test_concurrent_identical_requests_share_one_job():
+    started = []
+
+    def make_events():
+        started.append(True)
+        return slow_events(4)
+
+    async def scenario():
+        registry = JobRegistry()
+        first, joined_first = registry.start_or_join("youtube:abc", make_events)
+        await asyncio.sleep(0.025)
+        second, joined_second = registry.start_or_join("youtube:abc", make_events)
+        late = [item async for item in second.subscribe()]
+        third, joined_third = registry.start_or_join("youtube:abc", make_events)
+        await third.task
+        return first, second, third, joined_first, joined_second, joined_third, late
+
+    first, second, third, joined_first, joined_second, joined_third, late = asyncio.run(scenario())
+    assert second is first and not joined_first and joined_second
+    # The late subscriber still receives the events emitted before it joined
+    assert [item.split("\n")[0] for item in late] == ["id: 1", "id: 2", "id: 3", "id: 4"]
+    # Once the job is finished a new request starts fresh work
+    assert third is not first and not joined_third
+    assert len(started) == 2
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+from openai.resources.chat.completions import AsyncCompletions
+from utils.llm_cache import completion_cache_key
+
+def fake_completions(calls):
+    async def create(self, **kwargs):
+        calls.append(kwargs)
+        if kwargs.get("stream"):
+            async def parts():
+                for part in ["## Heading\n\nFirst ", "paragraph.\n\nSecond paragraph."]:
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+            return parts()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {len(calls)}"))])
+    return create
+
+def test_key_covers_model_messages_and_parameters():
+    messages = [{"role": "user", "content": "Hello"}]
+    key = completion_cache_key("gpt-3.5-turbo", messages, max_tokens=100, temperature=0.7)
+    assert key == completion_cache_key("gpt-3.5-turbo", messages, temperature=0.7, max_tokens=100)
+    assert key != completion_cache_key("gpt-3.5-turbo", messages, max_tokens=200, temperature=0.7)
+    assert key != completion_cache_key("gpt-4o", messages, max_tokens=100, temperature=0.7)
+    assert key != completion_cache_key("gpt-3.5-turbo", [{"role": "user", "content": "Hello!"}], max_tokens=100, temperature=0.7)
+
+def test_repeated_request_is_answered_from_the_cache(client):
+    calls = []
+    with patch.object(AsyncCompletions, "create", fake_completions(calls)):
+        first = client.post("/summary/extract", json={"text": "A job description"})
+        second = client.post("/summary/extract", json={"text": "A job description"})
+        other = client.post("/summary/extract", json={"text": "Another job description"})
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json() == {"extracted": "answer 1"}
+    assert other.headers["X-Cache"] == "MISS"
+    assert len(calls) == 2
+
+def test_no_cache_header_bypasses_and_refreshes(client):
+    calls = []
+    with patch.object(AsyncCompletions, "create", fake_completions(calls)):
+        client.post("/chat/suggested-questions", json={"summary": "A summary"})
+        fresh = client.post("/chat/suggested-questions", json={"summary": "A summary"}, headers={"Cache-Control": "no-cache"})
+        cached = client.post("/chat/suggested-questions", json={"summary": "A summary"})
+    assert fresh.headers["X-Cache"] == "BYPASS"
+    assert cached.headers["X-Cache"] == "HIT"
+    assert len(calls) == 2
+
+def test_cached_stream_is_replayed_block_by_block(client):
+    calls = []
+    with patch.object(AsyncCompletions, "create", fake_completions(calls)):
+        first = client.post("/summary/qna-stream", json={"transcript": "A short lecture."})
+        with client.stream("POST", "/summary/qna-stream", json={"transcript": "A short lecture."}) as second:
+            blocks = list(second.iter_text())
+            status = second.headers["X-Cache"]
+    assert first.headers["X-Cache"] == "MISS"
+    assert status == "HIT"
+    assert "".join(blocks) == first.text == "## Heading\n\nFirst paragraph.\n\nSecond paragraph."
+    assert len(calls) == 1
@@ -0,0 +1,151 @@
+import asyncio
+import time
+import httpx
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from openai.resources.chat.completions import AsyncCompletions, Completions
+from main import app
+from utils.openai_utils import get_async_client, stream_in_order
+
+# Simulated OpenAI latency; a sync client call holds the event loop for this long
+NETWORK_DELAY = 0.3
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+async def fake_stream(parts):
+    for part in parts:
+        await asyncio.sleep(0.01)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+
+async def async_create(self, **kwargs):
+    await asyncio.sleep(NETWORK_DELAY)
+    if kwargs.get("stream"):
+        return fake_stream(["## Part\n\n", "Body text"])
+    return completion('[{"topic": "Topic", "question": "Question?"}]')
+
+def blocking_create(self, **kwargs):
+    time.sleep(NETWORK_DELAY)
+    return completion("blocking call")
+
+async def max_loop_lag(make_request):
+    """Run `make_request()` while a heartbeat measures the longest stretch the event loop was unavailable."""
+    beats = [time.perf_counter()]
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            await asyncio.sleep(0.01)
+            beats.append(time.perf_counter())
+
+    beat = asyncio.create_task(heartbeat())
+    try:
+        result = await make_request()
+    finally:
+        beats.append(time.perf_counter())
+        done.set()
+        await beat
+    return result, max(later - earlier for earlier, later in zip(beats, beats[1:])) - 0.01
+
+ENDPOINTS = [
+    ("/summary/summarize-video", {"json": {"transcript": "A lecture", "url": "https://example.com"}}),
+    ("/summary/summarize-stream", {"json": {"transcript": "A lecture"}}),
+    ("/summary/qna-stream", {"json": {"transcript": "A lecture"}}),
+    ("/summary/extract", {"json": {"text": "A job description"}}),
+    ("/chat/suggested-questions", {"json": {"summary": "A summary"}}),
+    ("/chat/on-topic", {"json": {"transcript": "A lecture", "chatHistory": [{"role": "user", "content": "Why?"}]}}),
+    ("/transcript/upload", {"files": {"file": ("notes.txt", b"Plain text notes")}}),
+]
+
+@pytest.mark.parametrize("path, request_args", ENDPOINTS)
+def test_openai_calls_do_not_block_the_event_loop(path, request_args):
+    async def make_request():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post(path, **request_args)
+
+    # A sync client call sneaking back in would stall the heartbeat for NETWORK_DELAY
+    with patch.object(AsyncCompletions, "create", async_create), patch.object(Completions, "create", blocking_create):
+        resp, lag = asyncio.run(max_loop_lag(make_request))
+    assert resp.status_code == 200
+    assert "blocking call" not in resp.text
+    assert lag < NETWORK_DELAY / 2
+
+def test_client_is_shared_per_event_loop():
+    async def clients():
+        return get_async_client(), get_async_client()
+
+    first, same = asyncio.run(clients())
+    other, _ = asyncio.run(clients())
+    assert first is same
+    assert other is not first
+
+def make_generation(index, delay, running, log):
+    async def generate():
+        running.append(index)
+        log.append(len(running))
+        try:
+            for part in range(3):
+                await asyncio.sleep(delay)
+                yield f"{index}.{part} "
+        finally:
+            running.remove(index)
+    return generate
+
+def test_streams_run_ahead_but_are_released_in_order():
+    running, log = [], []
+    # Later chunks finish first, so their output has to be held back
+    delays = [0.06, 0.03, 0.01, 0.02]
+
+    async def collect():
+        makers = [make_generation(i, delay, running, log) for i, delay in enumerate(delays)]
+        return [item async for item in stream_in_order(makers, concurrency=4)]
+
+    start = time.monotonic()
+    items = asyncio.run(collect())
+    elapsed = time.monotonic() - start
+    assert items == [f"{i}.{part} " for i in range(4) for part in range(3)]
+    # About as long as the slowest chunk, not the sum of all of them
+    assert elapsed < sum(delays) * 3 * 0.75
+
+def test_generation_concurrency_is_capped():
+    running, log = [], []
+
+    async def collect():
+        makers = [make_generation(i, 0.01, running, log) for i in range(6)]
+        return [item async for item in stream_in_order(makers, concurrency=2)]
+
+    assert len(asyncio.run(collect())) == 18
+    assert max(log) == 2
+
+def test_speculative_work_is_cancelled_when_the_client_leaves():
+    running, log = [], []
+
+    async def read_first_item():
+        makers = [make_generation(i, 0.05, running, log) for i in range(4)]
+        stream = stream_in_order(makers, concurrency=4)
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    assert asyncio.run(read_first_item()) == "0.0 "
+    assert running == []
+
+def test_error_is_raised_after_earlier_output():
+    async def ok():
+        yield "first "
+
+    async def broken():
+        raise RuntimeError("model failed")
+        yield
+
+    async def collect(items):
+        async for item in stream_in_order([ok, broken]):
+            items.append(item)
+
+    items = []
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect(items))
+    assert items == ["first "]
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch
+from utils.playlist_cache import PlaylistCache
+from utils.playlist_utils import (
+    stream_playlist_events, fetch_playlist_items, fetch_playlist_video_details, fetch_video_details, parse_iso8601_duration,
+)
+
+ITEMS = [{"video_id": f"vid{i}", "title": f"Video {i}"} for i in range(1, 7)]
+
+def parse(events):
+    return [json.loads(event[len("data: "):]) for event in events]
+
+def test_playlist_videos_run_concurrently_and_carry_their_index():
+    in_flight = 0
+    peak = 0
+
+    async def fetch_video(video_url, title, captions=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Earlier videos take longer so results arrive out of playlist order
+        index = int(video_url[-1])
+        await asyncio.sleep(0.02 * (7 - index))
+        in_flight -= 1
+        if index == 3:
+            return {"error": "no subtitles"}
+        return {"transcript": f"text {index}", "method": "subtitles"}
+
+    async def collect():
+        return [event async for event in stream_playlist_events("PL123", fetch_video, concurrency=3)]
+
+    with patch("utils.playlist_utils.fetch_playlist_items", return_value=ITEMS), \
+         patch("utils.playlist_utils.fetch_video_details", return_value={}):
+        start = time.monotonic()
+        events = parse(asyncio.run(collect()))
+        elapsed = time.monotonic() - start
+
+    assert peak == 3
+    # Two waves of three videos instead of six videos back to back
+    assert elapsed < 0.35
+
+    transcripts = [e for e in events if e["type"] == "transcript_chunk" and e["content"].startswith("text")]
+    assert sorted(e["index"] for e in transcripts) == [1, 2, 4, 5, 6]
+    assert all(e["content"] == f"text {e['index']}" and e["video_id"] == f"vid{e['index']}" for e in transcripts)
+
+    counters = [e["completed"] for e in events if e["type"] == "progress" and "completed" in e]
+    assert counters == sorted(counters) and counters[-1] == 6
+
+    complete = events[-1]
+    assert complete["type"] == "complete"
+    assert complete["success"] == 5 and complete["failed"] == 1
+    assert complete["failed_videos"] == [{"title": "Video 3", "id": "vid3", "error": "no subtitles"}]
+
+def test_playlist_fetch_error_is_reported():
+    async def collect():
+        return [event async for event in stream_playlist_events("PL123", None)]
+
+    with patch("utils.playlist_utils.fetch_playlist_items", side_effect=RuntimeError("Failed to fetch playlist items from YouTube API.")):
+        events = parse(asyncio.run(collect()))
+    assert events[-1] == {"type": "error", "message": "Failed to fetch playlist items from YouTube API."}
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = {}
+        self.text = json.dumps(data) if data else ""
+
+    def json(self):
+        return self._data
+
+def page(etag, titles):
+    return {
+        "etag": etag,
+        "items": [{"snippet": {"title": title, "resourceId": {"videoId": video_id}}} for video_id, title in titles],
+    }
+
+def test_unchanged_playlist_costs_one_conditional_request(tmp_path):
+    cache = PlaylistCache(str(tmp_path / "playlists.db"))
+    first = page("etag-1", [("vid1", "Intro"), ("vid2", "Setup")])
+    with patch("utils.playlist_utils.requests.get", return_value=FakeResponse(200, first)) as mock_get:
+        items = fetch_playlist_items("PL123", cache)
+    assert [item["status"] for item in items] == ["new", "new"]
+    assert "If-None-Match" not in mock_get.call_args.kwargs["headers"]
+
+    with patch("utils.playlist_utils.requests.get", return_value=FakeResponse(304)) as mock_get:
+        items = fetch_playlist_items("PL123", cache)
+    assert mock_get.call_count == 1
+    assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": "etag-1"}
+    assert [(item["video_id"], item["status"]) for item in items] == [("vid1", "unchanged"), ("vid2", "unchanged")]
+
+def test_added_and_renamed_videos_are_flagged(tmp_path):
+    cache = PlaylistCache(str(tmp_path / "playlists.db"))
+    with patch("utils.playlist_utils.requests.get", return_value=FakeResponse(200, page("etag-1", [("vid1", "Intro"), ("vid2", "Setup")]))):
+        fetch_playlist_items("PL123", cache)
+    refreshed = page("etag-2", [("vid3", "Bonus"), ("vid1", "Intro"), ("vid2", "Setup (re-recorded)")])
+    with patch("utils.playlist_utils.requests.get", return_value=FakeResponse(200, refreshed)):
+        items = fetch_playlist_items("PL123", cache)
+    assert [(item["video_id"], item["status"]) for item in items] == [("vid3", "new"), ("vid1", "unchanged"), ("vid2", "changed")]
+
+def test_longest_videos_start_first_and_captions_are_passed_through():
+    items = [{"video_id": f"vid{i}", "title": f"Video {i}"} for i in range(1, 4)]
+    details = {
+        "vid1": {"captions": True, "duration": 60},
+        "vid2": {"captions": False, "duration": 3600},
+        "vid3": {"captions": True, "duration": 600},
+    }
+    calls = []
+
+    async def fetch_video(video_url, title, captions=None):
+        calls.append((video_url[-4:], captions))
+        await asyncio.sleep(0.01)
+        return {"transcript": title, "method": "subtitles"}
+
+    async def collect():
+        return [event async for event in stream_playlist_events("PL123", fetch_video, concurrency=1)]
+
+    with patch("utils.playlist_utils.fetch_playlist_items", return_value=items), \
+         patch("utils.playlist_utils.fetch_video_details", return_value=details):
+        events = parse(asyncio.run(collect()))
+
+    assert calls == [("vid2", False), ("vid3", True), ("vid1", True)]
+    etas = [e["eta_seconds"] for e in events if e["type"] == "progress" and "eta_seconds" in e]
+    assert len(etas) == 3 and etas[-1] == 0
+
+def test_video_details_are_fetched_fifty_ids_per_call():
+    video_ids = [f"vid{i}" for i in range(120)]
+
+    def fake_get(url, timeout):
+        ids = url.split("&id=")[1].split("&")[0].split(",")
+        return FakeResponse(200, {"items": [
+            {"id": video_id, "contentDetails": {"caption": "false", "duration": "PT1H2M3S"}} for video_id in ids
+        ]})
+
+    with patch("utils.playlist_utils.requests.get", side_effect=fake_get) as mock_get:
+        details = fetch_video_details(video_ids)
+    assert mock_get.call_count == 3
+    assert len(details) == 120
+    assert details["vid0"] == {"captions": False, "duration": 3723}
+    assert parse_iso8601_duration("PT45S") == 45
+    assert parse_iso8601_duration("P1DT1M") == 86460
+    assert parse_iso8601_duration("garbage") == 0
+
+def test_video_details_are_only_fetched_for_new_or_changed_videos(tmp_path):
+    cache = PlaylistCache(str(tmp_path / "playlists.db"))
+    items = [{"video_id": "vid1", "title": "Intro", "status": "new"}, {"video_id": "vid2", "title": "Setup", "status": "new"}]
+
+    def fake_details(video_ids):
+        return {video_id: {"captions": True, "duration": 60} for video_id in video_ids}
+
+    with patch("utils.playlist_utils.fetch_video_details", side_effect=fake_details) as lookup:
+        assert len(fetch_playlist_video_details("PL123", items, cache)) == 2
+        # Re-opened unchanged: answered from the stored details
+        unchanged = [{**item, "status": "unchanged"} for item in items]
+        assert fetch_playlist_video_details("PL123", unchanged, cache) == fake_details(["vid1", "vid2"])
+        assert lookup.call_count == 1
+        # Only the renamed video is looked up again
+        fetch_playlist_video_details("PL123", [unchanged[0], {**items[1], "status": "changed"}], cache)
+    assert lookup.call_args.args == (["vid2"],)
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from utils.single_flight import SingleFlight
+
+def test_concurrent_calls_run_once_and_share_the_result():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        await asyncio.sleep(0.05)
+        return {"transcript": f"text for {url}"}
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do("youtube:abc", fetch, "abc") for _ in range(8)])
+        # The key is released afterwards
+        await flight.do("youtube:abc", fetch, "abc")
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [{"transcript": "text for abc"}] * 8
+    assert calls == ["abc", "abc"]
+
+def test_waiters_receive_the_leaders_error():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.02)
+        raise RuntimeError("worker down")
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("youtube:abc", fail) for _ in range(3)], return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert [str(e) for e in errors] == ["worker down"] * 3
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("youtube:abc", fetch))
+        follower = asyncio.create_task(flight.do("youtube:abc", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
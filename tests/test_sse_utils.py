@@ -0,0 +1,42 @@
+import asyncio
+import json
+from utils.sse_utils import split_text, transcript_chunk_events, batch_events, sse_event
+
+def test_split_text_keeps_words_whole():
+    text = " ".join(f"word{i}" for i in range(5000))
+    pieces = list(split_text(text, 400))
+    assert all(len(piece) <= 400 for piece in pieces)
+    assert " ".join(pieces) == text
+
+def test_long_words_become_their_own_piece():
+    long_word = "x" * 500
+    assert list(split_text(f"short {long_word} tail", 400)) == ["short", long_word, "tail"]
+    assert list(split_text("  ", 400)) == []
+
+def test_chunk_events_are_framed_as_sse():
+    events = list(transcript_chunk_events("hello world", 400))
+    assert events == [sse_event({"type": "transcript_chunk", "content": "hello world"})]
+    assert json.loads(events[0][len("data: "):]) == {"type": "transcript_chunk", "content": "hello world"}
+
+def test_ready_events_are_batched_and_slow_ones_flushed():
+    async def events():
+        for n in range(3):
+            yield f"data: {n}\n\n"
+        await asyncio.sleep(0.1)
+        yield "data: late\n\n"
+
+    async def collect():
+        return [batch async for batch in batch_events(events(), max_bytes=1024, max_delay=0.02)]
+
+    assert asyncio.run(collect()) == ["data: 0\n\ndata: 1\n\ndata: 2\n\n", "data: late\n\n"]
+
+def test_batches_respect_byte_budget():
+    async def events():
+        for n in range(10):
+            yield "x" * 100
+
+    async def collect():
+        return [batch async for batch in batch_events(events(), max_bytes=250, max_delay=1)]
+
+    batches = asyncio.run(collect())
+    assert [len(batch) for batch in batches] == [300, 300, 300, 100]
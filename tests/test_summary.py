@@ -1,3 +1,5 @@
+import asyncio
+import time
 from unittest.mock import patch
 
 def test_summary_stream(client):
@@ -12,4 +14,89 @@ def test_qna_stream(client):
         mock_quiz.return_value = "mocked quiz"
         resp = client.post("/summary/qna-stream", json={"transcript": "test transcript"})
         assert resp.status_code == 200
-        assert "mocked quiz" in resp.text 
\ No newline at end of file
+        assert "mocked quiz" in resp.text 
+
+def test_summary_chunks_are_generated_concurrently_and_sent_in_order(client):
+    async def fake_blocks(prompt, max_tokens=4096):
+        index = next(i for i in range(3) if f"CHUNK{i}" in prompt)
+        await asyncio.sleep(0.2)
+        yield f"## Section {index}\n\n"
+
+    # One paragraph per chunk at this budget
+    transcript = "\n\n".join(f"CHUNK{i} opens this part. " + "It covers one more idea. " * 8 for i in range(3))
+    with patch("services.summary_service.stream_markdown_blocks", side_effect=fake_blocks), \
+            patch("utils.summary_utils.SUMMARY_CHUNK_TOKENS", 70), \
+            patch("utils.summary_utils.CHUNK_OVERLAP_TOKENS", 0):
+        start = time.monotonic()
+        resp = client.post("/summary/summarize-stream", json={"transcript": transcript})
+        elapsed = time.monotonic() - start
+    assert resp.status_code == 200
+    assert resp.text == "## Section 0\n\n## Section 1\n\n## Section 2\n\n"
+    # Three 0.2 s generations overlap instead of running back to back
+    assert elapsed < 0.5
+
+def test_long_transcript_is_condensed_by_map_reduce_and_reused(client, tmp_path):
+    from types import SimpleNamespace
+    from openai.resources.chat.completions import AsyncCompletions
+    from utils.transcript_cache import TranscriptCache
+
+    prompts = []
+
+    async def fake_create(self, **kwargs):
+        prompt = "\n".join(message["content"] for message in kwargs["messages"])
+        prompts.append(prompt)
+        await asyncio.sleep(0.05)
+        if kwargs.get("stream"):
+            async def parts():
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="## Part\n\n"))])
+            return parts()
+        text = "Part summary " + "covering the ideas " * 5 + "in order." if prompt.startswith("Summarize this part") else "Final summary."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    transcript = " ".join(f"Sentence {i} adds one more idea to the lecture." for i in range(300))
+    with patch.object(AsyncCompletions, "create", fake_create), \
+            patch("utils.summary_utils.summary_cache", TranscriptCache(str(tmp_path / "summaries.db"))), \
+            patch("utils.summary_utils.SUMMARY_CHUNK_TOKENS", 200), \
+            patch("utils.summary_utils.CHUNK_OVERLAP_TOKENS", 0), \
+            patch("services.summary_service.CONTEXT_TOKENS", 100), \
+            patch("services.chat_service.CONTEXT_TOKENS", 100):
+        start = time.monotonic()
+        resp = client.post("/summary/summarize-video", json={"transcript": transcript, "url": "https://example.com"})
+        elapsed = time.monotonic() - start
+        assert resp.status_code == 200
+        assert resp.json() == {"summary": "Final summary."}
+        partial_calls = sum(prompt.startswith("Summarize this part") for prompt in prompts)
+        # The whole transcript is covered, not just its start
+        assert "Sentence 299" in "".join(prompts)
+        assert partial_calls > 20
+        # Levels run one after another but the chunks within a level run together
+        assert elapsed < partial_calls * 0.05 / 2
+
+        prompts.clear()
+        resp = client.post("/summary/summarize-video", json={"transcript": transcript, "url": "https://example.com"})
+        assert resp.json() == {"summary": "Final summary."}
+        assert resp.headers["X-Cache"] == "HIT"
+        assert prompts == []
+
+        # A fresh final answer still reuses the condensed transcript
+        resp = client.post("/summary/summarize-video", json={"transcript": transcript, "url": "https://example.com"},
+                           headers={"Cache-Control": "no-cache"})
+        assert resp.headers["X-Cache"] == "BYPASS"
+        assert len(prompts) == 1
+
+        prompts.clear()
+        resp = client.post("/chat/on-topic", json={"transcript": transcript, "chatHistory": [{"role": "user", "content": "Why?"}]})
+        assert resp.status_code == 200
+        assert "Summary of the full transcript" in prompts[0]
+
+        prompts.clear()
+        resp = client.post("/summary/summarize-stream", json={"transcript": transcript})
+        assert resp.status_code == 200
+        # Article prompts depend only on the transcript, whatever summaries are cached
+        stream_prompts = list(prompts)
+        assert not any("Part summary" in prompt for prompt in stream_prompts)
+        with patch("utils.summary_utils.summary_cache", TranscriptCache(str(tmp_path / "empty.db"))):
+            prompts.clear()
+            resp = client.post("/summary/summarize-stream", json={"transcript": transcript}, headers={"Cache-Control": "no-cache"})
+            assert resp.status_code == 200
+        assert sorted(prompts) == sorted(stream_prompts)
@@ -0,0 +1,63 @@
+import re
+from unittest.mock import patch
+from utils.token_utils import chunk_text, count_tokens, truncate_to_tokens
+
+SENTENCES = [f"Sentence number {i} explains one more idea about gradients." for i in range(200)]
+TRANSCRIPT = " ".join(SENTENCES)
+
+def test_chunks_fit_the_budget_and_end_on_sentences():
+    chunks = chunk_text(TRANSCRIPT, max_tokens=200)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert count_tokens(chunk) <= 200
+        assert chunk.endswith("gradients.")
+    # Nothing is lost or reordered
+    assert re.sub(r"\s+", " ", " ".join(chunks)) == TRANSCRIPT
+
+def test_chunks_are_packed_full():
+    chunks = chunk_text(TRANSCRIPT, max_tokens=200)
+    # Every chunk but the last leaves less room than the sentence that follows it
+    for chunk in chunks[:-1]:
+        assert count_tokens(chunk) > 200 - 2 * count_tokens(SENTENCES[0])
+
+def test_existing_paragraphs_are_kept_together():
+    paragraphs = [" ".join(SENTENCES[i:i + 4]) for i in range(0, 40, 4)]
+    chunks = chunk_text("\n\n".join(paragraphs), max_tokens=count_tokens(paragraphs[0]) * 2 + 1)
+    assert chunks[0] == "\n\n".join(paragraphs[:2])
+    assert all(part in paragraphs for chunk in chunks for part in chunk.split("\n\n"))
+
+def test_overlap_repeats_the_end_of_the_previous_chunk():
+    chunks = chunk_text(TRANSCRIPT, max_tokens=200, overlap_tokens=30)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        last_sentence = re.split(r"(?<=[.!?])\s+", previous)[-1]
+        assert chunk.startswith(last_sentence)
+        assert count_tokens(chunk) <= 200
+
+def test_overlap_never_pushes_a_chunk_over_budget():
+    paragraphs = [" ".join(SENTENCES[i:i + 8]) for i in range(0, 80, 8)]
+    max_tokens = max(count_tokens(paragraph) for paragraph in paragraphs) + 2 * count_tokens(SENTENCES[-1]) + 4
+    chunks = chunk_text("\n\n".join(paragraphs), max_tokens=max_tokens, overlap_tokens=max_tokens // 2)
+    assert all(count_tokens(chunk) <= max_tokens for chunk in chunks)
+    # Each paragraph still starts a chunk, with as much overlap as fits before it
+    for paragraph in paragraphs:
+        assert any(chunk.endswith(paragraph) for chunk in chunks)
+    assert any(chunk != paragraph for chunk in chunks for paragraph in paragraphs if chunk.endswith(paragraph))
+
+def test_run_on_text_is_still_split():
+    words = " ".join(["word"] * 2000)
+    chunks = chunk_text(words, max_tokens=100)
+    assert all(count_tokens(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == words.split()
+
+def test_truncate_keeps_whole_sentences_from_the_start():
+    head = truncate_to_tokens(TRANSCRIPT, 100)
+    assert TRANSCRIPT.startswith(re.sub(r"\s+", " ", head))
+    assert head.endswith("gradients.")
+    assert count_tokens(head) <= 100
+    assert truncate_to_tokens("Short text.", 100) == "Short text."
+
+def test_counts_are_estimated_without_a_tokenizer():
+    with patch("utils.token_utils.get_encoding", return_value=None):
+        assert count_tokens("a" * 40) == 10
+        chunks = chunk_text(TRANSCRIPT, max_tokens=150)
+    assert all(len(chunk) <= 150 * 4 for chunk in chunks)
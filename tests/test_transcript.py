@@ -1,5 +1,10 @@
+import json
 import pytest
+import shutil
+import subprocess
+import time
 from unittest.mock import patch
+from utils.transcript_cache import TranscriptCache
 
 def test_transcript_stream(client):
     with patch("services.transcript_service.get_transcript_from_url") as mock_transcript:
@@ -13,4 +18,174 @@ def test_transcript_upload(client):
         mock_file.return_value = "mocked file transcript"
         resp = client.post("/transcript/upload", files={"file": ("test.txt", b"dummy data")})
         assert resp.status_code == 200
-        assert "mocked file transcript" in resp.text 
\ No newline at end of file
+        assert "mocked file transcript" in resp.text 
+
+
+class FakeAudioResponse:
+    def __init__(self, path):
+        self.path = path
+        self.headers = {"content-type": "audio/mpeg"}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=8192):
+        with open(self.path, "rb") as f:
+            while block := f.read(chunk_size):
+                yield block
+
+    def close(self):
+        pass
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+def test_audio_url_is_transcribed_while_downloading(client, tmp_path):
+    source = tmp_path / "podcast.mp3"
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=frequency=300:duration=30', str(source)],
+        check=True
+    )
+    with patch("services.transcript_service.requests.get", return_value=FakeAudioResponse(source)), \
+         patch("services.transcript_service.transcript_cache") as mock_cache, \
+         patch("services.transcript_service.transcribe_audio_file", return_value="hello from the podcast"), \
+         patch("utils.whisper_utils.transcribe_audio_file", return_value="hello from the podcast"), \
+         patch("services.transcript_service.generate_title", return_value="Podcast"):
+        mock_cache.get.return_value = None
+        resp = client.post("/transcript/stream", json={"url": "https://example.com/podcast.mp3"})
+    assert resp.status_code == 200
+    assert "hello from the podcast" in resp.text
+    assert '"method": "audio_file"' in resp.text
+
+def test_transcript_stream_can_be_resumed(client):
+    async def fake_stream(url):
+        for word in ["one", "two", "three"]:
+            yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': word})}\n\n"
+
+    with patch("services.transcript_service.stream_single_video_transcript", side_effect=fake_stream):
+        resp = client.post("/transcript/stream", json={"url": "https://youtube.com/watch?v=abc"})
+    assert resp.status_code == 200
+    job_id = resp.headers["x-job-id"]
+    assert "id: 3\n" in resp.text
+
+    resumed = client.get(f"/transcript/jobs/{job_id}/events", headers={"Last-Event-ID": "2"})
+    assert resumed.text == f"id: 3\ndata: {json.dumps({'type': 'transcript_chunk', 'content': 'three'})}\n\n"
+    assert client.get(f"/transcript/jobs/{job_id}").json()["status"] == "complete"
+    assert client.get("/transcript/jobs/unknown").status_code == 404
+
+def test_single_transcript_can_stream_from_worker(client):
+    async def fake_stream(url):
+        yield {"type": "progress", "message": "Transcribing"}
+        yield {"type": "transcript_chunk", "content": "first part. "}
+        yield {"type": "transcript_chunk", "content": "second part."}
+        yield {"type": "complete", "method": "audio"}
+
+    with patch("services.transcript_service.worker_pool.stream_transcribe", side_effect=fake_stream), \
+         patch("services.transcript_service.transcript_cache") as mock_cache:
+        mock_cache.get.return_value = None
+        resp = client.get("/transcript/single", params={"url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "stream": "true"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in resp.text.splitlines() if line.startswith("data: ")]
+    assert [e["type"] for e in events] == ["progress", "progress", "transcript_chunk", "transcript_chunk", "complete"]
+    mock_cache.set.assert_called_once_with("youtube:dQw4w9WgXcQ", "first part. second part.", "audio")
+
+def test_cached_transcript_streams_without_pacing(client):
+    transcript = " ".join(["lorem ipsum dolor sit amet"] * 5000)
+
+    with patch("services.transcript_service.transcript_cache") as mock_cache:
+        mock_cache.get.return_value = {"transcript": transcript, "method": "subtitles", "title": "Lorem", "created_at": 0}
+        start = time.monotonic()
+        resp = client.post("/transcript/stream", json={"url": "https://www.youtube.com/watch?v=cachedvideo"})
+        elapsed = time.monotonic() - start
+
+    events = [json.loads(line[len("data: "):]) for line in resp.text.splitlines() if line.startswith("data: ")]
+    chunks = [e["content"] for e in events if e["type"] == "transcript_chunk"]
+    assert " ".join(chunks) == transcript
+    # Hundreds of chunks used to be spaced 30 ms apart
+    assert len(chunks) > 300 and elapsed < 2
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+def test_resumable_upload_is_transcribed_while_uploading(client, tmp_path):
+    source = tmp_path / "lecture.mp3"
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=30', str(source)],
+        check=True
+    )
+    data = source.read_bytes()
+    half = len(data) // 2
+    transcribed = []
+
+    def fake_whisper(path):
+        transcribed.append(path)
+        return f"[{path.rsplit('_', 1)[-1]}]"
+
+    with patch("utils.audio_utils.stream_segment_times", lambda max_size: [5, 10, 15, 20, 25]), \
+         patch("utils.whisper_utils.whisper_cache", TranscriptCache(str(tmp_path / "chunks.db"))), \
+         patch("services.transcript_service.whisper_cache", TranscriptCache(str(tmp_path / "files.db"))), \
+         patch("utils.whisper_utils.transcribe_audio_file", side_effect=fake_whisper), \
+         patch("services.transcript_service.generate_title", return_value="Lecture"):
+        created = client.post("/transcript/uploads", json={"filename": "lecture.mp3", "size": len(data)})
+        assert created.status_code == 201
+        upload_id, job_id = created.json()["upload_id"], created.json()["job_id"]
+
+        resp = client.patch(f"/transcript/uploads/{upload_id}", content=data[:half], headers={"Upload-Offset": "0"})
+        assert resp.json()["offset"] == half
+        # The first chunks are transcribed before the rest of the file has arrived
+        deadline = time.monotonic() + 10
+        while not transcribed and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert transcribed
+
+        # A client that lost track of the offset is told where to resume
+        stale = client.patch(f"/transcript/uploads/{upload_id}", content=data[half:], headers={"Upload-Offset": "0"})
+        assert stale.status_code == 409
+        assert client.head(f"/transcript/uploads/{upload_id}").headers["upload-offset"] == str(half)
+
+        resp = client.patch(f"/transcript/uploads/{upload_id}", content=data[half:], headers={"Upload-Offset": str(half)})
+        assert resp.json()["offset"] == len(data)
+        assert client.post(f"/transcript/uploads/{upload_id}/finalize").json()["finalized"]
+
+        events = client.get(f"/transcript/jobs/{job_id}/events")
+    payloads = [json.loads(line[len("data: "):]) for line in events.text.splitlines() if line.startswith("data: ")]
+    assert payloads[-1]["type"] == "complete"
+    chunks = "".join(e["content"] for e in payloads if e["type"] == "transcript_chunk")
+    # Chunks are released in audio order whatever order they finished in
+    assert chunks == "".join(f"[{i}.mp3]" for i in range(6))
+    assert client.get(f"/transcript/uploads/{upload_id}").status_code == 404
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+def test_resumable_upload_gets_the_detected_extension(client, tmp_path):
+    transcribed = []
+
+    def fake_whisper(path):
+        transcribed.append(path)
+        return "Hello."
+
+    with patch("utils.whisper_utils.transcribe_audio_file", side_effect=fake_whisper), \
+         patch("services.transcript_service.normalize_audio", side_effect=lambda path: path) as normalize, \
+         patch("services.transcript_service.generate_title", return_value="Talk"):
+        # No filename, and a misleading one
+        for frequency, declared in ((440, {}), (660, {"filename": "talk.mp3"})):
+            source = tmp_path / f"talk_{frequency}.m4a"
+            subprocess.run(
+                ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', f'sine=frequency={frequency}:duration=5',
+                 '-c:a', 'aac', str(source)],
+                check=True
+            )
+            created = client.post("/transcript/uploads", json=declared).json()
+            client.patch(f"/transcript/uploads/{created['upload_id']}", content=source.read_bytes(), headers={"Upload-Offset": "0"})
+            client.post(f"/transcript/uploads/{created['upload_id']}/finalize")
+            events = client.get(f"/transcript/jobs/{created['job_id']}/events")
+            assert '"type": "complete"' in events.text
+    # Whisper picks the decoder from the file name
+    assert len(transcribed) == 2
+    assert all(path.endswith(".m4a") for path in transcribed)
+    # Small uploads are normalized like multipart ones
+    assert normalize.call_count == 2
+
+def test_resumable_upload_rejects_invalid_declarations(client):
+    for body in ({"size": "123"}, {"size": 1.5}, {"size": -1}, {"size": True}, {"filename": 7}, [1]):
+        resp = client.post("/transcript/uploads", json=body)
+        assert resp.status_code == 400, body
+    assert client.post("/transcript/uploads", json={"size": 10 ** 15}).status_code == 413
+    malformed = client.post("/transcript/uploads", content=b'{"size": ', headers={"content-type": "application/json"})
+    assert malformed.status_code == 400
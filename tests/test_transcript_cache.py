@@ -0,0 +1,52 @@
+import base64
+import os
+import time
+from utils.transcript_cache import TranscriptCache, transcript_cache_key
+
+def test_cache_key_uses_video_id():
+    assert transcript_cache_key("https://youtu.be/dQw4w9WgXcQ") == "youtube:dQw4w9WgXcQ"
+    assert transcript_cache_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42") == "youtube:dQw4w9WgXcQ"
+    assert transcript_cache_key("https://example.com/talk.mp3") == "url:https://example.com/talk.mp3"
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    path = str(tmp_path / "transcripts.db")
+    first = TranscriptCache(path)
+    first.set("youtube:abc", "hello world", "subtitles", "Greeting")
+
+    second = TranscriptCache(path)
+    entry = second.get("youtube:abc")
+    assert entry["transcript"] == "hello world"
+    assert entry["method"] == "subtitles"
+    assert entry["title"] == "Greeting"
+    assert second.stats()["disk_hits"] == 1
+
+    second.get("youtube:abc")
+    assert second.stats()["memory_hits"] == 1
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.db"), ttl=1)
+    cache.set("youtube:abc", "hello world", "subtitles")
+    with cache._lock:
+        cache._memory["youtube:abc"]["created_at"] = time.time() - 10
+    conn = cache._connect()
+    with conn:
+        conn.execute("UPDATE transcripts SET created_at = ?", (time.time() - 10,))
+    assert cache.get("youtube:abc") is None
+    assert cache.stats()["misses"] == 1
+
+def test_size_eviction_drops_least_recently_used(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.db"), memory_items=1, max_disk_bytes=2500)
+    for i in range(3):
+        cache.set(f"url:{i}", base64.b64encode(os.urandom(1500)).decode(), "audio")
+        time.sleep(0.01)
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 2500
+    assert stats["evictions"] >= 1
+    assert cache.get("url:2") is not None
+
+def test_stores_identify_themselves(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "llm.db"), name="LLM")
+    cache.set("llm:abc", "an answer")
+    assert cache.get("llm:abc")["value"] == "an answer"
+    assert cache.stats()["name"] == "LLM"
+    assert TranscriptCache(str(tmp_path / "transcripts.db")).stats()["name"] == "Transcript"
@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import patch
+from utils.transcript_tiers import TranscriptChain, TranscriptTier, TIER_MIN_SAMPLES, fetch_caption_track
+
+def make_tier(name, result=None, delay=0.0, timeout=1.0, error=None):
+    async def fetch(url, deadline):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+    return TranscriptTier(name, fetch, timeout, f"Trying {name}...")
+
+def run_chain(chain, url="https://www.youtube.com/watch?v=abc"):
+    async def collect():
+        return [step async for step in chain.acquire(url)]
+    return asyncio.run(collect())
+
+def test_first_tier_with_text_wins_and_attempts_are_timed():
+    chain = TranscriptChain([
+        make_tier("captions", error=RuntimeError("TranscriptsDisabled")),
+        make_tier("ytdlp", delay=0.5, timeout=0.05),
+        make_tier("worker", {"transcript": "hello", "method": "subtitles"}),
+        make_tier("audio", {"transcript": "never", "method": "audio"}),
+    ])
+    steps = run_chain(chain)
+    assert [step["tier"] for step in steps if step["type"] == "attempt"] == ["captions", "ytdlp", "worker"]
+    result = steps[-1]
+    assert result["tier"] == "worker" and result["transcript"] == "hello"
+    assert [(a["tier"], a["ok"]) for a in result["attempts"]] == [("captions", False), ("ytdlp", False), ("worker", True)]
+    assert result["attempts"][1]["error"] == "Timed out after 0.05s"
+    assert result["attempts"][1]["seconds"] < 0.3
+    assert chain.tiers[3].attempts == 0
+
+def test_all_tiers_failing_returns_an_error():
+    chain = TranscriptChain([make_tier("captions", {"error": "none"}), make_tier("audio", {"transcript": "  ", "method": "audio"})])
+    result = run_chain(chain)[-1]
+    assert result["error"] and len(result["attempts"]) == 2
+
+def test_failing_tier_is_demoted_but_stays_ahead_of_the_last_tier():
+    captions = make_tier("captions", {"error": "IpBlocked"})
+    chain = TranscriptChain([captions, make_tier("ytdlp", {"transcript": "hi", "method": "subtitles"}), make_tier("audio", {"transcript": "hi", "method": "audio"})])
+    assert [t.name for t in chain.ordered()] == ["captions", "ytdlp", "audio"]
+    for _ in range(TIER_MIN_SAMPLES):
+        run_chain(chain)
+    assert [t.name for t in chain.ordered()] == ["ytdlp", "captions", "audio"]
+    stats = {s["tier"]: s for s in chain.stats()["tiers"]}
+    assert stats["captions"]["demoted"] and stats["captions"]["recent_success_rate"] == 0
+    assert stats["ytdlp"]["successes"] == TIER_MIN_SAMPLES
+
+def test_caption_track_supports_old_and_new_api():
+    class Snippet:
+        def __init__(self, text):
+            self.text = text
+
+    class NewApi:
+        def fetch(self, video_id, languages):
+            return [Snippet("hello"), Snippet("world")]
+
+    class OldApi:
+        @staticmethod
+        def get_transcript(video_id, languages):
+            return [{"text": "hello"}, {"text": "again"}]
+
+    with patch("youtube_transcript_api.YouTubeTranscriptApi", NewApi):
+        assert fetch_caption_track("abc") == "hello world"
+    with patch("youtube_transcript_api.YouTubeTranscriptApi", OldApi):
+        assert fetch_caption_track("abc") == "hello again"
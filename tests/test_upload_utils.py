@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from utils.upload_utils import detect_file_type, spool_upload, UploadRejected, UploadSizeLimitMiddleware
+
+def test_type_comes_from_magic_bytes():
+    assert detect_file_type(b"%PDF-1.7\n...", "notes.txt") == ("pdf", ".pdf")
+    assert detect_file_type(b"PK\x03\x04rest", "notes.docx") == ("docx", ".docx")
+    assert detect_file_type(b"ID3\x04\x00", "lecture.bin") == ("audio", ".mp3")
+    assert detect_file_type(b"RIFF\x00\x00\x00\x00WAVEfmt ", None) == ("audio", ".wav")
+    assert detect_file_type(b"\x00\x00\x00\x20ftypM4A ", "talk") == ("audio", ".m4a")
+    # A multi-byte character cut off by the block boundary is still text
+    assert detect_file_type("héllo wörld".encode("utf-8")[:-1], "x.txt") == ("text", ".txt")
+    with pytest.raises(UploadRejected):
+        detect_file_type(b"\x00\x01\x02\xfe\xfd", "blob.bin")
+
+BOUNDARY = "quicklearn"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+def multipart_body(data: bytes, filename: str = "notes.txt") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"title\"\r\n\r\nignored\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+async def body_stream(body: bytes, size: int, received: list):
+    for i in range(0, len(body), size):
+        received.append(size)
+        yield body[i:i + size]
+
+def test_upload_is_spooled_in_blocks(tmp_path):
+    data = b"line of text\n" * 1000
+    received = []
+    spooled = asyncio.run(spool_upload(body_stream(multipart_body(data), 1024, received), CONTENT_TYPE, block_size=1024))
+    try:
+        assert spooled.kind == "text"
+        assert spooled.filename == "notes.txt"
+        assert spooled.size == len(data)
+        assert spooled.digest == hashlib.sha256(data).hexdigest()
+        with open(spooled.path, "rb") as f:
+            assert f.read() == data
+        # The body was parsed as it arrived
+        assert len(received) > 10
+    finally:
+        spooled.cleanup()
+    assert not os.path.exists(spooled.path)
+
+def test_oversized_upload_is_rejected_while_spooling(tmp_path):
+    received = []
+    body = multipart_body(b"a" * 50_000)
+    with patch("tempfile.tempdir", str(tmp_path)):
+        with pytest.raises(UploadRejected) as error:
+            asyncio.run(spool_upload(body_stream(body, 1024, received), CONTENT_TYPE,
+                                     max_bytes=100_000, text_max_bytes=2048, block_size=1024))
+    assert error.value.status_code == 413
+    # Stopped at the limit rather than reading the rest, and the partial copy is removed
+    assert len(received) * 1024 < len(body) // 2
+    assert os.listdir(tmp_path) == []
+
+def test_body_without_file_is_rejected():
+    with pytest.raises(UploadRejected) as error:
+        asyncio.run(spool_upload(body_stream(b"{}", 1024, []), "application/json"))
+    assert error.value.status_code == 400
+    body = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"title\"\r\n\r\nx\r\n--{BOUNDARY}--\r\n".encode()
+    with pytest.raises(UploadRejected):
+        asyncio.run(spool_upload(body_stream(body, 1024, []), CONTENT_TYPE))
+
+def test_upload_over_limit_is_refused_before_reading(client):
+    with patch("services.transcript_service.spool_upload") as spool:
+        resp = client.post(
+            "/transcript/upload",
+            content=b"x",
+            headers={"content-type": "multipart/form-data; boundary=x", "content-length": str(10 * 1024 ** 3)},
+        )
+    assert resp.status_code == 413
+    spool.assert_not_called()
+
+def test_chunked_body_over_limit_is_cut_off():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"size": sum([len(chunk) async for chunk in request.stream()])}
+
+    app.add_middleware(UploadSizeLimitMiddleware, paths=("/upload",), max_bytes=1024 * 1024)
+
+    def chunks():
+        # A generator body is sent chunked, without Content-Length
+        for _ in range(2048):
+            yield b"x" * 1024
+
+    with TestClient(app) as client:
+        resp = client.post("/upload", content=chunks())
+        assert client.post("/upload", content=b"x" * 1024).json() == {"size": 1024}
+    assert resp.status_code == 413
+    assert resp.json() == {"detail": "File is larger than 1MB"}
+
+def test_text_upload_is_parsed_from_disk(client):
+    with patch("services.transcript_service.generate_title", return_value="Notes"):
+        resp = client.post("/transcript/upload", files={"file": ("notes.txt", b"hello from disk")})
+    assert resp.status_code == 200
+    assert resp.json() == {"transcript": "hello from disk", "title": "Notes"}
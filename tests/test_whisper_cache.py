@@ -0,0 +1,50 @@
+import hashlib
+import shutil
+import subprocess
+import pytest
+from unittest.mock import patch
+from utils.audio_utils import iter_audio_chunks
+from utils.transcript_cache import TranscriptCache
+from utils.whisper_cache import HashingStream, file_sha256
+from utils.whisper_utils import transcribe_chunk, iter_transcribed_chunks
+
+def test_cached_chunk_skips_whisper(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "whisper.db"))
+    first = tmp_path / "a_chunk_0.mp3"
+    copy = tmp_path / "b_chunk_0.mp3"
+    first.write_bytes(b"same audio")
+    copy.write_bytes(b"same audio")
+    with patch("utils.whisper_utils.whisper_cache", cache), \
+         patch("utils.whisper_utils.transcribe_audio_file", return_value="hello") as whisper:
+        assert transcribe_chunk(str(first)) == "hello"
+        # Same bytes under another name are served from the cache
+        results = list(iter_transcribed_chunks([str(copy)]))
+    assert results[0][2] == "hello"
+    assert whisper.call_count == 1
+
+def test_hashing_stream_passes_blocks_through():
+    blocks = [b"abc", b"", b"def"]
+    body = HashingStream(blocks)
+    assert body.hexdigest() is None
+    assert list(body) == blocks
+    assert body.hexdigest() == hashlib.sha256(b"abcdef").hexdigest()
+    assert body.size == 6
+
+@pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")), reason="ffmpeg not installed")
+def test_trimmed_recording_shares_leading_chunks(tmp_path):
+    full = str(tmp_path / "full.mp3")
+    trimmed = str(tmp_path / "trimmed.mp3")
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=frequency=300:duration=120',
+         '-ac', '2', '-b:a', '192k', full],
+        check=True
+    )
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', full, '-t', '80', '-c', 'copy', trimmed], check=True)
+    max_size = 600 * 1024
+    full_hashes = [file_sha256(chunk) for chunk in iter_audio_chunks(full, max_size)]
+    trimmed_hashes = [file_sha256(chunk) for chunk in iter_audio_chunks(trimmed, max_size)]
+    assert len(full_hashes) == 4
+    assert len(trimmed_hashes) == 3
+    # Only the chunk the cut falls into differs
+    assert trimmed_hashes[:2] == full_hashes[:2]
+    assert trimmed_hashes[2] != full_hashes[2]
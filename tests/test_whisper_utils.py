@@ -0,0 +1,62 @@
+import asyncio
+import time
+from unittest.mock import patch
+from utils.whisper_utils import transcribe_chunks_in_order, iter_transcribed_chunks, transcribe_audio_file
+
+def fake_transcribe(path):
+    # Later chunks finish first so ordering has to be restored by the stage
+    index = int(path.split("_")[-1])
+    time.sleep(0.05 * (4 - index))
+    if path == "chunk_2":
+        raise RuntimeError("boom")
+    return f"text {index}"
+
+def test_chunks_are_released_in_order():
+    async def collect():
+        return [item async for item in transcribe_chunks_in_order([f"chunk_{i}" for i in range(4)], concurrency=4)]
+
+    with patch("utils.whisper_utils.transcribe_audio_file", side_effect=fake_transcribe):
+        start = time.monotonic()
+        results = asyncio.run(collect())
+        elapsed = time.monotonic() - start
+
+    assert [index for index, _, _, _ in results] == [0, 1, 2, 3]
+    assert [path for _, path, _, _ in results] == [f"chunk_{i}" for i in range(4)]
+    assert [text for _, _, text, _ in results] == ["text 0", "text 1", None, "text 3"]
+    assert isinstance(results[2][3], RuntimeError)
+    # Wall-clock time follows the slowest chunk, not the sum of all of them
+    assert elapsed < 0.35
+
+def test_blocking_iterator_preserves_order():
+    with patch("utils.whisper_utils.transcribe_audio_file", side_effect=fake_transcribe):
+        results = list(iter_transcribed_chunks([f"chunk_{i}" for i in range(4)], concurrency=4))
+    assert [text for _, _, text, _ in results] == ["text 0", "text 1", None, "text 3"]
+
+def test_transcription_starts_before_generator_is_exhausted():
+    started = []
+
+    def slow_chunks():
+        for i in range(3):
+            yield f"chunk_{i}"
+            # Chunk 0 must already be in flight while the next one is being cut
+            time.sleep(0.1)
+            assert "chunk_0" in started
+
+    def record(path):
+        started.append(path)
+        return path
+
+    async def collect():
+        return [item async for item in transcribe_chunks_in_order(slow_chunks())]
+
+    with patch("utils.whisper_utils.transcribe_audio_file", side_effect=record):
+        results = asyncio.run(collect())
+    assert [text for _, _, text, _ in results] == ["chunk_0", "chunk_1", "chunk_2"]
+
+def test_failed_chunk_is_retried(tmp_path):
+    audio = tmp_path / "chunk.mp3"
+    audio.write_bytes(b"audio")
+    with patch("utils.whisper_utils.client") as mock_client, patch("utils.whisper_utils.time.sleep"):
+        mock_client.audio.transcriptions.create.side_effect = [RuntimeError("timeout"), "hello"]
+        assert transcribe_audio_file(str(audio), retries=2) == "hello"
+        assert mock_client.audio.transcriptions.create.call_count == 2
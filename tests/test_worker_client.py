@@ -0,0 +1,122 @@
+import asyncio
+import json
+import httpx
+from utils.worker_client import WorkerPool
+
+def test_requests_go_to_least_busy_worker():
+    seen = []
+
+    async def handler(request):
+        seen.append(request.url.host)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"method": "subtitles", "transcript": request.url.host})
+
+    pool = WorkerPool(["http://a.test/transcribe", "http://b.test/transcribe"], health_interval=0,
+                      transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        results = await asyncio.gather(*[pool.transcribe(f"https://youtu.be/{i}") for i in range(4)])
+        await pool.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert sorted(seen) == ["a.test", "a.test", "b.test", "b.test"]
+    assert all(result["method"] == "subtitles" for result in results)
+
+def test_failing_worker_is_ejected_and_requests_fail_over():
+    calls = {"a.test": 0, "b.test": 0}
+
+    async def handler(request):
+        calls[request.url.host] += 1
+        if request.url.host == "a.test":
+            raise httpx.ConnectError("tunnel closed")
+        return httpx.Response(200, json={"method": "audio", "transcript": "hello"})
+
+    pool = WorkerPool(["http://a.test/transcribe", "http://b.test/transcribe"], health_interval=0,
+                      failure_threshold=1, cooldown=60, transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        results = [await pool.transcribe("https://youtu.be/abc") for _ in range(5)]
+        await pool.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(result == {"method": "audio", "transcript": "hello"} for result in results)
+    # After its first failure worker a is out of rotation
+    assert calls["a.test"] == 1
+    assert [w["ejected"] for w in pool.stats()["workers"]] == [True, False]
+
+def test_client_errors_do_not_trip_the_breaker():
+    async def handler(request):
+        return httpx.Response(404, json={"detail": "not found"})
+
+    pool = WorkerPool(["http://a.test/transcribe"], health_interval=0, failure_threshold=1,
+                      transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        result = await pool.transcribe("https://youtu.be/abc")
+        await pool.aclose()
+        return result
+
+    assert "error" in asyncio.run(scenario())
+    assert pool.stats()["workers"][0]["ejected"] is False
+
+def test_health_check_restores_recovered_worker():
+    async def handler(request):
+        return httpx.Response(200, json={"status": "healthy"})
+
+    pool = WorkerPool(["http://a.test/transcribe"], health_interval=0, failure_threshold=1,
+                      transport=httpx.MockTransport(handler))
+    pool._record_failure(pool.endpoints[0], "timeout")
+    assert pool.stats()["workers"][0]["ejected"] is True
+
+    async def scenario():
+        pool._get_client()
+        await pool.check_health()
+        await pool.aclose()
+
+    asyncio.run(scenario())
+    assert pool.stats()["workers"][0]["ejected"] is False
+    assert pool.endpoints[0].health_url == "http://a.test/health"
+
+def collect_stream(pool, url="https://youtu.be/abc"):
+    async def scenario():
+        events = [event async for event in pool.stream_transcribe(url)]
+        await pool.aclose()
+        return events
+    return asyncio.run(scenario())
+
+def test_ndjson_events_are_streamed():
+    lines = [
+        {"type": "progress", "message": "Downloading audio"},
+        {"type": "transcript_chunk", "content": "hello "},
+        {"type": "transcript_chunk", "content": "world"},
+        {"type": "complete", "method": "audio"},
+    ]
+
+    async def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        body = "".join(json.dumps(line) + "\n" for line in lines)
+        return httpx.Response(200, headers={"content-type": "application/x-ndjson"}, content=body.encode())
+
+    pool = WorkerPool(["http://a.test/transcribe"], health_interval=0, transport=httpx.MockTransport(handler))
+    assert collect_stream(pool) == lines
+
+def test_json_worker_falls_back_to_one_complete_event():
+    async def handler(request):
+        return httpx.Response(200, json={"method": "subtitles", "transcript": "WEBVTT"})
+
+    pool = WorkerPool(["http://a.test/transcribe"], health_interval=0, transport=httpx.MockTransport(handler))
+    assert collect_stream(pool) == [{"type": "complete", "method": "subtitles", "transcript": "WEBVTT"}]
+
+def test_truncated_stream_reports_an_error():
+    async def handler(request):
+        body = json.dumps({"type": "transcript_chunk", "content": "hello"}) + "\n"
+        return httpx.Response(200, headers={"content-type": "application/x-ndjson"}, content=body.encode())
+
+    pool = WorkerPool(["http://a.test/transcribe", "http://b.test/transcribe"], health_interval=0,
+                      transport=httpx.MockTransport(handler))
+    events = collect_stream(pool)
+    # Partial output was already forwarded, so there is no failover to worker b
+    assert events[0] == {"type": "transcript_chunk", "content": "hello"}
+    assert events[1]["type"] == "error" and len(events) == 2
@@ -0,0 +1,45 @@
+import time
+from unittest.mock import patch
+from utils.youtube_utils import download_audio_ytdlp, get_transcript_via_ytdlp, get_transcript_via_audio
+
+def test_audio_download_goes_through_the_engine(tmp_path):
+    audio = tmp_path / "audio.webm"
+    audio.write_bytes(b"opus")
+    with patch("utils.youtube_utils.ytdlp_engine.download_audio", return_value={"path": str(audio)}) as mock_download:
+        result = download_audio_ytdlp("https://www.youtube.com/watch?v=abc", str(tmp_path))
+    assert result == {"path": str(audio)}
+    assert mock_download.call_args[0] == ("https://www.youtube.com/watch?v=abc", str(tmp_path))
+
+def test_engine_timeouts_are_reported_as_errors():
+    with patch("utils.youtube_utils.ytdlp_engine.fetch_subtitles", side_effect=TimeoutError):
+        assert get_transcript_via_ytdlp("https://www.youtube.com/watch?v=abc") == {"error": "Request timed out"}
+    with patch("utils.youtube_utils.ytdlp_engine.download_audio", side_effect=TimeoutError):
+        assert download_audio_ytdlp("https://www.youtube.com/watch?v=abc", "/tmp") == {"error": "Audio download timed out"}
+
+def test_audio_transcription_stops_at_its_deadline(tmp_path):
+    audio = tmp_path / "audio.webm"
+    audio.write_bytes(b"opus")
+    transcribed, closed = [], []
+
+    def fake_chunks(path, max_size):
+        try:
+            for i in range(50):
+                chunk = tmp_path / f"audio_chunk_{i}.mp3"
+                chunk.write_bytes(b"mp3")
+                yield str(chunk)
+        finally:
+            closed.append(True)
+
+    def slow_transcribe(path):
+        transcribed.append(path)
+        time.sleep(0.1)
+        return "words"
+
+    with patch("utils.youtube_utils.download_audio_ytdlp", return_value={"path": str(audio)}) as download, \
+            patch("utils.youtube_utils.iter_audio_chunks", fake_chunks), \
+            patch("utils.whisper_utils.transcribe_chunk", slow_transcribe):
+        result = get_transcript_via_audio("https://www.youtube.com/watch?v=abc", deadline=time.monotonic() + 0.3)
+    assert result == {"error": "Audio transcription timed out"}
+    # The download only gets the time left, and chunks still queued are never sent to Whisper
+    assert download.call_args.kwargs["timeout"] <= 0.3
+    assert closed and len(transcribed) < 50
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import threading
+import time
+import pytest
+from unittest.mock import patch
+import utils.ytdlp_engine as engine
+
+class FakeYoutubeDL:
+    created = []
+
+    def __init__(self, params):
+        self.params = {**params, "outtmpl": {"default": "%(title)s.%(ext)s"}}
+        self.closed = False
+        FakeYoutubeDL.created.append(self)
+
+    def extract_info(self, url, download=False):
+        return {"requested_subtitles": {"en": {"ext": "vtt", "data": "WEBVTT\n\n00:00.000 --> 00:01.000\nhello"}}}
+
+    def download(self, urls):
+        directory = os.path.dirname(self.params["outtmpl"]["default"])
+        with open(os.path.join(directory, "audio.webm"), "wb") as f:
+            f.write(b"opus")
+        return 0
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def fresh_engine_state(tmp_path):
+    FakeYoutubeDL.created = []
+    engine._instances.clear()
+    engine._cookies.update(mtime=None, path=None)
+    cookies = tmp_path / "cookies.txt"
+    with patch("yt_dlp.YoutubeDL", FakeYoutubeDL), patch.object(engine, "YTDLP_COOKIES_PATH", str(cookies)):
+        yield cookies
+    engine._instances.clear()
+    engine._cookies.update(mtime=None, path=None)
+
+def test_instances_stay_warm_between_requests(fresh_engine_state):
+    for _ in range(3):
+        assert engine._fetch_subtitles("https://www.youtube.com/watch?v=abc")["content"].startswith("WEBVTT")
+    assert len(FakeYoutubeDL.created) == 1
+    params = FakeYoutubeDL.created[0].params
+    assert params["writeautomaticsub"] and params["skip_download"] and "cookiefile" not in params
+
+def test_audio_download_uses_small_audio_format(fresh_engine_state, tmp_path):
+    result = engine._download_audio("https://www.youtube.com/watch?v=abc", str(tmp_path))
+    assert result == {"path": str(tmp_path / "audio.webm")}
+    params = FakeYoutubeDL.created[0].params
+    assert "bestaudio[abr<=64]" in params["format"]
+    assert "postprocessors" not in params
+
+def test_cookies_are_reloaded_when_the_secret_changes(fresh_engine_state):
+    cookies = fresh_engine_state
+    cookies.write_text("# Netscape HTTP Cookie File\n")
+    engine._fetch_subtitles("https://www.youtube.com/watch?v=abc")
+    first = FakeYoutubeDL.created[0]
+    first_copy = first.params["cookiefile"]
+    assert open(first_copy).read() == "# Netscape HTTP Cookie File\n"
+
+    engine._fetch_subtitles("https://www.youtube.com/watch?v=abc")
+    assert len(FakeYoutubeDL.created) == 1
+
+    cookies.write_text("# Netscape HTTP Cookie File\n# rotated\n")
+    os.utime(cookies, (os.stat(cookies).st_atime, os.stat(cookies).st_mtime + 10))
+    engine._fetch_subtitles("https://www.youtube.com/watch?v=abc")
+    assert first.closed and len(FakeYoutubeDL.created) == 2
+    assert "rotated" in open(FakeYoutubeDL.created[1].params["cookiefile"]).read()
+    assert not os.path.exists(first_copy)
+
+def test_timed_out_call_kills_its_process():
+    ytdlp = engine.YtdlpEngine(workers=1)
+    before = set(multiprocessing.active_children())
+    try:
+        with pytest.raises(TimeoutError):
+            ytdlp._run("audio", time.sleep, 30, timeout=0.5)
+        # The stuck call is not left running in the background
+        assert set(multiprocessing.active_children()) - before == set()
+        assert ytdlp._idle["audio"] == [] and not ytdlp._busy
+        # The engine keeps working with a fresh process
+        assert ytdlp._run("audio", time.sleep, 0, timeout=30) is None
+    finally:
+        ytdlp.shutdown()
+
+def test_bursts_are_capped_and_wait_for_a_free_process():
+    ytdlp = engine.YtdlpEngine(workers=1, max_workers=2)
+    before = set(multiprocessing.active_children())
+    try:
+        ytdlp._run("subtitles", time.sleep, 0, timeout=30)
+        results = []
+        # Each call needs 1 s of its 1.5 s timeout; the wait for a process is not counted
+        threads = [threading.Thread(target=lambda: results.append(ytdlp._run("subtitles", time.sleep, 1, timeout=1.5))) for _ in range(4)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        peak = 0
+        while any(thread.is_alive() for thread in threads):
+            peak = max(peak, len(set(multiprocessing.active_children()) - before))
+            time.sleep(0.05)
+        elapsed = time.monotonic() - start
+        assert results == [None] * 4
+        # Two at a time: never more than `max_workers` processes
+        assert peak <= 2
+        assert 2 <= elapsed < 3.5
+        # Only `workers` processes are kept once the burst is over
+        assert len(ytdlp._idle["subtitles"]) == 1 and not ytdlp._busy
+    finally:
+        ytdlp.shutdown()
@@ -0,0 +1,326 @@
+import subprocess
+import glob
+import os
+import time
+import math
+import tempfile
+import threading
+import logging
+from config import (
+    AUDIO_STREAM_FIRST_SEGMENT_SECONDS, AUDIO_NORMALIZE_ENABLED, AUDIO_NORMALIZE_MIN_BYTES, AUDIO_NORMALIZE_BITRATE,
+    FFMPEG_SEGMENT_TIMEOUT,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Every chunk sent to Whisper is re-encoded to 16 kHz mono MP3
+CHUNK_BITRATE = 128000
+CHUNK_ENCODING_ARGS = [
+    '-vn',  # No video
+    '-acodec', 'libmp3lame',
+    '-ar', '16000',  # Sample rate
+    '-ac', '1',  # Mono audio
+    '-b:a', f"{CHUNK_BITRATE // 1000}k",  # Bitrate
+]
+SEGMENT_TIME_PADDING = 0.5
+# Drops leading silence and collapses silent stretches (including trailing silence) to 0.3 s.
+# Unlike an areverse-based trim it runs in one streaming pass with constant memory.
+SILENCE_TRIM_FILTER = (
+    "silenceremove=start_periods=1:start_threshold=-50dB:start_silence=0.3"
+    ":stop_periods=-1:stop_duration=1:stop_threshold=-50dB:stop_silence=0.3"
+)
+# Headroom for MP3 framing, ID3 tags and bitrate overshoot when sizing chunks
+CHUNK_SIZE_SAFETY = 0.92
+# A last chunk shorter than this is folded into the one before it
+MIN_TAIL_SECONDS = 1.0
+
+
+def get_media_duration(path: str) -> float:
+    """Duration of a media file in seconds, as reported by ffprobe."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of',
+         'default=noprint_wrappers=1:nokey=1', path],
+        capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def chunk_segment_time(duration: float, num_chunks: int) -> float:
+    """
+    Segment length that cuts `duration` seconds into `num_chunks` pieces. Padded slightly so
+    the segment muxer does not emit a trailing sliver of a few milliseconds.
+    """
+    return duration / num_chunks + SEGMENT_TIME_PADDING
+
+
+def plan_chunks(duration: float, max_size: int, bitrate: int = CHUNK_BITRATE) -> tuple[int, float]:
+    """
+    Smallest number of chunks whose encoded size (at `bitrate` bits/s) stays under
+    `max_size`, and the segment length that produces them. Chunk count depends on the
+    output encoding, not on the size of the source file.
+    """
+    encoded_size = duration * bitrate / 8
+    num_chunks = max(1, math.ceil(encoded_size / (max_size * CHUNK_SIZE_SAFETY)))
+    return num_chunks, chunk_segment_time(duration, num_chunks)
+
+
+def iter_ffmpeg_segments(input_path: str, segment_time: float, output_prefix: str | None = None, poll_interval: float = 0.1):
+    """
+    Decode `input_path` once and cut it into `segment_time`-second MP3 chunks with the ffmpeg
+    segment muxer. Yields each chunk path as soon as ffmpeg has finished writing it, so the
+    first chunk can be transcribed while later ones are still being cut.
+
+    Chunks are named `<output_prefix>_chunk_<n>.mp3` (prefix defaults to the input path).
+    """
+    yield from _iter_segmenter(
+        ['-i', input_path],
+        ['-segment_time', f"{segment_time:.3f}"],
+        output_prefix or input_path,
+        poll_interval=poll_interval,
+    )
+
+
+def iter_grid_segments(input_path: str, split_times: list, output_prefix: str | None = None, poll_interval: float = 0.1):
+    """`iter_ffmpeg_segments` cutting at the absolute `split_times` (seconds) instead of a fixed length."""
+    if split_times:
+        split_args = ['-segment_times', ",".join(f"{t:.3f}" for t in split_times)]
+    else:
+        split_args = ['-segment_time', f"{24 * 3600:.3f}"]
+    yield from _iter_segmenter(['-i', input_path], split_args, output_prefix or input_path, poll_interval=poll_interval)
+
+
+def iter_stream_segments(blocks, output_prefix: str, max_size: int = 24 * 1024 * 1024, poll_interval: float = 0.1):
+    """
+    Pipe an iterable of byte blocks (e.g. an HTTP response body) straight into ffmpeg and
+    yield chunk paths as they are cut, while the rest of the input is still arriving.
+
+    The total duration is unknown up front, so chunks are sized from the output bitrate;
+    the first one is kept short so transcription can start early.
+    """
+    yield from _iter_segmenter(
+        ['-i', 'pipe:0'],
+        ['-segment_times', ",".join(f"{t:.3f}" for t in stream_segment_times(max_size))],
+        output_prefix,
+        feed=blocks,
+        poll_interval=poll_interval,
+    )
+
+
+def stream_segment_times(max_size: int, first_segment: float = AUDIO_STREAM_FIRST_SEGMENT_SECONDS, horizon: float = 24 * 3600) -> list:
+    """Split points (in seconds) for streamed input: one short lead chunk, then full-size chunks."""
+    full_segment = max_size * CHUNK_SIZE_SAFETY * 8 / CHUNK_BITRATE
+    split_at = min(first_segment, full_segment)
+    times = []
+    while split_at < horizon:
+        times.append(split_at)
+        split_at += full_segment
+    return times
+
+
+def file_split_times(duration: float, max_size: int) -> list:
+    """
+    Split points (in seconds) for a whole file: full-size segments from the start, which
+    gives the `plan_chunks` chunk count. Only input still arriving needs the short lead chunk.
+    """
+    full_segment = max_size * CHUNK_SIZE_SAFETY * 8 / CHUNK_BITRATE
+    return stream_segment_times(max_size, first_segment=full_segment, horizon=duration - MIN_TAIL_SECONDS)
+
+
+def _iter_segmenter(input_args: list, split_args: list, output_prefix: str, feed=None, poll_interval: float = 0.1,
+                    timeout: float | None = None):
+    """
+    Run the ffmpeg segment muxer and yield chunk paths as they are closed. ffmpeg is killed
+    and TimeoutError raised if it is still running `timeout` seconds (FFMPEG_SEGMENT_TIMEOUT
+    by default) after all of its input was available, i.e. after `feed` ran out.
+    """
+    timeout = FFMPEG_SEGMENT_TIMEOUT if timeout is None else timeout
+    list_path = f"{output_prefix}_chunks.csv"
+    cmd = [
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        *input_args,
+        *CHUNK_ENCODING_ARGS,
+        '-f', 'segment',
+        *split_args,
+        '-reset_timestamps', '1',
+        '-segment_list', list_path,
+        '-segment_list_type', 'csv',
+        f"{output_prefix}_chunk_%d.mp3",
+    ]
+    logging.info(f"Running ffmpeg segmenter for {output_prefix} ({' '.join(input_args + split_args[:1])})")
+    # Corrupt input can make ffmpeg write far more errors than a pipe holds; a pipe nobody
+    # reads until exit would block it forever
+    stderr_file = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if feed is not None else subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=stderr_file,
+    )
+    feed_errors = []
+    feeder = None
+    input_done = threading.Event()
+    if feed is None:
+        input_done.set()
+    else:
+
+        def pump():
+            try:
+                for block in feed:
+                    if block:
+                        process.stdin.write(block)
+            except (BrokenPipeError, ValueError):
+                pass  # ffmpeg exited or was killed
+            except Exception as e:
+                feed_errors.append(e)
+            finally:
+                try:
+                    process.stdin.close()
+                except Exception:
+                    pass
+                input_done.set()
+
+        feeder = threading.Thread(target=pump, daemon=True)
+        feeder.start()
+
+    directory = os.path.dirname(output_prefix)
+    emitted = 0
+    deadline = None
+    try:
+        while True:
+            finished = process.poll() is not None
+            # ffmpeg appends a line to the segment list once a chunk is closed
+            if os.path.exists(list_path):
+                with open(list_path, 'r', encoding='utf-8') as f:
+                    # Anything after the last newline may still be half-written
+                    lines = [line for line in f.read().split('\n')[:-1] if line.strip()]
+                for line in lines[emitted:]:
+                    yield os.path.join(directory, line.split(',')[0])
+                    emitted += 1
+            if finished:
+                break
+            if deadline is None and input_done.is_set():
+                deadline = time.monotonic() + timeout
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"ffmpeg segmenter for {output_prefix} did not finish within {timeout:g}s")
+            time.sleep(poll_interval)
+        stderr = _read_tail(stderr_file)
+        if feed_errors:
+            raise feed_errors[0]
+        if process.returncode != 0:
+            logging.error(f"ffmpeg segmenter failed for {output_prefix}: {stderr}")
+            if feed is not None and not emitted:
+                raise RuntimeError(f"Could not decode audio stream: {stderr.strip()[-300:]}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stderr_file.close()
+        if feeder is not None:
+            feeder.join(timeout=1)
+        if os.path.exists(list_path):
+            os.remove(list_path)
+
+
+def _read_tail(file, limit: int = 4096) -> str:
+    """The last `limit` bytes written to `file`, decoded."""
+    file.seek(0, os.SEEK_END)
+    file.seek(max(0, file.tell() - limit))
+    return file.read().decode('utf-8', errors='ignore')
+
+
+def iter_audio_chunks(path: str, max_size: int = 24 * 1024 * 1024):
+    """
+    Yield the chunk files Whisper should transcribe for `path`: the file itself when it is
+    already under `max_size`, otherwise single-pass segments of it.
+
+    Files are cut into as few chunks as `plan_chunks` allows, but on a fixed grid of
+    full-size segments rather than into equal parts, so a chunk's bytes depend only on the
+    audio up to its end. A partial upload or a cut of the same recording then produces
+    identical leading chunks, which the Whisper cache reuses.
+    """
+    file_size = os.path.getsize(path)
+    if file_size <= max_size:
+        yield path
+        return
+    duration = get_media_duration(path)
+    split_times = file_split_times(duration, max_size)
+    logging.info(f"Planned {len(split_times) + 1} chunks for {path} ({file_size} bytes, {duration:.1f}s)")
+    for chunk_path in iter_grid_segments(path, split_times):
+        yield from _fit_chunk(chunk_path, max_size)
+
+
+def iter_streamed_audio_chunks(blocks, output_prefix: str, max_size: int = 24 * 1024 * 1024):
+    """`iter_stream_segments` with the same post-encode size check as `iter_audio_chunks`."""
+    for chunk_path in iter_stream_segments(blocks, output_prefix, max_size):
+        yield from _fit_chunk(chunk_path, max_size)
+
+
+def _fit_chunk(chunk_path: str, max_size: int, depth: int = 0):
+    """
+    Yield `chunk_path` if the encoded chunk is within `max_size`, otherwise split it again
+    (recursively) using the bitrate it actually came out at.
+    """
+    chunk_size = os.path.getsize(chunk_path)
+    if chunk_size <= max_size or depth >= 3:
+        if chunk_size > max_size:
+            logging.error(f"Chunk {chunk_path} is still {chunk_size} bytes after re-splitting")
+        yield chunk_path
+        return
+    duration = get_media_duration(chunk_path)
+    actual_bitrate = int(chunk_size * 8 / duration) if duration else CHUNK_BITRATE
+    num_chunks = max(plan_chunks(duration, max_size, max(actual_bitrate, CHUNK_BITRATE))[0], 2)
+    logging.warning(f"Chunk {chunk_path} is {chunk_size} bytes, re-splitting into {num_chunks} pieces")
+    try:
+        for piece in iter_ffmpeg_segments(chunk_path, chunk_segment_time(duration, num_chunks)):
+            yield from _fit_chunk(piece, max_size, depth + 1)
+    finally:
+        os.remove(chunk_path)
+
+
+def remove_audio_chunks(path: str):
+    """Delete any chunk files cut from `path` that are still on disk."""
+    for chunk_path in glob.glob(f"{glob.escape(path)}_chunk_*.mp3"):
+        try:
+            os.remove(chunk_path)
+        except OSError:
+            pass
+
+
+def normalize_audio(path: str, min_bytes: int = AUDIO_NORMALIZE_MIN_BYTES) -> str:
+    """
+    Transcode `path` to speech-optimized 16 kHz mono Opus before it is uploaded to Whisper,
+    dropping any video track and trimming silence. Returns the path of the smaller file, or
+    `path` itself when the stage is disabled, the input is already small, or the transcode
+    fails or would not save anything. The caller removes the returned file if it differs.
+    """
+    original_size = os.path.getsize(path)
+    if not AUDIO_NORMALIZE_ENABLED or original_size <= min_bytes:
+        return path
+    normalized_path = f"{path}_normalized.ogg"
+    cmd = [
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', path,
+        '-vn', '-sn', '-dn',
+        '-ac', '1',
+        '-ar', '16000',
+        '-af', SILENCE_TRIM_FILTER,
+        '-c:a', 'libopus',
+        '-b:a', AUDIO_NORMALIZE_BITRATE,
+        '-application', 'voip',
+        normalized_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0 or not os.path.exists(normalized_path):
+        logging.warning(f"Audio normalization failed for {path}, uploading original: {result.stderr}")
+        if os.path.exists(normalized_path):
+            os.remove(normalized_path)
+        return path
+    normalized_size = os.path.getsize(normalized_path)
+    if normalized_size >= original_size:
+        os.remove(normalized_path)
+        return path
+    logging.info(
+        f"Normalized {path}: {original_size} -> {normalized_size} bytes "
+        f"({original_size - normalized_size} bytes saved, {100 * (1 - normalized_size / original_size):.0f}%)"
+    )
+    return normalized_path
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import time
+import uuid
+import logging
+from collections import deque
+from config import JOB_EVENT_LOG_SIZE, JOB_RETENTION_SECONDS
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class TranscriptJob:
+    """
+    One transcript acquisition running in the background, independent of any HTTP response.
+
+    Every SSE event the job produces gets a sequence number and is kept in a bounded log,
+    so a client that reconnects with `Last-Event-ID` receives the events it missed.
+    """
+
+    def __init__(self, job_id: str, max_events: int, key: str | None = None):
+        self.id = job_id
+        self.key = key
+        self.events = deque(maxlen=max_events)
+        self.last_seq = 0
+        self.done = False
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def append(self, event: str):
+        async with self._changed:
+            self.last_seq += 1
+            self.events.append((self.last_seq, event))
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.done = True
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    async def subscribe(self, last_event_id: int = 0):
+        """
+        Yield the job's events after `last_event_id` as SSE strings with `id:` lines, then
+        follow the live log until the job finishes.
+        """
+        seq = last_event_id
+        while True:
+            async with self._changed:
+                pending = [(s, event) for s, event in self.events if s > seq]
+                if not pending and not self.done:
+                    await self._changed.wait()
+                    continue
+                first_kept = self.events[0][0] if self.events else self.last_seq + 1
+                done = self.done
+            if first_kept > seq + 1 and pending:
+                missed = first_kept - seq - 1
+                yield f"data: {json.dumps({'type': 'progress', 'message': f'{missed} earlier events are no longer available'})}\n\n"
+            for s, event in pending:
+                seq = s
+                yield f"id: {s}\n{event}"
+            if done and seq >= self.last_seq:
+                return
+
+    def status(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": "complete" if self.done else "running",
+            "last_event_id": self.last_seq,
+            "first_event_id": self.events[0][0] if self.events else None,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRegistry:
+    """
+    In-process registry of transcript jobs. Finished jobs are dropped `retention` seconds
+    after they complete. Running jobs are also indexed by key, so identical concurrent
+    requests can share one job instead of each starting their own pipeline.
+    """
+
+    def __init__(self, max_events: int = JOB_EVENT_LOG_SIZE, retention: int = JOB_RETENTION_SECONDS):
+        self.max_events = max_events
+        self.retention = retention
+        self._jobs = {}
+        self._running = {}
+
+    def start(self, events, key: str | None = None) -> TranscriptJob:
+        """
+        Run the async iterator `events` (SSE strings) as a background job and return it.
+        """
+        self._prune()
+        job = TranscriptJob(uuid.uuid4().hex, self.max_events, key)
+        self._jobs[job.id] = job
+        if key is not None:
+            self._running[key] = job
+
+        async def run():
+            try:
+                async for event in events:
+                    await job.append(event)
+            except Exception as e:
+                logging.error(f"Transcript job {job.id} failed: {str(e)}")
+                await job.append(f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n")
+            finally:
+                if key is not None and self._running.get(key) is job:
+                    del self._running[key]
+                await job.finish()
+                logging.info(f"Transcript job {job.id} finished with {job.last_seq} events")
+
+        job.task = asyncio.create_task(run())
+        logging.info(f"Started transcript job {job.id}")
+        return job
+
+    def start_or_join(self, key: str, make_events) -> tuple[TranscriptJob, bool]:
+        """
+        Return the running job for `key`, or start one from `make_events()` if there is none.
+        The second value tells whether an existing job was joined; subscribing from event 0
+        replays everything it has emitted so far.
+        """
+        job = self._running.get(key)
+        if job is not None and not job.done:
+            logging.info(f"Joining running transcript job {job.id} for {key}")
+            return job, True
+        return self.start(make_events(), key=key), False
+
+    def get(self, job_id: str) -> TranscriptJob | None:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+def parse_last_event_id(value) -> int:
+    """`Last-Event-ID` as an int; anything unparseable means "from the start"."""
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+job_registry = JobRegistry()
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import json
+import re
+import logging
+from config import LLM_CACHE_PATH, LLM_CACHE_TTL
+from utils.openai_utils import get_async_client
+from utils.transcript_cache import TranscriptCache
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Values of the X-Cache response header
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_BYPASS = "BYPASS"
+
+# Same two-tier store as transcripts: a per-worker LRU over a SQLite file shared by all workers
+llm_cache = TranscriptCache(LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, name="LLM")
+
+
+def completion_cache_key(model: str, messages: list, **params) -> str:
+    """Cache key for a chat completion: SHA-256 of the model, messages and sampling parameters."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, ensure_ascii=False)
+    return "llm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def use_cache(request) -> bool:
+    """False when the request asks for a fresh answer with `Cache-Control: no-cache` (or `no-store`)."""
+    directives = request.headers.get("cache-control", "").lower()
+    return "no-cache" not in directives and "no-store" not in directives
+
+
+def overall_status(statuses: list) -> str:
+    """X-Cache for a response built from several completions: HIT only if all of them were."""
+    if statuses and all(status == CACHE_HIT for status in statuses):
+        return CACHE_HIT
+    if CACHE_BYPASS in statuses:
+        return CACHE_BYPASS
+    return CACHE_MISS
+
+
+async def cached_chat_completion(messages: list, model: str = "gpt-3.5-turbo", cache: bool = True, **params) -> tuple[str, str]:
+    """
+    Return (content, status) for a chat completion, answering from `llm_cache` when the same
+    model, messages and parameters were seen before. With `cache=False` the cache is not
+    read but the fresh answer still replaces the stored one. Empty answers are not stored.
+    """
+    key = completion_cache_key(model, messages, **params)
+    if cache:
+        entry = await asyncio.to_thread(llm_cache.get, key)
+        if entry:
+            return entry["value"], CACHE_HIT
+    response = await get_async_client().chat.completions.create(model=model, messages=messages, **params)
+    content = response.choices[0].message.content or ""
+    await asyncio.to_thread(llm_cache.set, key, content, model)
+    return content, CACHE_MISS if cache else CACHE_BYPASS
+
+
+async def cached_stream_status(key: str, cache: bool = True) -> str:
+    """What `cached_stream(key, ...)` is about to do, for the X-Cache header of a streaming response."""
+    if not cache:
+        return CACHE_BYPASS
+    entry = await asyncio.to_thread(llm_cache.get, key)
+    return CACHE_HIT if entry else CACHE_MISS
+
+
+async def cached_stream(key: str, make_stream, cache: bool = True):
+    """
+    Stream a completion through `llm_cache`. On a hit the stored text is replayed as the
+    Markdown blocks it was streamed in; otherwise the async generator returned by
+    `make_stream()` is passed through and its output stored once it finishes. Streams that
+    fail or are abandoned by the client are not stored.
+    """
+    if cache:
+        entry = await asyncio.to_thread(llm_cache.get, key)
+        if entry:
+            for block in re.split(r'(?<=\n\n)', entry["value"]):
+                if block:
+                    yield block
+            return
+    parts = []
+    async for part in make_stream():
+        parts.append(part)
+        yield part
+    await asyncio.to_thread(llm_cache.set, key, "".join(parts), "stream")
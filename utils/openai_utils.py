@@ -1,13 +1,60 @@
+import asyncio
 import logging
-from openai import OpenAI
-from config import OPENAI_API_KEY
+import ssl
+import certifi
+import httpx
+from openai import AsyncOpenAI, OpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+from config import OPENAI_API_KEY, OPENAI_TIMEOUT, OPENAI_MAX_RETRIES, OPENAI_MAX_CONNECTIONS, GENERATION_CONCURRENCY
 import re
 import json
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+_limits = httpx.Limits(
+    max_connections=OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+    keepalive_expiry=60,
+)
+# Loading the CA bundle takes long enough to stall the loop, so it is done once at import
+_ssl_context = ssl.create_default_context(cafile=certifi.where())
+_async_clients = {}
 
+# For code that already runs in worker threads (Whisper chunks); never call it from the event loop
+sync_client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    timeout=OPENAI_TIMEOUT,
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=DefaultHttpxClient(limits=_limits, verify=_ssl_context),
+)
 
-def stream_chat_completion(prompt, model="gpt-3.5-turbo", max_tokens=4096, temperature=0.7, system_message=None):
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    The shared `AsyncOpenAI` client of the running event loop. Every service uses it, so
+    all requests from a worker go through one keep-alive connection pool. Connections
+    belong to the loop that opened them, so each loop gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        for other in [other for other in _async_clients if other.is_closed()]:
+            del _async_clients[other]
+        client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(limits=_limits, verify=_ssl_context),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Close the running loop's client, e.g. on application shutdown."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+async def stream_chat_completion(prompt, model="gpt-3.5-turbo", max_tokens=4096, temperature=0.7, system_message=None):
     """
     Stream a chat completion from OpenAI, yielding content chunks.
     """
@@ -16,14 +63,16 @@ def stream_chat_completion(prompt, model="gpt-3.5-turbo", max_tokens=4096, tempe
         messages.append({"role": "system", "content": system_message})
     messages.append({"role": "user", "content": prompt})
     try:
-        stream = client.chat.completions.create(
+        stream = await get_async_client().chat.completions.create(
             model=model,
             messages=messages,
             stream=True,
             max_tokens=max_tokens,
             temperature=temperature
         )
-        for chunk in stream:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
             content = chunk.choices[0].delta.content or ""
             yield content
     except Exception as e:
@@ -31,7 +80,73 @@ def stream_chat_completion(prompt, model="gpt-3.5-turbo", max_tokens=4096, tempe
         yield f"Error: {str(e)}"
 
 
-def chat_completion(prompt, model="gpt-3.5-turbo", max_tokens=600, temperature=0.7, system_message=None):
+async def stream_markdown_blocks(prompt: str, model="gpt-3.5-turbo", max_tokens=4096):
+    """
+    Stream a completion as whole Markdown blocks: text is released at each blank line, so a
+    client never renders half a heading or list. Errors are raised, not yielded.
+    """
+    stream = await get_async_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+        max_tokens=max_tokens
+    )
+    buffer = ""
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        buffer += chunk.choices[0].delta.content or ""
+        # Yield only when a double newline is found (end of Markdown block)
+        while "\n\n" in buffer:
+            block, buffer = buffer.split("\n\n", 1)
+            yield block + "\n\n"
+    # Yield any remaining content after the stream ends
+    if buffer.strip():
+        yield buffer
+
+
+_END = object()
+
+
+async def stream_in_order(make_streams: list, concurrency: int = GENERATION_CONCURRENCY):
+    """
+    Run the async generators returned by the zero-argument callables in `make_streams`, up to
+    `concurrency` at a time, and yield their items in list order. The first stream is passed
+    through live while the next ones are generated ahead and buffered, so the output is the
+    same as running them one after another but takes about as long as the slowest one.
+    An error is raised once the streams before it have been yielded. Work still running
+    is cancelled when the consumer stops early, e.g. because the client disconnected.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    queues = [asyncio.Queue() for _ in make_streams]
+
+    async def produce(make_stream, queue: asyncio.Queue):
+        # Waiters are woken in creation order, so the earliest unfinished streams always run
+        async with semaphore:
+            try:
+                async for item in make_stream():
+                    queue.put_nowait(item)
+            except Exception as e:
+                queue.put_nowait(e)
+                return
+        queue.put_nowait(_END)
+
+    tasks = [asyncio.create_task(produce(make_stream, queue)) for make_stream, queue in zip(make_streams, queues)]
+    try:
+        for queue in queues:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def chat_completion(prompt, model="gpt-3.5-turbo", max_tokens=600, temperature=0.7, system_message=None):
     """
     Get a non-streaming chat completion from OpenAI.
     """
@@ -40,7 +155,7 @@ def chat_completion(prompt, model="gpt-3.5-turbo", max_tokens=600, temperature=0
         messages.append({"role": "system", "content": system_message})
     messages.append({"role": "user", "content": prompt})
     try:
-        response = client.chat.completions.create(
+        response = await get_async_client().chat.completions.create(
             model=model,
             messages=messages,
             max_tokens=max_tokens,
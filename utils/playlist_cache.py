@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from config import PLAYLIST_CACHE_PATH
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class PlaylistCache:
+    """
+    SQLite store of playlist item pages as last returned by the YouTube Data API.
+
+    Every page is kept with its `pageToken` and ETag so a refresh can send `If-None-Match`
+    and reuse the stored items when YouTube answers 304 Not Modified. The `videos.list`
+    details of the items are kept alongside, so unchanged videos are not looked up again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._disk_enabled = True
+        try:
+            self._init_db()
+        except Exception as e:
+            logging.error(f"Playlist cache disabled ({path}): {str(e)}")
+            self._disk_enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS playlist_pages (
+                    playlist_id TEXT NOT NULL,
+                    page_token TEXT NOT NULL,
+                    etag TEXT,
+                    next_page_token TEXT,
+                    items TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (playlist_id, page_token)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS playlist_details (
+                    playlist_id TEXT PRIMARY KEY,
+                    details TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get_pages(self, playlist_id: str) -> dict:
+        """
+        Return {page_token: {"etag", "next_page_token", "items"}} for a playlist, empty if unknown.
+        """
+        if not self._disk_enabled:
+            return {}
+        try:
+            rows = self._connect().execute(
+                "SELECT page_token, etag, next_page_token, items FROM playlist_pages WHERE playlist_id = ?",
+                (playlist_id,),
+            ).fetchall()
+        except Exception as e:
+            logging.error(f"Playlist cache read error for {playlist_id}: {str(e)}")
+            return {}
+        return {
+            page_token: {"etag": etag, "next_page_token": next_page_token, "items": json.loads(items)}
+            for page_token, etag, next_page_token, items in rows
+        }
+
+    def set_pages(self, playlist_id: str, pages: dict):
+        """Replace the stored pages of a playlist with the ones walked on the latest refresh."""
+        if not self._disk_enabled:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM playlist_pages WHERE playlist_id = ?", (playlist_id,))
+                conn.executemany(
+                    "INSERT INTO playlist_pages (playlist_id, page_token, etag, next_page_token, items, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (playlist_id, page_token, page["etag"], page["next_page_token"], json.dumps(page["items"]), now)
+                        for page_token, page in pages.items()
+                    ],
+                )
+        except Exception as e:
+            logging.error(f"Playlist cache write error for {playlist_id}: {str(e)}")
+
+    def get_details(self, playlist_id: str) -> dict:
+        """Return the stored {video_id: details} of a playlist's items, empty if unknown."""
+        if not self._disk_enabled:
+            return {}
+        try:
+            row = self._connect().execute(
+                "SELECT details FROM playlist_details WHERE playlist_id = ?", (playlist_id,)
+            ).fetchone()
+        except Exception as e:
+            logging.error(f"Playlist cache read error for {playlist_id}: {str(e)}")
+            return {}
+        return json.loads(row[0]) if row else {}
+
+    def set_details(self, playlist_id: str, details: dict):
+        """Replace the stored details of a playlist's items."""
+        if not self._disk_enabled:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO playlist_details (playlist_id, details, fetched_at) VALUES (?, ?, ?)",
+                    (playlist_id, json.dumps(details), time.time()),
+                )
+        except Exception as e:
+            logging.error(f"Playlist cache write error for {playlist_id}: {str(e)}")
+
+
+playlist_cache = PlaylistCache(PLAYLIST_CACHE_PATH)
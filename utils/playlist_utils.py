@@ -0,0 +1,239 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import requests
+from config import YOUTUBE_API_KEY, PLAYLIST_CONCURRENCY
+from utils.playlist_cache import PlaylistCache, playlist_cache
+from utils.transcript_cache import transcript_cache, transcript_cache_key
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def fetch_playlist_items(playlist_id: str, cache: PlaylistCache = None) -> list:
+    """
+    Page through the YouTube Data API and return [{"video_id", "title", "status"}] for every item.
+
+    Pages seen before are requested with `If-None-Match` and reused on 304 Not Modified, so an
+    unchanged single-page playlist costs one conditional call. `status` is "new" for videos
+    that were not in the stored list, "changed" when their title changed since then and
+    "unchanged" otherwise; position-only moves do not count as changes.
+    Raises RuntimeError if the API refuses a page.
+    """
+    cache = cache or playlist_cache
+    stored_pages = cache.get_pages(playlist_id)
+    known_titles = {
+        item["video_id"]: item["title"] for page in stored_pages.values() for item in page["items"]
+    }
+    pages = {}
+    not_modified = 0
+    page_token = ""
+    while True:
+        yt_api_url = (
+            f"https://www.googleapis.com/youtube/v3/playlistItems?part=snippet&maxResults=50"
+            f"&playlistId={playlist_id}&key={YOUTUBE_API_KEY}"
+        )
+        if page_token:
+            yt_api_url += f"&pageToken={page_token}"
+
+        stored = stored_pages.get(page_token)
+        headers = {"If-None-Match": stored["etag"]} if stored and stored.get("etag") else {}
+        logging.info(f"Fetching playlist items for {playlist_id} (page token: {page_token or 'first'})")
+        response = requests.get(yt_api_url, headers=headers, timeout=30)
+        if response.status_code == 304 and stored:
+            not_modified += 1
+            page = stored
+        elif response.status_code == 200:
+            data = response.json()
+            page = {
+                "etag": data.get("etag") or response.headers.get("ETag"),
+                "next_page_token": data.get("nextPageToken", ""),
+                "items": [
+                    {
+                        "video_id": item["snippet"]["resourceId"]["videoId"],
+                        "title": item["snippet"]["title"],
+                    }
+                    for item in data.get("items", [])
+                ],
+            }
+        else:
+            logging.error(f"Failed to fetch playlist items: {response.text}")
+            raise RuntimeError("Failed to fetch playlist items from YouTube API.")
+
+        pages[page_token] = page
+        page_token = page["next_page_token"]
+        if not page_token:
+            break
+
+    cache.set_pages(playlist_id, pages)
+    items = []
+    for page in pages.values():
+        for item in page["items"]:
+            if item["video_id"] not in known_titles:
+                status = "new"
+            elif known_titles[item["video_id"]] != item["title"]:
+                status = "changed"
+            else:
+                status = "unchanged"
+            items.append({**item, "status": status})
+    logging.info(f"Playlist {playlist_id}: {len(pages)} pages ({not_modified} not modified), {len(items)} items")
+    return items
+
+
+def parse_iso8601_duration(value: str) -> int:
+    """Seconds in a YouTube ISO 8601 duration such as "PT1H2M3S" (0 if it cannot be parsed)."""
+    match = re.fullmatch(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", value or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def fetch_video_details(video_ids: list) -> dict:
+    """
+    Look up caption availability and duration for many videos at once, 50 IDs per
+    `videos.list` call. Returns {video_id: {"captions": bool, "duration": seconds}}.
+
+    `contentDetails.caption` only reports uploaded captions, not auto-generated ones.
+    Batches the API refuses are skipped, so callers must treat missing IDs as unknown.
+    """
+    details = {}
+    for start in range(0, len(video_ids), 50):
+        batch = video_ids[start:start + 50]
+        yt_api_url = (
+            f"https://www.googleapis.com/youtube/v3/videos?part=contentDetails"
+            f"&id={','.join(batch)}&key={YOUTUBE_API_KEY}"
+        )
+        try:
+            response = requests.get(yt_api_url, timeout=30)
+            if response.status_code != 200:
+                logging.warning(f"Failed to fetch video details: {response.text}")
+                continue
+            for item in response.json().get("items", []):
+                content_details = item.get("contentDetails", {})
+                details[item["id"]] = {
+                    "captions": content_details.get("caption") == "true",
+                    "duration": parse_iso8601_duration(content_details.get("duration")),
+                }
+        except Exception as e:
+            logging.warning(f"Video details lookup failed: {str(e)}")
+    return details
+
+
+def fetch_playlist_video_details(playlist_id: str, items: list, cache: PlaylistCache = None) -> dict:
+    """
+    `fetch_video_details` for the items of `fetch_playlist_items`, reusing the details stored
+    with the playlist for unchanged videos. Re-opening an unchanged playlist costs no
+    `videos.list` call; only new or changed videos, or ones never looked up, are fetched.
+    """
+    cache = cache or playlist_cache
+    stored = cache.get_details(playlist_id)
+    missing = [
+        item["video_id"] for item in items
+        if item.get("status") != "unchanged" or item["video_id"] not in stored
+    ]
+    details = {item["video_id"]: stored[item["video_id"]] for item in items if item["video_id"] in stored}
+    if missing:
+        details.update(fetch_video_details(missing))
+        # Only the current items are kept, so removed videos drop out
+        cache.set_details(playlist_id, details)
+    return details
+
+
+async def stream_playlist_events(playlist_id: str, fetch_video, concurrency: int = PLAYLIST_CONCURRENCY):
+    """
+    Transcribe every video of a playlist with up to `concurrency` videos in flight and yield
+    SSE events as each one finishes.
+
+    `fetch_video(video_url, title, captions=...)` is an async callable returning {"transcript", "method"}
+    (plus "cached": True when the transcript was reused) or {"error"}. Cached transcripts of
+    videos whose playlist entry changed are dropped first, so only new or changed videos
+    are transcribed again. `captions` is the `videos.list` caption flag (None when unknown);
+    videos are started longest first and completion events carry an `eta_seconds` estimate. Every per-video event carries the video's 1-based playlist `index`, so
+    clients can put out-of-order results back in playlist order; progress events also carry
+    `completed` and `total` counters.
+    """
+    try:
+        yield f"data: {json.dumps({'type': 'progress', 'message': 'Fetching playlist videos...'})}\n\n"
+        try:
+            items = await asyncio.to_thread(fetch_playlist_items, playlist_id)
+        except RuntimeError as e:
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            return
+
+        total = len(items)
+        details = await asyncio.to_thread(fetch_playlist_video_details, playlist_id, items)
+        for item in items:
+            item.update(details.get(item["video_id"], {}))
+        for item in items:
+            if item.get("status") == "changed":
+                # The stored transcript belongs to the previous version of the video
+                await asyncio.to_thread(transcript_cache.delete, transcript_cache_key(f"https://www.youtube.com/watch?v={item['video_id']}"))
+        fresh = sum(1 for item in items if item.get("status") in ("new", "changed"))
+        logging.info(f"Processing {total} playlist videos ({fresh} new or changed) with {concurrency} workers")
+        yield f"data: {json.dumps({'type': 'progress', 'message': f'Found {total} videos ({fresh} new or changed), processing {min(concurrency, total)} at a time...', 'completed': 0, 'total': total})}\n\n"
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        finished = asyncio.Queue()
+
+        async def run(index: int, item: dict):
+            video_url = f"https://www.youtube.com/watch?v={item['video_id']}"
+            async with semaphore:
+                await finished.put((index, item, None))  # Started
+                try:
+                    result = await fetch_video(video_url, item["title"], captions=item.get("captions"))
+                except Exception as e:
+                    result = {"error": str(e)}
+            await finished.put((index, item, result))
+
+        # Longest videos first, so short ones fill the gaps at the end instead of a long one
+        # starting last and running alone. The semaphore wakes waiters in creation order.
+        indexed = sorted(enumerate(items, start=1), key=lambda pair: pair[1].get("duration", 0), reverse=True)
+        tasks = [asyncio.create_task(run(index, item)) for index, item in indexed]
+        remaining_duration = sum(item.get("duration", 0) for item in items)
+        done_duration = 0
+        started_at = time.monotonic()
+        completed = 0
+        success_count = 0
+        cached_count = 0
+        failed_videos = []
+        try:
+            while completed < total:
+                index, item, result = await finished.get()
+                video_title = item["title"]
+                if result is None:
+                    yield f"data: {json.dumps({'type': 'progress', 'message': f'Processing video {index}: {video_title}', 'index': index, 'completed': completed, 'total': total})}\n\n"
+                    continue
+
+                completed += 1
+                done_duration += item.get("duration", 0)
+                remaining_duration -= item.get("duration", 0)
+                # Seconds of video handled per wall-clock second so far
+                elapsed = time.monotonic() - started_at
+                eta = round(remaining_duration * elapsed / done_duration) if done_duration and elapsed else None
+                if result.get("transcript"):
+                    success_count += 1
+                    cached_count += 1 if result.get("cached") else 0
+                    logging.info(f"✓ Successfully got transcript for: {video_title}")
+                    video_header = f"=== {video_title} ===\n\n"
+                    separator = f"\n\n{'='*50}\n\n"
+                    yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': video_header, 'index': index, 'video_id': item['video_id']})}\n\n"
+                    yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': result['transcript'], 'index': index, 'video_id': item['video_id']})}\n\n"
+                    yield f"data: {json.dumps({'type': 'transcript_chunk', 'content': separator, 'index': index, 'video_id': item['video_id']})}\n\n"
+                    yield f"data: {json.dumps({'type': 'progress', 'message': f'✓ Completed: {video_title}', 'index': index, 'completed': completed, 'total': total, 'eta_seconds': eta})}\n\n"
+                else:
+                    error = result.get("error", "Unknown error")
+                    failed_videos.append({"title": video_title, "id": item["video_id"], "error": error})
+                    logging.warning(f"✗ Could not get transcript for: {video_title} - {error}")
+                    yield f"data: {json.dumps({'type': 'progress', 'message': f'✗ Failed: {video_title}', 'index': index, 'completed': completed, 'total': total, 'eta_seconds': eta})}\n\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        summary = f"Playlist processing complete! Successfully transcribed {success_count}/{total} videos"
+        logging.info(f"✓ {summary}")
+        yield f"data: {json.dumps({'type': 'complete', 'message': summary, 'stats': {'total': total, 'success': success_count, 'cached': cached_count}, 'success': success_count, 'failed': len(failed_videos), 'failed_videos': failed_videos})}\n\n"
+    except Exception as e:
+        logging.error(f"Error in playlist streaming: {str(e)}")
+        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
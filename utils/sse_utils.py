@@ -0,0 +1,88 @@
+import asyncio
+import json
+from config import SSE_FLUSH_BYTES, SSE_FLUSH_SECONDS
+
+# Transcript text is sent in pieces of at most this many characters, split between words
+TRANSCRIPT_CHUNK_CHARS = 400
+
+
+def sse_event(payload: dict) -> str:
+    """Frame one JSON payload as a Server-Sent Event."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def split_text(text: str, max_chars: int = TRANSCRIPT_CHUNK_CHARS):
+    """
+    Yield stripped pieces of `text` of at most `max_chars` characters, cut at spaces.
+    A single word longer than `max_chars` becomes a piece of its own.
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + max_chars
+        if end >= length:
+            cut = length
+        else:
+            cut = text.rfind(" ", start, end + 1)
+            if cut <= start:
+                cut = text.find(" ", end)
+                if cut == -1:
+                    cut = length
+        piece = text[start:cut].strip()
+        if piece:
+            yield piece
+        start = cut + 1
+
+
+def transcript_chunk_events(text: str, max_chars: int = TRANSCRIPT_CHUNK_CHARS):
+    """`transcript_chunk` events carrying `text`, ready to be yielded from an SSE generator."""
+    for piece in split_text(text, max_chars):
+        yield sse_event({"type": "transcript_chunk", "content": piece})
+
+
+async def batch_events(events, max_bytes: int = SSE_FLUSH_BYTES, max_delay: float = SSE_FLUSH_SECONDS):
+    """
+    Coalesce the SSE strings produced by `events` into larger writes.
+
+    Events that are ready together go out in one send. The buffer is flushed once it holds
+    `max_bytes`, or when the next event has not arrived within `max_delay` seconds of the
+    first buffered one, so a lone progress event is never held back for long.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    buffer = []
+    size = 0
+    deadline = None
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            if buffer:
+                done, _ = await asyncio.wait({pending}, timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    yield "".join(buffer)
+                    buffer, size = [], 0
+                    continue
+            try:
+                event = await pending
+            except StopAsyncIteration:
+                break
+            finally:
+                if pending.done():
+                    pending = None
+            if not buffer:
+                deadline = loop.time() + max_delay
+            buffer.append(event)
+            size += len(event)
+            if size >= max_bytes:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.wait({pending})
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import logging
+from functools import partial
+from config import (
+    SUMMARY_CACHE_PATH, SUMMARY_CACHE_TTL, SUMMARY_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS,
+    PARTIAL_SUMMARY_TOKENS, MAP_CONCURRENCY,
+)
+from utils.openai_utils import get_async_client
+from utils.token_utils import chunk_text, count_tokens, truncate_to_tokens
+from utils.transcript_cache import TranscriptCache
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Part of every cache key; change it with the prompt so older summaries are not reused
+SUMMARY_PROMPT_VERSION = "1"
+
+PARTIAL_SUMMARY_PROMPT = (
+    "Summarize this part of a longer transcript in one dense paragraph. Keep every key concept, "
+    "definition, formula (in LaTeX, wrapped in $...$) and worked example, in the order they appear. "
+    "Leave out filler, repetition and remarks about the speaker.\n\n{text}"
+)
+
+# Keyed by content, like the Whisper cache, so any request carrying the same text reuses the work
+summary_cache = TranscriptCache(SUMMARY_CACHE_PATH, ttl=SUMMARY_CACHE_TTL, name="Summary")
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_summary_key(chunk: str) -> str:
+    return f"chunk:{SUMMARY_PROMPT_VERSION}:{PARTIAL_SUMMARY_TOKENS}:{_digest(chunk)}"
+
+
+def condensed_key(transcript: str, max_tokens: int) -> str:
+    return f"condensed:{SUMMARY_PROMPT_VERSION}:{max_tokens}:{_digest(transcript)}"
+
+
+def transcript_chunks(transcript: str) -> list:
+    """The chunks `/summary/summarize-stream` generates from, which are also the first map level."""
+    return chunk_text(transcript, SUMMARY_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+
+
+def cached_condensed_transcript(transcript: str, max_tokens: int) -> str | None:
+    """The result of an earlier `condense_transcript(transcript, max_tokens)`, if cached. Blocking (SQLite)."""
+    entry = summary_cache.get(condensed_key(transcript, max_tokens))
+    return entry["value"] if entry else None
+
+
+async def summarize_chunk(chunk: str, semaphore: asyncio.Semaphore) -> str:
+    key = chunk_summary_key(chunk)
+    entry = await asyncio.to_thread(summary_cache.get, key)
+    if entry:
+        return entry["value"]
+    async with semaphore:
+        response = await get_async_client().chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": PARTIAL_SUMMARY_PROMPT.format(text=chunk)}],
+            max_tokens=PARTIAL_SUMMARY_TOKENS,
+            temperature=0.3
+        )
+    summary = (response.choices[0].message.content or "").strip()
+    await asyncio.to_thread(summary_cache.set, key, summary, "map-reduce")
+    return summary
+
+
+async def condense_transcript(transcript: str, max_tokens: int) -> str:
+    """
+    Return `transcript` if it fits in `max_tokens`. Otherwise summarize its chunks in
+    parallel and merge the partial summaries level by level, summarizing groups of them
+    again until the result fits. Each level shrinks the text by about
+    SUMMARY_CHUNK_TOKENS / PARTIAL_SUMMARY_TOKENS, so the number of sequential model calls
+    grows with the log of the transcript length. Chunk summaries and the result are cached.
+    """
+    if await asyncio.to_thread(count_tokens, transcript) <= max_tokens:
+        return transcript
+    cached = await asyncio.to_thread(cached_condensed_transcript, transcript, max_tokens)
+    if cached:
+        return cached
+
+    semaphore = asyncio.Semaphore(max(1, MAP_CONCURRENCY))
+    text = transcript
+    level = 0
+    while True:
+        chunks = await asyncio.to_thread(transcript_chunks if level == 0 else partial(chunk_text, max_tokens=SUMMARY_CHUNK_TOKENS), text)
+        summaries = await asyncio.gather(*(summarize_chunk(chunk, semaphore) for chunk in chunks))
+        merged = "\n\n".join(summary for summary in summaries if summary)
+        level += 1
+        logging.info(f"Summary level {level}: {len(chunks)} chunks condensed to {len(merged)} characters")
+        tokens = await asyncio.to_thread(count_tokens, merged)
+        if tokens <= max_tokens:
+            break
+        if len(chunks) == 1 or len(merged) >= len(text):
+            # Budgets too tight to converge; keep what fits
+            merged = await asyncio.to_thread(truncate_to_tokens, merged, max_tokens)
+            break
+        text = merged
+    await asyncio.to_thread(summary_cache.set, condensed_key(transcript, max_tokens), merged, "map-reduce")
+    return merged
@@ -149,4 +149,13 @@ def clean_and_aggregate_transcript(text: str) -> str:
                 current = []
     if current:
         paragraphs.append(' '.join(current))
-    return '\n\n'.join(paragraphs)
\ No newline at end of file
+    return '\n\n'.join(paragraphs)
+
+
+def clean_worker_transcript(transcript: str, method: str | None) -> str:
+    """
+    Worker subtitles arrive as VTT; turn them into aggregated plaintext paragraphs.
+    """
+    if method == "subtitles":
+        return clean_and_aggregate_transcript(parse_vtt_content(transcript))
+    return transcript
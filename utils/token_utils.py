@@ -0,0 +1,138 @@
+import functools
+import math
+import re
+import logging
+from utils.text_utils import format_transcript
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+# Used when no tokenizer can be loaded; English text averages about four characters per token
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str = DEFAULT_MODEL):
+    """
+    The model's tiktoken encoding, loaded once per process. None when tiktoken is not
+    installed or its vocabulary cannot be loaded (it is downloaded on first use), in which
+    case token counts are estimated from the character count.
+    """
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logging.warning(f"Tokenizer unavailable for {model}, estimating token counts: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    encoding = get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_tokens(text: str, max_tokens: int, model: str) -> list:
+    """Last resort for a single word over budget: cut it at token (or estimated) boundaries."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        step = max_tokens * CHARS_PER_TOKEN
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def _units(text: str, max_tokens: int, model: str):
+    """
+    Yield (piece, separator, tokens) in text order: paragraphs, or the sentences (and, for
+    run-on text, words) of paragraphs that do not fit in `max_tokens` on their own.
+    """
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+    if len(paragraphs) <= 1:
+        # Raw transcripts come as one block; format_transcript groups their sentences into paragraphs
+        paragraphs = [p for p in format_transcript(text).split('\n\n') if p]
+    for paragraph in paragraphs:
+        tokens = count_tokens(paragraph, model)
+        if tokens <= max_tokens:
+            yield paragraph, "\n\n", tokens
+            continue
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+            tokens = count_tokens(sentence, model)
+            if tokens <= max_tokens:
+                yield sentence, " ", tokens
+                continue
+            for word in sentence.split():
+                tokens = count_tokens(word, model)
+                if tokens <= max_tokens:
+                    yield word, " ", tokens
+                    continue
+                for piece in _split_tokens(word, max_tokens, model):
+                    yield piece, "", count_tokens(piece, model)
+
+
+def _overlap(units: list, overlap_tokens: int, model: str) -> list:
+    """The trailing whole sentences of `units` that fit in `overlap_tokens`, as units."""
+    carried, size = [], 0
+    for piece, separator, tokens in reversed(units):
+        sentences = re.split(r'(?<=[.!?])\s+', piece) if separator == "\n\n" else [piece]
+        for index in range(len(sentences) - 1, -1, -1):
+            tokens = count_tokens(sentences[index], model) + 1
+            if size + tokens > overlap_tokens:
+                return carried
+            carried.insert(0, (sentences[index], separator if index == 0 else " ", tokens - 1))
+            size += tokens
+    return carried
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0, model: str = DEFAULT_MODEL, limit: int | None = None) -> list:
+    """
+    Split `text` into chunks of at most about `max_tokens` tokens, cutting only between
+    paragraphs, or between sentences where a paragraph is too long. Each chunk after the
+    first starts with up to `overlap_tokens` tokens of whole sentences/paragraphs from the
+    end of the previous one, fewer where the overlap and the next unit would not fit
+    together. Stops after `limit` chunks if given.
+    """
+    max_tokens = max(1, max_tokens)
+    overlap_tokens = min(max(0, overlap_tokens), max_tokens // 2)
+    chunks = []
+    current = []  # (piece, separator, tokens)
+    size = 0
+
+    def joined(units):
+        text = ""
+        for piece, separator, _ in units:
+            text += (separator if text else "") + piece
+        return text
+
+    for unit in _units(text, max_tokens, model):
+        # A separator costs about one token
+        cost = unit[2] + (1 if current else 0)
+        if current and size + cost > max_tokens:
+            chunks.append(joined(current))
+            if limit and len(chunks) >= limit:
+                return chunks
+            current = _overlap(current, overlap_tokens, model)
+            size = sum(tokens + 1 for _, _, tokens in current)
+            # The carried overlap gives way to the unit that opens the chunk
+            while current and size + unit[2] + 1 > max_tokens:
+                size -= current.pop(0)[2] + 1
+            cost = unit[2] + (1 if current else 0)
+        current.append(unit)
+        size += cost
+    if current:
+        chunks.append(joined(current))
+    return chunks
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """The longest run of whole paragraphs/sentences from the start of `text` within `max_tokens`."""
+    if not text:
+        return ""
+    # No need to look further than the budget could possibly cover
+    head = text[:max_tokens * CHARS_PER_TOKEN * 4]
+    chunks = chunk_text(head, max_tokens, model=model, limit=1)
+    return chunks[0] if chunks else ""
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from config import TRANSCRIPT_CACHE_PATH, TRANSCRIPT_CACHE_TTL, TRANSCRIPT_CACHE_MEMORY_ITEMS, TRANSCRIPT_CACHE_MAX_BYTES
+from utils.url_utils import extract_video_id
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def transcript_cache_key(url: str) -> str:
+    """
+    Canonical cache key for a transcript source: the YouTube video ID when there is one,
+    otherwise the URL itself (direct audio files, audio platforms).
+    """
+    video_id = extract_video_id(url)
+    if video_id:
+        return f"youtube:{video_id}"
+    return f"url:{url.strip()}"
+
+
+class TranscriptCache:
+    """
+    Two-tier cache of text values: transcripts, and also Whisper results, summaries and
+    model responses, each in its own store identified by `name` in logs and `stats()`.
+
+    The first tier is a per-process LRU of decoded entries. The second tier is a SQLite
+    database with zlib-compressed values, so every uvicorn worker on the host shares
+    one copy. Entries expire after `ttl` seconds and the least recently used rows are
+    evicted once the stored blobs exceed `max_disk_bytes`.
+    """
+
+    def __init__(self, path: str, ttl: int = TRANSCRIPT_CACHE_TTL,
+                 memory_items: int = TRANSCRIPT_CACHE_MEMORY_ITEMS,
+                 max_disk_bytes: int = TRANSCRIPT_CACHE_MAX_BYTES,
+                 name: str = "Transcript"):
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._disk_enabled = True
+        try:
+            self._init_db()
+        except Exception as e:
+            logging.error(f"{self.name} cache disk tier disabled ({path}): {str(e)}")
+            self._disk_enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    key TEXT PRIMARY KEY,
+                    method TEXT,
+                    title TEXT,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS transcripts_accessed_at ON transcripts (accessed_at)")
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def get(self, key: str) -> dict | None:
+        """
+        Return {"value", "method", "title", "created_at"} for `key`, or None on a miss.
+        The value is also under "transcript", for callers of the transcript stores.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry["created_at"]):
+                    del self._memory[key]
+                    entry = None
+                else:
+                    self._memory.move_to_end(key)
+        if entry is not None:
+            self._count("memory_hits")
+            return dict(entry)
+
+        if self._disk_enabled:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT method, title, data, created_at FROM transcripts WHERE key = ?", (key,)
+                ).fetchone()
+                if row and not self._expired(row[3]):
+                    value = zlib.decompress(row[2]).decode("utf-8")
+                    entry = {
+                        "value": value,
+                        "transcript": value,
+                        "method": row[0],
+                        "title": row[1],
+                        "created_at": row[3],
+                    }
+                    with conn:
+                        conn.execute("UPDATE transcripts SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self._remember(key, entry)
+                    self._count("disk_hits")
+                    return dict(entry)
+                if row:
+                    with conn:
+                        conn.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+                    self._count("evictions")
+            except Exception as e:
+                logging.error(f"{self.name} cache read error for {key}: {str(e)}")
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str, method: str | None = None, title: str | None = None):
+        if not value or not value.strip():
+            return
+        now = time.time()
+        entry = {"value": value, "transcript": value, "method": method, "title": title, "created_at": now}
+        self._remember(key, entry)
+        self._count("stores")
+        if not self._disk_enabled:
+            return
+        try:
+            data = zlib.compress(value.encode("utf-8"), 6)
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, method, title, data, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, method, title, data, len(data), now, now),
+                )
+            self._evict(conn)
+        except Exception as e:
+            logging.error(f"{self.name} cache write error for {key}: {str(e)}")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        if self._disk_enabled:
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+            except Exception as e:
+                logging.error(f"{self.name} cache delete error for {key}: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        evicted = 0
+        with conn:
+            if self.ttl > 0:
+                evicted += conn.execute(
+                    "DELETE FROM transcripts WHERE created_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+            if total > self.max_disk_bytes:
+                rows = conn.execute("SELECT key, size FROM transcripts ORDER BY accessed_at ASC").fetchall()
+                for key, size in rows:
+                    if total <= self.max_disk_bytes:
+                        break
+                    conn.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+                    total -= size
+                    evicted += 1
+                    with self._lock:
+                        self._memory.pop(key, None)
+        if evicted:
+            self._count("evictions", evicted)
+            logging.info(f"{self.name} cache evicted {evicted} entries")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"name": self.name, **self._counters}
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        if self._disk_enabled:
+            try:
+                count, size = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts"
+                ).fetchone()
+                stats["disk_entries"] = count
+                stats["disk_bytes"] = size
+            except Exception as e:
+                logging.error(f"{self.name} cache stats error: {str(e)}")
+        return stats
+
+
+transcript_cache = TranscriptCache(TRANSCRIPT_CACHE_PATH)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+import logging
+from collections import deque
+from config import (
+    TRANSCRIPT_TIERS, CAPTIONS_TIER_TIMEOUT, YTDLP_TIER_TIMEOUT, WORKER_TIER_TIMEOUT, AUDIO_TIER_TIMEOUT
+)
+from utils.text_utils import clean_transcript_text, parse_vtt_content, clean_worker_transcript
+from utils.url_utils import extract_video_id
+from utils.youtube_utils import get_transcript_via_ytdlp, get_transcript_via_audio, get_transcript_from_worker
+from utils.worker_client import worker_pool
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+CAPTION_LANGUAGES = ['en', 'en-US', 'en-GB']
+
+# Outcomes remembered per tier, and the success rate below which a tier is demoted
+TIER_WINDOW = 50
+TIER_MIN_SAMPLES = 10
+TIER_DEMOTE_BELOW = 0.2
+
+
+def fetch_caption_track(video_id: str) -> str:
+    """
+    Caption text from youtube-transcript-api: one HTTP request, no subprocess. Supports both
+    the class-level `get_transcript` of releases before 1.0 and the instance `fetch` after.
+    """
+    from youtube_transcript_api import YouTubeTranscriptApi
+    if hasattr(YouTubeTranscriptApi, "get_transcript"):
+        entries = YouTubeTranscriptApi.get_transcript(video_id, languages=CAPTION_LANGUAGES)
+        return " ".join(entry["text"] for entry in entries)
+    fetched = YouTubeTranscriptApi().fetch(video_id, languages=CAPTION_LANGUAGES)
+    return " ".join(snippet.text for snippet in fetched)
+
+
+async def captions_tier(url: str, deadline: float) -> dict:
+    video_id = extract_video_id(url)
+    if not video_id:
+        return {"error": "Not a YouTube video"}
+    text = await asyncio.to_thread(fetch_caption_track, video_id)
+    return {"transcript": clean_transcript_text(text.replace("\n", " ")), "method": "subtitles"}
+
+
+async def ytdlp_tier(url: str, deadline: float) -> dict:
+    # The engine kills the lookup when its timeout passes
+    result = await asyncio.to_thread(get_transcript_via_ytdlp, url, max(0.0, deadline - time.monotonic()))
+    if not result.get("content"):
+        return {"error": result.get("error", "No subtitles found")}
+    return {"transcript": clean_transcript_text(parse_vtt_content(result["content"])), "method": "subtitles"}
+
+
+async def worker_tier(url: str, deadline: float) -> dict:
+    result = await get_transcript_from_worker(url)
+    if not result.get("transcript"):
+        return {"error": result.get("error", "Worker returned no transcript")}
+    method = result.get("method", "worker")
+    return {"transcript": clean_worker_transcript(result["transcript"], method), "method": method}
+
+
+async def audio_tier(url: str, deadline: float) -> dict:
+    result = await asyncio.to_thread(get_transcript_via_audio, url, deadline)
+    if not result.get("content"):
+        return {"error": result.get("error", "Audio transcription failed")}
+    return {"transcript": clean_transcript_text(result["content"]), "method": "audio"}
+
+
+class TranscriptTier:
+    """
+    One way of getting a transcript, with its timeout and a window of recent outcomes.
+    `fetch(url, deadline)` gets the time.monotonic() value its timeout ends at, so work it
+    runs in threads or subprocesses can be stopped too; cancelling the coroutine cannot.
+    """
+
+    def __init__(self, name: str, fetch, timeout: float, message: str, enabled=None):
+        self.name = name
+        self.fetch = fetch
+        self.timeout = timeout
+        self.message = message
+        self.enabled = enabled or (lambda: True)
+        self.recent = deque(maxlen=TIER_WINDOW)
+        self.attempts = 0
+        self.successes = 0
+        self.total_seconds = 0.0
+
+    def record(self, ok: bool, seconds: float):
+        self.recent.append(ok)
+        self.attempts += 1
+        self.successes += 1 if ok else 0
+        self.total_seconds += seconds
+
+    def success_rate(self) -> float | None:
+        if len(self.recent) < TIER_MIN_SAMPLES:
+            return None
+        return sum(self.recent) / len(self.recent)
+
+    def demoted(self) -> bool:
+        rate = self.success_rate()
+        return rate is not None and rate < TIER_DEMOTE_BELOW
+
+    def stats(self) -> dict:
+        rate = self.success_rate()
+        return {
+            "tier": self.name,
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "recent_success_rate": round(rate, 4) if rate is not None else None,
+            "avg_seconds": round(self.total_seconds / self.attempts, 3) if self.attempts else None,
+            "demoted": self.demoted(),
+        }
+
+
+class TranscriptChain:
+    """
+    Try transcript tiers from cheapest to most expensive until one returns text.
+
+    Tiers whose recent success rate drops below TIER_DEMOTE_BELOW move to just before the
+    last tier, so a source that is currently failing (for example a blocked captions API)
+    stops adding latency in front of the others while still being sampled before the
+    expensive final fallback.
+    """
+
+    def __init__(self, tiers: list):
+        self.tiers = tiers
+
+    def ordered(self) -> list:
+        tiers = [tier for tier in self.tiers if tier.enabled()]
+        if len(tiers) < 2:
+            return tiers
+        *cheap, last = tiers
+        return [t for t in cheap if not t.demoted()] + [t for t in cheap if t.demoted()] + [last]
+
+    async def acquire(self, url: str):
+        """
+        Yield {"type": "attempt", "tier", "message"} before each tier is tried, then one
+        {"type": "result", ...} with either "transcript", "method" and the winning "tier", or
+        "error". Both carry "attempts": [{"tier", "ok", "seconds", "error"}] so far.
+        """
+        attempts = []
+        for tier in self.ordered():
+            yield {"type": "attempt", "tier": tier.name, "message": tier.message, "attempts": list(attempts)}
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(tier.fetch(url, start + tier.timeout), timeout=tier.timeout)
+            except asyncio.TimeoutError:
+                result = {"error": f"Timed out after {tier.timeout:g}s"}
+            except Exception as e:
+                result = {"error": str(e) or type(e).__name__}
+            seconds = time.monotonic() - start
+            ok = bool(result.get("transcript", "").strip())
+            tier.record(ok, seconds)
+            attempts.append({"tier": tier.name, "ok": ok, "seconds": round(seconds, 3), "error": None if ok else result.get("error", "Empty transcript")})
+            logging.info(f"Transcript tier {tier.name} {'won' if ok else 'failed'} for {url} in {seconds:.2f}s")
+            if ok:
+                yield {"type": "result", "transcript": result["transcript"], "method": result["method"], "tier": tier.name, "attempts": attempts}
+                return
+        yield {"type": "result", "error": "No transcript available for this video", "attempts": attempts}
+
+    def stats(self) -> dict:
+        return {"order": [tier.name for tier in self.ordered()], "tiers": [tier.stats() for tier in self.tiers]}
+
+
+AVAILABLE_TIERS = {
+    "captions": lambda: TranscriptTier("captions", captions_tier, CAPTIONS_TIER_TIMEOUT, "Checking YouTube captions..."),
+    "ytdlp": lambda: TranscriptTier("ytdlp", ytdlp_tier, YTDLP_TIER_TIMEOUT, "Checking for subtitles..."),
+    "worker": lambda: TranscriptTier("worker", worker_tier, WORKER_TIER_TIMEOUT, "Sending video to transcription worker...",
+                                     enabled=lambda: bool(worker_pool.endpoints)),
+    "audio": lambda: TranscriptTier("audio", audio_tier, AUDIO_TIER_TIMEOUT, "No subtitles found, downloading audio..."),
+}
+
+transcript_chain = TranscriptChain([AVAILABLE_TIERS[name]() for name in TRANSCRIPT_TIERS if name in AVAILABLE_TIERS])
@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from config import UPLOAD_MAX_BYTES, UPLOAD_SESSION_TTL, UPLOAD_BLOCK_SIZE
+from utils.upload_utils import UploadRejected, detect_file_type
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Bytes needed before the container type can be told from its signature
+DETECT_BYTES = 64
+# Formats ffmpeg can decode while they are still growing (MP4/M4A may keep their index at the end)
+STREAMABLE_EXTENSIONS = ('.mp3', '.wav', '.aac', '.ogg', '.flac', '.webm', '.aiff', '.wma')
+
+
+class UploadSession:
+    """
+    One resumable upload: parts are appended in order to a temporary file, which can be read
+    back (`iter_received`) while later parts are still arriving.
+
+    `ready` is set once the audio type is known, `finished` once the upload is finalized;
+    both are also set when the session fails, with the reason in `error`.
+    """
+
+    def __init__(self, upload_id: str, filename: str | None, size: int | None, path: str, ttl: int):
+        self.id = upload_id
+        self.filename = filename
+        self.size = size
+        self.path = path
+        self.ttl = ttl
+        self.offset = 0
+        self.kind = None
+        self.extension = None
+        self.finalized = False
+        self.error = None
+        self.job = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.ready = asyncio.Event()
+        self.finished = asyncio.Event()
+        self._appending = asyncio.Lock()
+        self._received = threading.Condition()
+        self._digest = hashlib.sha256()
+
+    @property
+    def streamable(self) -> bool:
+        return self.extension in STREAMABLE_EXTENSIONS
+
+    def expired(self, now: float | None = None) -> bool:
+        return not self.finalized and (now or time.time()) - self.updated_at > self.ttl
+
+    async def append(self, offset: int, blocks, max_bytes: int = UPLOAD_MAX_BYTES) -> int:
+        """
+        Append the async iterable `blocks` at `offset`, which must equal the bytes received so
+        far. Everything written before a dropped connection is kept, so the client resumes
+        from the offset it gets back. Returns the new offset; raises UploadRejected.
+        """
+        if self._appending.locked():
+            raise UploadRejected("Another part is still being uploaded", status_code=409)
+        async with self._appending:
+            if self.error:
+                raise UploadRejected(self.error, status_code=410)
+            if self.finalized:
+                raise UploadRejected("Upload is already finalized", status_code=409)
+            if offset != self.offset:
+                raise UploadRejected(f"Upload offset is {self.offset}, not {offset}", status_code=409)
+            limit = min(self.size or max_bytes, max_bytes)
+            with open(self.path, "ab") as f:
+                async for block in blocks:
+                    if not block:
+                        continue
+                    if self.offset + len(block) > limit:
+                        raise UploadRejected(f"Upload is larger than {limit} bytes", status_code=413)
+                    await asyncio.to_thread(self._write, f, block)
+                    if self.kind is None and self.offset >= DETECT_BYTES:
+                        self._detect()
+            return self.offset
+
+    def _write(self, f, block: bytes):
+        f.write(block)
+        f.flush()
+        with self._received:
+            self._digest.update(block)
+            self.offset += len(block)
+            self.updated_at = time.time()
+            self._received.notify_all()
+
+    def _detect(self):
+        with open(self.path, "rb") as f:
+            head = f.read(4096)
+        try:
+            kind, extension = detect_file_type(head, self.filename)
+        except UploadRejected:
+            kind, extension = None, None
+        if kind != "audio":
+            self.abort("Only audio and video files can be transcribed while uploading")
+            raise UploadRejected(self.error, status_code=415)
+        # Whisper and ffmpeg go by the extension, which the declared filename may lack or get wrong
+        path = self.path + extension
+        os.rename(self.path, path)
+        self.path = path
+        self.kind, self.extension = kind, extension
+        logging.info(f"Upload {self.id} is {extension} audio ({'streamed' if self.streamable else 'transcribed after finalize'})")
+        self.ready.set()
+
+    def finalize(self) -> int:
+        """Mark the upload complete. Raises UploadRejected if bytes are missing."""
+        if self.error:
+            raise UploadRejected(self.error, status_code=410)
+        if self._appending.locked():
+            raise UploadRejected("A part is still being uploaded", status_code=409)
+        if not self.offset:
+            raise UploadRejected("Nothing was uploaded")
+        if self.size is not None and self.offset != self.size:
+            raise UploadRejected(f"Upload offset is {self.offset} of {self.size} bytes", status_code=409)
+        if self.kind is None:
+            self._detect()
+        with self._received:
+            self.finalized = True
+            self.updated_at = time.time()
+            self._received.notify_all()
+        self.finished.set()
+        return self.offset
+
+    def abort(self, reason: str):
+        with self._received:
+            self.error = self.error or reason
+            self._received.notify_all()
+        self.ready.set()
+        self.finished.set()
+
+    def hexdigest(self) -> str | None:
+        """SHA-256 of the whole upload, once it is finalized."""
+        return self._digest.hexdigest() if self.finalized else None
+
+    def iter_received(self, block_size: int = UPLOAD_BLOCK_SIZE):
+        """
+        Blocking iterator over the upload's bytes that follows the file as parts are
+        appended and ends once it is finalized and fully read. Raises RuntimeError if the
+        session fails or sits idle past its TTL.
+        """
+        with open(self.path, "rb") as f:
+            while True:
+                block = f.read(block_size)
+                if block:
+                    yield block
+                    continue
+                with self._received:
+                    while f.tell() >= self.offset and not self.finalized and not self.error:
+                        if self.expired():
+                            self.error = "Upload expired before it was finalized"
+                            break
+                        self._received.wait(timeout=1.0)
+                    if self.error:
+                        raise RuntimeError(self.error)
+                    if self.finalized and f.tell() >= self.offset:
+                        return
+
+    async def wait(self, event: asyncio.Event):
+        """Wait for `ready` or `finished`, failing the session if it sits idle past its TTL."""
+        while not event.is_set():
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(self.ttl, 60))
+            except asyncio.TimeoutError:
+                if self.expired():
+                    self.abort("Upload expired before it was finalized")
+        if self.error:
+            raise RuntimeError(self.error)
+
+    def status(self) -> dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "offset": self.offset,
+            "size": self.size,
+            "finalized": self.finalized,
+            "error": self.error,
+            "job_id": self.job.id if self.job else None,
+        }
+
+    def cleanup(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class UploadRegistry:
+    """In-process registry of resumable uploads; idle unfinished sessions expire after `ttl` seconds."""
+
+    def __init__(self, ttl: int = UPLOAD_SESSION_TTL):
+        self.ttl = ttl
+        self._sessions = {}
+
+    def create(self, filename: str | None = None, size: int | None = None, max_bytes: int = UPLOAD_MAX_BYTES) -> UploadSession:
+        if filename is not None and not isinstance(filename, str):
+            raise UploadRejected("filename must be a string")
+        # bool is an int subclass, but never a size
+        if size is not None and (not isinstance(size, int) or isinstance(size, bool) or size < 0):
+            raise UploadRejected("size must be a non-negative integer")
+        if size is not None and size > max_bytes:
+            raise UploadRejected(f"Upload is larger than {max_bytes} bytes", status_code=413)
+        self._prune()
+        # The extension is added once the content has been identified
+        with tempfile.NamedTemporaryFile(delete=False, prefix="upload_") as f:
+            path = f.name
+        session = UploadSession(uuid.uuid4().hex, filename, size, path, self.ttl)
+        self._sessions[session.id] = session
+        logging.info(f"Created upload {session.id} for {filename} ({size} bytes declared)")
+        return session
+
+    def get(self, upload_id: str) -> UploadSession | None:
+        self._prune()
+        return self._sessions.get(upload_id)
+
+    def remove(self, upload_id: str):
+        session = self._sessions.pop(upload_id, None)
+        if session is not None:
+            # Wakes any reader still following the file
+            session.abort("Upload was closed")
+            session.cleanup()
+
+    def _prune(self):
+        now = time.time()
+        for session in [session for session in self._sessions.values() if session.expired(now)]:
+            logging.info(f"Upload {session.id} expired at offset {session.offset}")
+            session.abort("Upload expired before it was finalized")
+            self.remove(session.id)
+
+
+upload_registry = UploadRegistry()
@@ -0,0 +1,281 @@
+import asyncio
+import codecs
+import hashlib
+import json
+import os
+import tempfile
+import logging
+from fastapi import HTTPException
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from config import UPLOAD_MAX_BYTES, UPLOAD_TEXT_MAX_BYTES, UPLOAD_BLOCK_SIZE
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Audio/video formats accepted by name when their content has no recognizable signature
+AUDIO_EXTENSIONS = ['.mp4', '.mp3', '.wav', '.m4a', '.aac', '.ogg', '.flac', '.wma', '.aiff']
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadRejected(ValueError):
+    """An upload that is too large or of a type we cannot read; `status_code` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def detect_audio_extension(head: bytes) -> str | None:
+    """File extension for the audio/video container whose signature starts `head`, if any."""
+    if head.startswith(b"ID3"):
+        return ".mp3"
+    if len(head) >= 2 and head[0] == 0xFF:
+        if head[1] & 0xF6 == 0xF0:
+            return ".aac"  # ADTS frame
+        if head[1] & 0xE0 == 0xE0:
+            return ".mp3"  # MPEG audio frame sync
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return ".wav"
+    if head.startswith(b"OggS"):
+        return ".ogg"
+    if head.startswith(b"fLaC"):
+        return ".flac"
+    if head[4:8] == b"ftyp":
+        return ".m4a" if head[8:11] == b"M4A" else ".mp4"
+    if head.startswith(b"FORM") and head[8:12] in (b"AIFF", b"AIFC"):
+        return ".aiff"
+    if head.startswith(b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"):
+        return ".wma"  # ASF header GUID
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return ".webm"  # Matroska/WebM EBML header
+    if head.startswith(b"ADIF"):
+        return ".aac"
+    return None
+
+
+def looks_like_text(head: bytes) -> bool:
+    """True if `head` is valid UTF-8, allowing a multi-byte character cut off at the end."""
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_file_type(head: bytes, filename: str | None = None) -> tuple[str, str]:
+    """
+    Classify an upload from its first bytes as ("pdf" | "docx" | "audio" | "text", extension).
+    The file name is only consulted for audio formats without a signature.
+    Raises UploadRejected for binary content we cannot read.
+    """
+    if head.startswith(b"%PDF-"):
+        return "pdf", ".pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "docx", ".docx"
+    extension = detect_audio_extension(head)
+    if extension:
+        return "audio", extension
+    extension = os.path.splitext((filename or "").lower())[1]
+    if extension in AUDIO_EXTENSIONS:
+        return "audio", extension
+    if looks_like_text(head):
+        return "text", ".txt"
+    raise UploadRejected("Unsupported file type")
+
+
+class SpooledUpload:
+    """An upload copied to a temporary file: its path, type, size, SHA-256 and name. Remove it with `cleanup()`."""
+
+    def __init__(self, path: str, kind: str, extension: str, size: int, digest: str, filename: str | None = None):
+        self.path = path
+        self.kind = kind
+        self.extension = extension
+        self.size = size
+        self.digest = digest
+        self.filename = filename
+
+    def cleanup(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class _MultipartFile:
+    """
+    python-multipart callbacks that write the file part named `field` to a temporary file
+    while the body is parsed. Other parts are skipped.
+    """
+
+    def __init__(self, field: str, max_bytes: int, text_max_bytes: int, block_size: int):
+        self.field = field
+        self.limit = max_bytes
+        self.text_max_bytes = text_max_bytes
+        self.block_size = block_size
+        self.headers = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.in_file = False
+        self.filename = None
+        self.head = bytearray()
+        self.temp_file = None
+        self.kind = None
+        self.extension = None
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.upload = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field, self.header_value = b"", b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        self.in_file = name == self.field and b"filename" in options and self.upload is None
+        if self.in_file:
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self.in_file:
+            return
+        block = data[start:end]
+        self.size += len(block)
+        self._check_size()
+        self.digest.update(block)
+        if self.temp_file is None:
+            # Held back until there is enough to tell the type from
+            self.head += block
+            if len(self.head) >= self.block_size:
+                self._open()
+        else:
+            self.temp_file.write(block)
+
+    def on_part_end(self):
+        if not self.in_file:
+            return
+        self.in_file = False
+        if self.temp_file is None:
+            if not self.head:
+                raise UploadRejected("Uploaded file is empty")
+            self._open()
+        self.temp_file.close()
+        self.upload = SpooledUpload(self.temp_file.name, self.kind, self.extension, self.size,
+                                    self.digest.hexdigest(), self.filename)
+
+    def _check_size(self):
+        if self.size > self.limit:
+            raise UploadRejected(f"File is larger than {self.limit // (1024 * 1024)}MB", status_code=413)
+
+    def _open(self):
+        self.kind, self.extension = detect_file_type(bytes(self.head), self.filename)
+        if self.kind == "text":
+            self.limit = min(self.limit, self.text_max_bytes)
+            self._check_size()
+        self.temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=self.extension)
+        self.temp_file.write(self.head)
+        self.head = bytearray()
+
+    def discard(self):
+        if self.temp_file is not None:
+            self.temp_file.close()
+            if os.path.exists(self.temp_file.name):
+                os.unlink(self.temp_file.name)
+
+
+async def spool_upload(stream, content_type: str | None, field: str = "file", max_bytes: int = UPLOAD_MAX_BYTES,
+                       text_max_bytes: int = UPLOAD_TEXT_MAX_BYTES, block_size: int = UPLOAD_BLOCK_SIZE) -> SpooledUpload:
+    """
+    Parse a multipart/form-data body from the async byte iterable `stream` (e.g.
+    `request.stream()`) as it arrives, and write its `field` file part to a temporary file,
+    hashing it on the way. The upload is written to disk once and never held in memory.
+    The type is detected from the part's first `block_size` bytes, and the size limit for
+    that type is enforced as soon as it is exceeded, before the rest is received.
+    Raises UploadRejected (413 for oversized files).
+    """
+    mime_type, options = parse_options_header(content_type or "")
+    if mime_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise UploadRejected("Expected a multipart/form-data upload")
+    part = _MultipartFile(field, max_bytes, text_max_bytes, block_size)
+    parser = MultipartParser(options[b"boundary"], part.callbacks())
+    try:
+        async for chunk in stream:
+            await asyncio.to_thread(parser.write, chunk)
+            if part.upload is not None:
+                break
+        parser.finalize()
+    except MultipartParseError as e:
+        part.discard()
+        raise UploadRejected(f"Malformed upload: {str(e)}")
+    except BaseException:
+        part.discard()
+        raise
+    if part.upload is None:
+        part.discard()
+        raise UploadRejected(f"No file in the '{field}' field")
+    logging.info(f"Spooled upload {part.filename} ({part.kind}, {part.size} bytes) to {part.upload.path}")
+    return part.upload
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Answer 413 to uploads on `paths` whose Content-Length already exceeds `max_bytes`,
+    before any of the request body is received or parsed. Bodies without a (truthful)
+    Content-Length, e.g. chunked ones, are counted as they arrive and cut off with a 413
+    as soon as they pass the limit.
+    """
+
+    def __init__(self, app, paths: tuple, max_bytes: int = UPLOAD_MAX_BYTES):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        limit = self.max_bytes + MULTIPART_OVERHEAD
+        detail = f"File is larger than {self.max_bytes // (1024 * 1024)}MB"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            body = json.dumps({"detail": detail}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Body parsing re-raises HTTPException, so the app answers 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
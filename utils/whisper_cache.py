@@ -0,0 +1,52 @@
+import hashlib
+from config import WHISPER_CACHE_PATH, WHISPER_CACHE_TTL
+from utils.transcript_cache import TranscriptCache
+
+
+def audio_cache_key(digest: str) -> str:
+    """Cache key for the Whisper transcript of a whole file with SHA-256 `digest`."""
+    return f"sha256:{digest}"
+
+
+def chunk_cache_key(digest: str) -> str:
+    """Cache key for the Whisper transcript of one encoded chunk with SHA-256 `digest`."""
+    return f"chunk:{digest}"
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Hex SHA-256 of a file, read in `block_size` blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class HashingStream:
+    """
+    Pass an iterable of byte blocks through unchanged while hashing it, so a download that
+    is piped into ffmpeg is fingerprinted without a second pass. `hexdigest()` is None
+    until the whole input has been read.
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.size = 0
+        self.complete = False
+        self._digest = hashlib.sha256()
+
+    def __iter__(self):
+        for block in self.blocks:
+            if block:
+                self._digest.update(block)
+                self.size += len(block)
+            yield block
+        self.complete = True
+
+    def hexdigest(self) -> str | None:
+        return self._digest.hexdigest() if self.complete else None
+
+
+# Same two-tier store as transcripts, in its own file: entries are keyed by content, not URL,
+# so they stay valid for as long as the audio itself does
+whisper_cache = TranscriptCache(WHISPER_CACHE_PATH, ttl=WHISPER_CACHE_TTL, name="Whisper")
@@ -0,0 +1,185 @@
+import asyncio
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from config import WHISPER_CONCURRENCY, WHISPER_MAX_RETRIES
+from utils.openai_utils import sync_client as client
+from utils.whisper_cache import whisper_cache, chunk_cache_key, file_sha256
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+_DONE = object()
+
+
+def transcribe_audio_file(path: str, retries: int = WHISPER_MAX_RETRIES) -> str:
+    """
+    Transcribe one audio file with Whisper, retrying it on its own with exponential backoff.
+    Raises the last error once the retries are exhausted.
+    """
+    attempt = 0
+    while True:
+        try:
+            with open(path, "rb") as audio_file:
+                logging.info(f"Transcribing audio chunk {path} with OpenAI Whisper (attempt {attempt + 1})...")
+                return client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    response_format="text"
+                )
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = 2 ** attempt
+            logging.warning(f"Whisper failed for {path}: {str(e)}; retrying in {delay}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def transcribe_chunk(path: str) -> str:
+    """
+    `transcribe_audio_file` behind the content-hash cache: a chunk whose encoded bytes were
+    transcribed before (the same recording uploaded again, or a trimmed cut of it) is served
+    without calling Whisper. Paths that cannot be hashed are transcribed uncached.
+    """
+    try:
+        key = chunk_cache_key(file_sha256(path))
+    except OSError:
+        key = None
+    if key:
+        cached = whisper_cache.get(key)
+        if cached:
+            logging.info(f"Whisper cache hit for chunk {path}")
+            return cached["transcript"]
+    text = transcribe_audio_file(path)
+    if key:
+        whisper_cache.set(key, text, "whisper")
+    return text
+
+
+async def transcribe_chunks_in_order(chunk_paths, concurrency: int = WHISPER_CONCURRENCY):
+    """
+    Submit chunks to Whisper as soon as they are available (at most `concurrency` in flight)
+    and yield (index, path, text, error) in chunk order, as soon as each prefix of the audio
+    is complete. `chunk_paths` may be a list or a blocking generator such as
+    `iter_audio_chunks`, which is drained in a worker thread. Outstanding requests are
+    cancelled if the consumer stops early.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    arrivals = asyncio.Queue()
+    ordered = asyncio.Queue()
+    stop = threading.Event()
+    tasks = []
+
+    def publish(item):
+        try:
+            loop.call_soon_threadsafe(arrivals.put_nowait, item)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def pump():
+        iterator = iter(chunk_paths)
+        try:
+            for path in iterator:
+                publish(path)
+                if stop.is_set():
+                    break
+        except Exception as e:
+            publish(e)
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            publish(_DONE)
+
+    async def run(path):
+        async with semaphore:
+            return await asyncio.to_thread(transcribe_chunk, path)
+
+    async def dispatch():
+        while True:
+            item = await arrivals.get()
+            if item is _DONE or isinstance(item, Exception):
+                await ordered.put(item)
+                return
+            task = asyncio.create_task(run(item))
+            tasks.append(task)
+            await ordered.put((item, task))
+
+    pumping = loop.run_in_executor(None, pump)
+    dispatcher = asyncio.create_task(dispatch())
+    index = 0
+    try:
+        while True:
+            item = await ordered.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            path, task = item
+            try:
+                yield index, path, await task, None
+            except Exception as e:
+                logging.error(f"Error transcribing chunk {index + 1} ({path}): {str(e)}")
+                yield index, path, None, e
+            index += 1
+    finally:
+        stop.set()
+        dispatcher.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.shield(pumping)
+
+
+def iter_transcribed_chunks(chunk_paths, concurrency: int = WHISPER_CONCURRENCY):
+    """
+    Blocking counterpart of `transcribe_chunks_in_order` for code that already runs in a
+    worker thread. Yields (index, path, text, error) in chunk order.
+    """
+    futures = queue.Queue()
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+
+        def pump():
+            iterator = iter(chunk_paths)
+            try:
+                for path in iterator:
+                    futures.put((path, executor.submit(transcribe_chunk, path)))
+                    if stop.is_set():
+                        break
+            except Exception as e:
+                futures.put(e)
+            finally:
+                if hasattr(iterator, "close"):
+                    iterator.close()
+                futures.put(_DONE)
+
+        pumper = threading.Thread(target=pump, daemon=True)
+        pumper.start()
+        submitted = []
+        index = 0
+        try:
+            while True:
+                item = futures.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                path, future = item
+                submitted.append(future)
+                try:
+                    yield index, path, future.result(), None
+                except Exception as e:
+                    logging.error(f"Error transcribing chunk {index + 1} ({path}): {str(e)}")
+                    yield index, path, None, e
+                index += 1
+        finally:
+            stop.set()
+            pumper.join()
+            while not futures.empty():
+                item = futures.get_nowait()
+                if isinstance(item, tuple):
+                    submitted.append(item[1])
+            for future in submitted:
+                future.cancel()
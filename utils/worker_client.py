@@ -0,0 +1,239 @@
+import asyncio
+import json
+import time
+import logging
+from urllib.parse import urlsplit
+import httpx
+from config import (
+    WORKER_URLS, WORKER_TIMEOUT, WORKER_MAX_CONNECTIONS, WORKER_FAILURE_THRESHOLD,
+    WORKER_COOLDOWN_SECONDS, WORKER_HEALTH_INTERVAL
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class WorkerEndpoint:
+    """One home worker plus the counters used for routing and its circuit breaker."""
+
+    def __init__(self, url: str):
+        self.url = url
+        parts = urlsplit(url)
+        self.health_url = f"{parts.scheme}://{parts.netloc}/health"
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.failures,
+            "ejected": self.ejected_until > time.monotonic(),
+        }
+
+
+class WorkerPool:
+    """
+    Route transcript requests over one or more home workers with a shared keep-alive client.
+
+    Each request goes to the available worker with the fewest requests in flight. A worker
+    that fails `failure_threshold` times in a row (connection errors, timeouts, 5xx) is
+    ejected for `cooldown` seconds; after that it gets a trial request, and a success puts it
+    back in rotation. Periodic `/health` checks eject dead workers and restore recovered ones
+    without spending user requests on them.
+    """
+
+    def __init__(self, urls: list, timeout: float = WORKER_TIMEOUT, max_connections: int = WORKER_MAX_CONNECTIONS,
+                 failure_threshold: int = WORKER_FAILURE_THRESHOLD, cooldown: float = WORKER_COOLDOWN_SECONDS,
+                 health_interval: float = WORKER_HEALTH_INTERVAL, transport: httpx.AsyncBaseTransport | None = None):
+        self.endpoints = [WorkerEndpoint(url) for url in urls]
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.health_interval = health_interval
+        self.transport = transport
+        self._client = None
+        self._client_loop = None
+        self._health_task = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # The client's connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=10),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+            self._client_loop = loop
+            self._health_task = None
+        if self.health_interval > 0 and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.create_task(self._health_loop())
+        return self._client
+
+    def _pick(self, tried: set) -> WorkerEndpoint | None:
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e not in tried and e.available(now)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: (e.outstanding, e.failures))
+
+    def _record_success(self, endpoint: WorkerEndpoint):
+        if endpoint.ejected_until:
+            logging.info(f"Worker {endpoint.url} is back in rotation")
+        endpoint.failures = 0
+        endpoint.ejected_until = 0.0
+
+    def _record_failure(self, endpoint: WorkerEndpoint, reason: str):
+        endpoint.failures += 1
+        endpoint.errors += 1
+        logging.warning(f"Worker {endpoint.url} failed ({endpoint.failures} in a row): {reason}")
+        if endpoint.failures >= self.failure_threshold:
+            endpoint.ejected_until = time.monotonic() + self.cooldown
+            logging.error(f"Ejecting worker {endpoint.url} for {self.cooldown:g}s")
+
+    async def transcribe(self, youtube_url: str) -> dict:
+        """
+        POST `{"url": youtube_url}` to a worker and return its JSON ({"method", "transcript"}),
+        moving on to the next worker on failure. Returns {"error"} when none succeeds.
+        """
+        if not self.endpoints:
+            return {"error": "No transcription worker configured (set WORKER_URL or WORKER_URLS)"}
+        client = self._get_client()
+        tried = set()
+        last_error = "All transcription workers are unavailable"
+        while (endpoint := self._pick(tried)) is not None:
+            tried.add(endpoint)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            try:
+                response = await client.post(endpoint.url, json={"url": youtube_url})
+                if response.status_code >= 500:
+                    raise httpx.HTTPStatusError(f"Worker returned {response.status_code}",
+                                                request=response.request, response=response)
+                response.raise_for_status()
+                self._record_success(endpoint)
+                return response.json()  # Contains 'method' and 'transcript'
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500:
+                    # The worker is healthy; it rejected this particular video
+                    self._record_success(endpoint)
+                    return {"error": str(e)}
+                last_error = str(e)
+                self._record_failure(endpoint, last_error)
+            except Exception as e:
+                last_error = str(e) or type(e).__name__
+                self._record_failure(endpoint, last_error)
+            finally:
+                endpoint.outstanding -= 1
+        return {"error": last_error}
+
+    async def stream_transcribe(self, youtube_url: str):
+        """
+        Streaming variant of `transcribe`. Asks the worker for NDJSON (`"stream": true`,
+        `Accept: application/x-ndjson`) and yields its events as dicts as they arrive:
+
+            {"type": "progress", "message": ...}
+            {"type": "transcript_chunk", "content": ...}   pieces of the final transcript, in order
+            {"type": "complete", "method": ..., "transcript": ...}   transcript is optional
+            {"type": "error", "message": ...}
+
+        A worker that answers with the plain JSON result instead is handled as a single
+        complete event, so older workers keep working. Requests fail over to another worker
+        only until the first event has been yielded.
+        """
+        if not self.endpoints:
+            yield {"type": "error", "message": "No transcription worker configured (set WORKER_URL or WORKER_URLS)"}
+            return
+        client = self._get_client()
+        tried = set()
+        last_error = "All transcription workers are unavailable"
+        while (endpoint := self._pick(tried)) is not None:
+            tried.add(endpoint)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            started = False
+            try:
+                async with client.stream(
+                    "POST", endpoint.url, json={"url": youtube_url, "stream": True},
+                    headers={"Accept": "application/x-ndjson, application/json"}
+                ) as response:
+                    if response.status_code >= 500:
+                        raise httpx.HTTPStatusError(f"Worker returned {response.status_code}",
+                                                    request=response.request, response=response)
+                    if response.status_code >= 400:
+                        self._record_success(endpoint)
+                        yield {"type": "error", "message": f"Worker returned {response.status_code}"}
+                        return
+                    if "ndjson" in response.headers.get("content-type", ""):
+                        finished = False
+                        async for line in response.aiter_lines():
+                            if not line.strip():
+                                continue
+                            event = json.loads(line)
+                            started = True
+                            yield event
+                            if event.get("type") in ("complete", "error"):
+                                finished = True
+                                break
+                        if not finished:
+                            raise RuntimeError("Worker stream ended before the transcript was complete")
+                    else:
+                        data = json.loads(await response.aread())
+                        started = True
+                        if data.get("transcript"):
+                            yield {"type": "complete", "method": data.get("method", "worker"), "transcript": data["transcript"]}
+                        else:
+                            yield {"type": "error", "message": data.get("error", "Worker returned no transcript")}
+                self._record_success(endpoint)
+                return
+            except Exception as e:
+                last_error = str(e) or type(e).__name__
+                self._record_failure(endpoint, last_error)
+                if started:
+                    yield {"type": "error", "message": f"Worker stream interrupted: {last_error}"}
+                    return
+            finally:
+                endpoint.outstanding -= 1
+        yield {"type": "error", "message": last_error}
+
+    async def check_health(self):
+        """Probe every worker's /health once; any HTTP answer below 500 counts as alive."""
+        client = self._client
+        for endpoint in self.endpoints:
+            try:
+                response = await client.get(endpoint.health_url, timeout=5)
+                if response.status_code >= 500:
+                    raise RuntimeError(f"health check returned {response.status_code}")
+                self._record_success(endpoint)
+            except Exception as e:
+                if endpoint.available(time.monotonic()):
+                    self._record_failure(endpoint, f"health check: {str(e) or type(e).__name__}")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    async def aclose(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._health_task = None
+
+    def stats(self) -> dict:
+        return {"workers": [endpoint.stats() for endpoint in self.endpoints]}
+
+
+worker_pool = WorkerPool(WORKER_URLS)
@@ -1,55 +1,27 @@
-import subprocess
-import glob
 import os
 import tempfile
+import time
 import logging
-from openai import OpenAI
-from config import OPENAI_API_KEY, YOUTUBE_API_KEY
-import math
-import shutil
-import httpx
+from config import YOUTUBE_API_KEY, YTDLP_AUDIO_FORMAT, YTDLP_AUDIO_TIMEOUT, YTDLP_SUBTITLE_TIMEOUT
+from utils.whisper_utils import iter_transcribed_chunks
+from utils.audio_utils import iter_audio_chunks
+from utils.worker_client import worker_pool
+from utils.ytdlp_engine import ytdlp_engine
+from utils.llm_cache import cached_chat_completion
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-client = OpenAI(api_key=OPENAI_API_KEY)
 
-WORKER_URL = os.getenv("WORKER_URL")
-
-def get_transcript_via_ytdlp(url: str) -> dict:
+def get_transcript_via_ytdlp(url: str, timeout: float = YTDLP_SUBTITLE_TIMEOUT) -> dict:
+    """English subtitles (manual or automatic) as VTT text: {"content"} or {"error"}"""
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Copy cookies.txt from Render Secret Files to a writable temp location
-            cookies_src = '/etc/secrets/cookies.txt'
-            cookies_dst = f'{temp_dir}/cookies.txt'
-            shutil.copy(cookies_src, cookies_dst)
-            cmd = [
-                'yt-dlp',
-                '--write-sub',
-                '--write-auto-sub',
-                '--sub-langs', 'en,en-US,en-GB',
-                '--sub-format', 'vtt',
-                '--skip-download',
-                '--no-warnings',
-                '-o', f'{temp_dir}/%(title)s.%(ext)s',
-                '--cookies', cookies_dst,
-                url
-            ]
-            logging.info(f"Running yt-dlp command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                vtt_files = glob.glob(f'{temp_dir}/*.vtt')
-                if vtt_files:
-                    with open(vtt_files[0], 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    logging.info(f"VTT content length: {len(content)}")
-                    return {"content": content}
-                else:
-                    logging.info("No VTT files found")
-            else:
-                logging.warning(f"yt-dlp failed: {result.stderr}")
-            return {"error": "No subtitles found"}
-    except subprocess.TimeoutExpired:
-        logging.error("yt-dlp command timed out")
+        result = ytdlp_engine.fetch_subtitles(url, timeout=timeout)
+        if result.get("content"):
+            logging.info(f"VTT content length: {len(result['content'])}")
+        else:
+            logging.info("No VTT subtitles found")
+        return result
+    except TimeoutError:
+        logging.error("yt-dlp subtitle lookup timed out")
         return {"error": "Request timed out"}
     except Exception as e:
         logging.error(f"yt-dlp error: {str(e)}")
@@ -59,150 +31,76 @@ def split_mp4_ffmpeg(mp4_file, max_size=24*1024*1024):
     """
     Split MP4 file into MP3 chunks for Whisper transcription.
     """
-    file_size = os.path.getsize(mp4_file)
-    if file_size <= max_size:
-        return [mp4_file]
-    
-    # Get duration in seconds
-    result = subprocess.run(
-        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of',
-         'default=noprint_wrappers=1:nokey=1', mp4_file],
-        capture_output=True, text=True
-    )
-    duration = float(result.stdout.strip())
-    
-    # Estimate number of chunks
-    num_chunks = math.ceil(file_size / max_size)
-    chunk_duration = duration / num_chunks
-    chunk_paths = []
-    
-    for i in range(num_chunks):
-        start = i * chunk_duration
-        chunk_path = f"{mp4_file}_chunk_{i}.mp3"
-        
-        # Convert MP4 chunk to MP3 for Whisper
-        cmd = [
-            'ffmpeg', '-y', '-i', mp4_file,
-            '-ss', str(int(start)),
-            '-t', str(int(chunk_duration)),
-            '-vn',  # No video
-            '-acodec', 'libmp3lame',  # Use MP3 codec
-            '-ar', '16000',  # Sample rate
-            '-ac', '1',  # Mono audio
-            '-b:a', '128k',  # Bitrate
-            chunk_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            chunk_paths.append(chunk_path)
-        else:
-            logging.error(f"Failed to create chunk {i}: {result.stderr}")
-    
-    return chunk_paths
+    return list(iter_audio_chunks(mp4_file, max_size))
 
 def split_audio_ffmpeg(audio_file, max_size=24*1024*1024):
-    file_size = os.path.getsize(audio_file)
-    if file_size <= max_size:
-        return [audio_file]
-    # Get duration in seconds
-    result = subprocess.run(
-        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of',
-         'default=noprint_wrappers=1:nokey=1', audio_file],
-        capture_output=True, text=True
-    )
-    duration = float(result.stdout.strip())
-    # Estimate number of chunks
-    num_chunks = math.ceil(file_size / max_size)
-    chunk_duration = duration / num_chunks
-    chunk_paths = []
-    for i in range(num_chunks):
-        start = i * chunk_duration
-        chunk_path = f"{audio_file}_chunk_{i}.mp3"
-        cmd = [
-            'ffmpeg', '-y', '-i', audio_file,
-            '-ss', str(int(start)),
-            '-t', str(int(chunk_duration)),
-            '-acodec', 'libmp3lame',  # Use MP3 codec instead of copy
-            '-ar', '16000',  # Sample rate
-            '-ac', '1',  # Mono audio
-            '-b:a', '128k',  # Bitrate
-            chunk_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            chunk_paths.append(chunk_path)
-        else:
-            logging.error(f"Failed to create chunk {i}: {result.stderr}")
-    return chunk_paths
+    return list(iter_audio_chunks(audio_file, max_size))
 
-def get_transcript_via_audio(url: str) -> dict:
+def download_audio_ytdlp(url: str, temp_dir: str, timeout: float = YTDLP_AUDIO_TIMEOUT) -> dict:
+    """
+    Download the smallest audio-only stream yt-dlp offers (see YTDLP_AUDIO_FORMAT) without
+    converting it to MP3; the chunker and Whisper both read opus/webm and m4a directly.
+    Returns {"path": ...} or {"error": ...}.
+    """
+    logging.info(f"Downloading audio for transcription with format selector {YTDLP_AUDIO_FORMAT}...")
+    try:
+        result = ytdlp_engine.download_audio(url, temp_dir, timeout=timeout)
+    except TimeoutError:
+        logging.error("Audio download timed out")
+        return {"error": "Audio download timed out"}
+    except Exception as e:
+        logging.error(f"Audio download failed: {str(e)}")
+        return {"error": "Failed to download audio"}
+    if result.get("path"):
+        logging.info(f"Downloaded audio {result['path']} ({os.path.getsize(result['path'])} bytes)")
+    return result
+
+def get_transcript_via_audio(url: str, deadline: float | None = None) -> dict:
+    """
+    Download and transcribe a video's audio: {"content"} or {"error"}. With a `deadline`
+    (a time.monotonic() value) the download is killed and no further chunks are started
+    once it passes, so a caller that gave up does not keep paying for Whisper.
+    """
     try:
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Copy cookies.txt from Render Secret Files to a writable temp location
-            cookies_src = '/etc/secrets/cookies.txt'
-            cookies_dst = f'{temp_dir}/cookies.txt'
-            shutil.copy(cookies_src, cookies_dst)
-            cmd = [
-                'yt-dlp',
-                '--extract-audio',
-                '--audio-format', 'mp3',
-                '--audio-quality', '192K',
-                '--no-warnings',
-                '-o', f'{temp_dir}/%(title)s.%(ext)s',
-                '--cookies', cookies_dst,
-                url
-            ]
-            logging.info("Downloading audio for transcription...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            if result.returncode == 0:
-                audio_files = glob.glob(f'{temp_dir}/*.mp3')
-                if audio_files:
-                    audio_file = audio_files[0]
-                    max_size = 24 * 1024 * 1024  # 24MB for safety
-                    chunk_paths = split_audio_ffmpeg(audio_file, max_size)
-                    full_transcript = ""
-                    for chunk_path in chunk_paths:
-                        with open(chunk_path, "rb") as f:
-                            logging.info(f"Transcribing audio chunk {chunk_path} with OpenAI Whisper...")
-                            transcription = client.audio.transcriptions.create(
-                                model="whisper-1",
-                                file=f,
-                                response_format="text"
-                            )
+            timeout = YTDLP_AUDIO_TIMEOUT if deadline is None else max(0.0, min(YTDLP_AUDIO_TIMEOUT, deadline - time.monotonic()))
+            download = download_audio_ytdlp(url, temp_dir, timeout=timeout)
+            if download.get("path"):
+                audio_file = download["path"]
+                max_size = 24 * 1024 * 1024  # 24MB for safety
+                full_transcript = ""
+                # Whisper starts on the first chunk while ffmpeg is still cutting the rest
+                chunks = iter_transcribed_chunks(iter_audio_chunks(audio_file, max_size))
+                try:
+                    for i, chunk_path, transcription, chunk_error in chunks:
                         if transcription:
                             full_transcript += transcription + "\n"
                         if chunk_path != audio_file:
                             os.remove(chunk_path)
-                    return {"content": full_transcript}
-            logging.error(f"Audio download failed: {result.stderr}")
-            return {"error": "Failed to download audio"}
-    except subprocess.TimeoutExpired:
-        logging.error("Audio download timed out")
-        return {"error": "Audio download timed out"}
+                        if deadline is not None and time.monotonic() > deadline:
+                            logging.error(f"Audio transcription of {url} passed its deadline after chunk {i + 1}")
+                            return {"error": "Audio transcription timed out"}
+                finally:
+                    # Stops ffmpeg and cancels chunks not yet sent to Whisper
+                    chunks.close()
+                return {"content": full_transcript}
+            return download
     except Exception as e:
         logging.error(f"Audio transcription error: {str(e)}")
         return {"error": str(e)}
 
-def get_transcript_from_worker(youtube_url: str):
-    payload = {"url": youtube_url}
-    try:
-        response = httpx.post(WORKER_URL, json=payload, timeout=180)
-        response.raise_for_status()
-        data = response.json()
-        return data  # Contains 'method' and 'transcript'
-    except Exception as e:
-        return {"error": str(e)}
+async def get_transcript_from_worker(youtube_url: str) -> dict:
+    """Transcript from the least busy healthy home worker: {"method", "transcript"} or {"error"}"""
+    return await worker_pool.transcribe(youtube_url)
 
-def generate_title(text: str) -> str:
+async def generate_title(text: str) -> str:
     try:
         title_prompt = f"Generate a short, clear title (5-8 words) for the following content:\n\n{text[:1500]}"
-        response = client.chat.completions.create(
+        content, _ = await cached_chat_completion(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": title_prompt}],
             max_tokens=20
         )
-        content = response.choices[0].message.content
         if content:
             return content.strip()
         else:
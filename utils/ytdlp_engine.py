@@ -0,0 +1,265 @@
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import logging
+from config import YTDLP_WORKERS, YTDLP_MAX_WORKERS, YTDLP_COOKIES_PATH, YTDLP_AUDIO_FORMAT
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SUBTITLE_LANGS = ['en', 'en-US', 'en-GB']
+
+# State of each engine worker process: warm YoutubeDL instances and the cookies they were built with
+_instances = {}
+_cookies = {"mtime": None, "path": None}
+
+
+def _cookie_file() -> str | None:
+    """
+    Path of this process's private copy of the cookies secret, refreshed when the secret's
+    mtime changes. yt-dlp writes cookies back on close, and the secret mount is read-only.
+    Warm instances are rebuilt whenever the cookies change.
+    """
+    try:
+        mtime = os.stat(YTDLP_COOKIES_PATH).st_mtime
+    except OSError:
+        mtime = None
+    if mtime == _cookies["mtime"] and (mtime is None or _cookies["path"]):
+        return _cookies["path"]
+
+    for ydl in _instances.values():
+        ydl.close()
+    _instances.clear()
+    if _cookies["path"] and os.path.exists(_cookies["path"]):
+        os.remove(_cookies["path"])
+
+    path = None
+    if mtime is not None:
+        fd, path = tempfile.mkstemp(prefix="ytdlp-cookies-", suffix=".txt")
+        os.close(fd)
+        shutil.copy(YTDLP_COOKIES_PATH, path)
+        logging.info(f"Loaded yt-dlp cookies from {YTDLP_COOKIES_PATH}")
+    _cookies.update(mtime=mtime, path=path)
+    return path
+
+
+def _youtube_dl(kind: str):
+    """Warm YoutubeDL instance for `kind` ("subtitles" or "audio") in this process."""
+    cookiefile = _cookie_file()
+    ydl = _instances.get(kind)
+    if ydl is None:
+        from yt_dlp import YoutubeDL
+        params = {
+            'quiet': True,
+            'no_warnings': True,
+            'noprogress': True,
+            'noplaylist': True,
+            'socket_timeout': 20,
+        }
+        if cookiefile:
+            params['cookiefile'] = cookiefile
+        if kind == 'subtitles':
+            params.update({
+                'skip_download': True,
+                'writesubtitles': True,
+                'writeautomaticsub': True,
+                'subtitleslangs': SUBTITLE_LANGS,
+                'subtitlesformat': 'vtt',
+            })
+        else:
+            params['format'] = YTDLP_AUDIO_FORMAT
+        ydl = YoutubeDL(params)
+        _instances[kind] = ydl
+    return ydl
+
+
+def _warm_up(kind: str) -> bool:
+    _youtube_dl(kind)
+    return True
+
+
+def _fetch_subtitles(url: str) -> dict:
+    ydl = _youtube_dl('subtitles')
+    info = ydl.extract_info(url, download=False)
+    subtitles = info.get('requested_subtitles') or {}
+    for lang in SUBTITLE_LANGS + sorted(subtitles):
+        subtitle = subtitles.get(lang)
+        if not subtitle or subtitle.get('ext') != 'vtt':
+            continue
+        if subtitle.get('data'):
+            return {"content": subtitle['data']}
+        if subtitle.get('url'):
+            with ydl.urlopen(subtitle['url']) as response:
+                return {"content": response.read().decode('utf-8', errors='replace')}
+    return {"error": "No subtitles found"}
+
+
+def _download_audio(url: str, temp_dir: str) -> dict:
+    ydl = _youtube_dl('audio')
+    ydl.params['outtmpl']['default'] = os.path.join(temp_dir, 'audio.%(ext)s')
+    ydl.download([url])
+    audio_files = [path for path in glob.glob(os.path.join(temp_dir, 'audio.*')) if not path.endswith('.part')]
+    if audio_files:
+        return {"path": audio_files[0]}
+    return {"error": "Failed to download audio"}
+
+
+def _serve(conn):
+    """Engine process loop: run each (fn, args) received on `conn` and send back (ok, result)."""
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        fn, args = request
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:
+                # The exception itself could not be pickled
+                conn.send((False, RuntimeError(str(e))))
+
+
+class _EngineProcess:
+    """One spawned engine process and the pipe used to hand it work."""
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def call(self, fn, args: tuple, timeout: float):
+        """Run `fn(*args)` in the process. Raises TimeoutError, or EOFError if the process died."""
+        self.conn.send((fn, args))
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"yt-dlp call did not finish in {timeout}s")
+        ok, value = self.conn.recv()
+        if ok:
+            return value
+        raise value
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class YtdlpEngine:
+    """
+    Run yt-dlp as a library in long-lived processes.
+
+    Each process imports the extractors and parses the cookies once, and keeps its
+    YoutubeDL instance warm between requests, so a subtitle lookup costs no interpreter
+    startup. Subtitle lookups and audio downloads use separate processes. Up to `workers`
+    idle processes are kept per kind. When all of them are busy more are started, up to
+    `max_workers` per kind; after that calls wait for a free process, and a call's timeout
+    only starts once it has one. A call that times out has its process killed, which stops
+    the download. Processes are started with "spawn" so they never inherit the server's
+    threads.
+    """
+
+    def __init__(self, workers: int = YTDLP_WORKERS, max_workers: int = YTDLP_MAX_WORKERS):
+        self.workers = max(1, workers)
+        self.max_workers = max(self.workers, max_workers)
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = {"subtitles": [], "audio": []}
+        self._busy = set()
+        self._slots = {kind: threading.BoundedSemaphore(self.max_workers) for kind in self._idle}
+        self._lock = threading.Lock()
+
+    def _acquire(self, kind: str) -> _EngineProcess:
+        with self._lock:
+            while self._idle[kind]:
+                engine_process = self._idle[kind].pop()
+                if engine_process.alive():
+                    self._busy.add(engine_process)
+                    return engine_process
+                engine_process.kill()
+        engine_process = _EngineProcess(self._context)
+        with self._lock:
+            self._busy.add(engine_process)
+        return engine_process
+
+    def _release(self, kind: str, engine_process: _EngineProcess):
+        with self._lock:
+            self._busy.discard(engine_process)
+            if engine_process.alive() and len(self._idle[kind]) < self.workers:
+                self._idle[kind].append(engine_process)
+                return
+        engine_process.close()
+
+    def _run(self, kind: str, fn, *args, timeout: float):
+        """
+        Run `fn` in an engine process for `kind`, waiting for one if `max_workers` are busy.
+        Raises TimeoutError after `timeout` seconds of work.
+        """
+        with self._slots[kind]:
+            engine_process = self._acquire(kind)
+            try:
+                result = engine_process.call(fn, args, timeout)
+            except TimeoutError:
+                logging.error(f"yt-dlp {kind} call timed out after {timeout}s, killing its engine process")
+                with self._lock:
+                    self._busy.discard(engine_process)
+                engine_process.kill()
+                raise
+            except (EOFError, OSError) as e:
+                logging.error(f"yt-dlp engine process died: {str(e)}")
+                with self._lock:
+                    self._busy.discard(engine_process)
+                engine_process.kill()
+                raise RuntimeError("yt-dlp engine process died") from e
+            except Exception:
+                self._release(kind, engine_process)
+                raise
+            self._release(kind, engine_process)
+            return result
+
+    def fetch_subtitles(self, url: str, timeout: float) -> dict:
+        """English VTT subtitles (manual or automatic): {"content"} or {"error"}."""
+        return self._run('subtitles', _fetch_subtitles, url, timeout=timeout)
+
+    def download_audio(self, url: str, temp_dir: str, timeout: float) -> dict:
+        """Smallest audio-only stream saved as `temp_dir/audio.<ext>`: {"path"} or {"error"}."""
+        return self._run('audio', _download_audio, url, temp_dir, timeout=timeout)
+
+    def warm_up(self):
+        """Start the idle engine processes and load yt-dlp in them without waiting for it."""
+        def warm(kind):
+            try:
+                self._run(kind, _warm_up, kind, timeout=120)
+            except Exception as e:
+                logging.error(f"yt-dlp engine warm-up failed: {str(e)}")
+
+        for kind in self._idle:
+            for _ in range(self.workers):
+                threading.Thread(target=warm, args=(kind,), daemon=True).start()
+
+    def shutdown(self):
+        with self._lock:
+            engine_processes = [p for idle in self._idle.values() for p in idle] + list(self._busy)
+            for idle in self._idle.values():
+                idle.clear()
+            self._busy.clear()
+        for engine_process in engine_processes:
+            engine_process.kill()
+
+
+ytdlp_engine = YtdlpEngine()